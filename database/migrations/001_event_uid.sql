@@ -0,0 +1,13 @@
+-- Idempotent ingest: agents spool events on disk and may re-send a batch
+-- after a crash or a lost response. Each event carries a stable event_uid;
+-- the UNIQUE keys let the backend skip replays (ON DUPLICATE KEY) instead of
+-- storing them twice. Rows written before this migration keep NULL.
+-- Wazuh alerts are already deduplicated by wazuh_logs.alert_id.
+
+ALTER TABLE snort_logs
+  ADD COLUMN event_uid char(40) DEFAULT NULL,
+  ADD UNIQUE KEY uq_snort_event_uid (event_uid);
+
+ALTER TABLE security_logs
+  ADD COLUMN event_uid char(40) DEFAULT NULL,
+  ADD UNIQUE KEY uq_security_event_uid (event_uid);
@@ -0,0 +1,36 @@
+-- Rollups for the dashboard analytics endpoints: COUNT(*) per minute and per
+-- hour, by source, severity and agent, maintained by the backend's rollup
+-- compactor (rollups.py) so analytics read buckets instead of raw rows.
+-- rollup_state is the compactor's watermark: the last raw id counted per
+-- table. After applying, backfill history once:
+--   python3 modules/hybrid-ids-backend-api/rollups.py --backfill
+
+CREATE TABLE log_rollup_minute (
+  bucket datetime NOT NULL,
+  source varchar(16) NOT NULL,
+  severity varchar(16) NOT NULL DEFAULT '',
+  agent varchar(100) NOT NULL DEFAULT '',
+  count int unsigned NOT NULL DEFAULT '0',
+  PRIMARY KEY (bucket, source, severity, agent)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE log_rollup_hour (
+  bucket datetime NOT NULL,
+  source varchar(16) NOT NULL,
+  severity varchar(16) NOT NULL DEFAULT '',
+  agent varchar(100) NOT NULL DEFAULT '',
+  count int unsigned NOT NULL DEFAULT '0',
+  PRIMARY KEY (bucket, source, severity, agent)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE rollup_state (
+  table_name varchar(64) NOT NULL,
+  last_id bigint NOT NULL DEFAULT '0',
+  updated_at timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (table_name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT INTO rollup_state (table_name, last_id) VALUES
+  ('snort_logs', 0),
+  ('wazuh_logs', 0),
+  ('security_logs', 0);
@@ -0,0 +1,53 @@
+-- security_logs: make the correlation queries indexable.
+--
+-- timestamp was free text ('2025-12-18 17:58:08.114552 UTC', ISO-8601,
+-- 'MANUAL_TEST'), so it could only be compared as a string and never used
+-- an index. It becomes DATETIME(6), wall clock as sent (the UTC offset is
+-- dropped, like the Snort and Wazuh tables). Rows whose timestamp is not a
+-- date take their created_at. The original text stays in raw_json.
+--
+-- Rows sent without a timestamp or with the 'MANUAL_TEST' placeholder were
+-- left out of the correlated log view; once the column is a date they can
+-- no longer be told apart by it, so no_event_time (generated from the
+-- timestamp as sent, in raw_json, so new inserts get it too) flags them.
+--
+-- correlation_type and effective_agent_id are stored generated columns for
+-- the values the API used to pull out of raw_json on every row.
+--
+-- Check the plans afterwards: python3 modules/hybrid-ids-backend-api/explain_check.py
+
+ALTER TABLE security_logs
+  ADD COLUMN event_time datetime(6) NULL AFTER `timestamp`;
+
+UPDATE security_logs
+SET event_time = CASE
+    WHEN `timestamp` REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}[ T][0-9]{2}:[0-9]{2}:[0-9]{2}'
+    THEN CAST(CONCAT(
+        REPLACE(LEFT(`timestamp`, 19), 'T', ' '),
+        '.',
+        IF(SUBSTRING(`timestamp`, 20, 1) = '.',
+           COALESCE(LEFT(REGEXP_SUBSTR(SUBSTRING(`timestamp`, 21), '^[0-9]+'), 6), '0'),
+           '0')
+    ) AS DATETIME(6))
+    ELSE COALESCE(created_at, CURRENT_TIMESTAMP)
+END;
+
+ALTER TABLE security_logs
+  DROP COLUMN `timestamp`;
+
+ALTER TABLE security_logs
+  CHANGE COLUMN event_time `timestamp` datetime(6) NOT NULL,
+  ADD COLUMN correlation_type varchar(128) GENERATED ALWAYS AS (LEFT(COALESCE(
+      JSON_UNQUOTE(JSON_EXTRACT(raw_json, '$.raw.correlation_type')),
+      JSON_UNQUOTE(JSON_EXTRACT(raw_json, '$.correlation_type'))
+  ), 128)) STORED,
+  ADD COLUMN effective_agent_id varchar(64) GENERATED ALWAYS AS (LEFT(COALESCE(
+      JSON_UNQUOTE(JSON_EXTRACT(raw_json, '$.raw.agent_id')),
+      agent_id
+  ), 64)) STORED,
+  ADD COLUMN no_event_time tinyint(1) GENERATED ALWAYS AS (
+      COALESCE(JSON_UNQUOTE(JSON_EXTRACT(raw_json, '$.timestamp')), 'null') IN ('null', 'MANUAL_TEST')
+  ) STORED,
+  ADD KEY idx_timestamp (`timestamp`),
+  ADD KEY idx_correlated_ts (correlated, `timestamp`),
+  ADD KEY idx_agent_ts (effective_agent_id, `timestamp`);
@@ -0,0 +1,60 @@
+-- Monthly RANGE partitions on timestamp for the log tables.
+--
+-- Queries with a time range only open the partitions it covers, and
+-- retention becomes ALTER TABLE ... DROP PARTITION (metadata only) instead
+-- of a row-by-row DELETE. Partition pYYYYMM holds that month's rows; pfuture
+-- catches anything past the last month created. The backend's partition
+-- maintainer (partitions.py) splits new months out of pfuture ahead of time
+-- and drops months older than the retention period.
+--
+-- Every unique key of a partitioned table must include the partition
+-- column, so the primary key becomes (id, timestamp) and the replay keys
+-- (event_uid, alert_id) are unique per timestamp. A replay is only skipped
+-- when it carries the original timestamp: Wazuh alerts and correlation
+-- events do, and snort_push stamps each alert with the time on its fast
+-- alert line. Snort lines that do not parse are stamped with the push time,
+-- so one re-read after an agent crash can be stored twice.
+--
+-- @MONTHLY_PARTITIONS@ is filled in by migrate.sh when the migration is
+-- applied: p_old for anything older than PARTITION_HISTORY_MONTHS (default
+-- 12), one partition per month up to PARTITION_AHEAD_MONTHS (default 3)
+-- ahead of the current month, then pfuture. Apply it with migrate.sh, not
+-- by piping this file into mysql.
+--
+-- Each table is rebuilt (copied) once; run in a quiet period.
+
+-- snort_logs
+ALTER TABLE snort_logs
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (id, `timestamp`),
+  DROP KEY uq_snort_event_uid,
+  ADD UNIQUE KEY uq_snort_event_uid (event_uid, `timestamp`);
+
+ALTER TABLE snort_logs
+  PARTITION BY RANGE COLUMNS (`timestamp`) (
+    @MONTHLY_PARTITIONS@
+  );
+
+-- wazuh_logs
+ALTER TABLE wazuh_logs
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (id, `timestamp`),
+  DROP KEY alert_id,
+  ADD UNIQUE KEY alert_id (alert_id, `timestamp`);
+
+ALTER TABLE wazuh_logs
+  PARTITION BY RANGE COLUMNS (`timestamp`) (
+    @MONTHLY_PARTITIONS@
+  );
+
+-- security_logs (timestamp is DATETIME(6) since 003)
+ALTER TABLE security_logs
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (id, `timestamp`),
+  DROP KEY uq_security_event_uid,
+  ADD UNIQUE KEY uq_security_event_uid (event_uid, `timestamp`);
+
+ALTER TABLE security_logs
+  PARTITION BY RANGE COLUMNS (`timestamp`) (
+    @MONTHLY_PARTITIONS@
+  );
@@ -0,0 +1,70 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Applies database/migrations/*.sql in order, once each.
+# Applied versions are recorded in the schema_migrations table.
+#
+# Usage:
+# export DB_HOST="your-rds-endpoint"
+# export DB_USER="admin"
+# export DB_NAME="hybrididsdb"   # optional
+# ./database/scripts/migrate.sh
+
+DB_HOST="${DB_HOST:?Set DB_HOST (RDS endpoint)}"
+DB_USER="${DB_USER:?Set DB_USER (DB username)}"
+DB_NAME="${DB_NAME:-hybrididsdb}"
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+MIGRATIONS_DIR="${SCRIPT_DIR}/../migrations"
+
+if [[ -z "${MYSQL_PWD:-}" ]]; then
+  read -r -s -p "Password for ${DB_USER}@${DB_HOST}: " MYSQL_PWD
+  echo
+  export MYSQL_PWD
+fi
+
+sql() {
+  mysql -h "$DB_HOST" -u "$DB_USER" "$DB_NAME" "$@"
+}
+
+# Monthly RANGE COLUMNS partitions around the current month (UTC), for
+# migrations that contain the @MONTHLY_PARTITIONS@ placeholder.
+PARTITION_HISTORY_MONTHS="${PARTITION_HISTORY_MONTHS:-12}"
+PARTITION_AHEAD_MONTHS="${PARTITION_AHEAD_MONTHS:-3}"
+
+month_offset() {
+  date -u -d "$(date -u +%Y-%m-01) $1 month" +%Y-%m-01
+}
+
+monthly_partitions() {
+  local i start
+  echo "    PARTITION p_old VALUES LESS THAN ('$(month_offset "-${PARTITION_HISTORY_MONTHS}")'),"
+  for ((i = -PARTITION_HISTORY_MONTHS; i <= PARTITION_AHEAD_MONTHS; i++)); do
+    start="$(month_offset "$i")"
+    echo "    PARTITION p${start:0:4}${start:5:2} VALUES LESS THAN ('$(month_offset "$((i + 1))")'),"
+  done
+  echo "    PARTITION pfuture VALUES LESS THAN (MAXVALUE)"
+}
+
+render() {
+  awk -v parts="$(monthly_partitions)" '/^[[:space:]]*@MONTHLY_PARTITIONS@[[:space:]]*$/ { print parts; next } { print }' "$1"
+}
+
+sql -e "CREATE TABLE IF NOT EXISTS schema_migrations (
+          version varchar(255) NOT NULL PRIMARY KEY,
+          applied_at timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )"
+
+for file in "$MIGRATIONS_DIR"/*.sql; do
+  version="$(basename "$file")"
+  applied="$(sql -N -e "SELECT COUNT(*) FROM schema_migrations WHERE version = '${version}'")"
+  if [[ "$applied" != "0" ]]; then
+    echo "[SKIP] ${version}"
+    continue
+  fi
+  echo "[INFO] Applying ${version}"
+  render "$file" | sql
+  sql -e "INSERT INTO schema_migrations (version) VALUES ('${version}')"
+done
+
+echo "[OK] Migrations complete."
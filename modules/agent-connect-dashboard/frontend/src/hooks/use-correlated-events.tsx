@@ -1,4 +1,6 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
+import { fetchDelta, mergeRows, newDeltaCursor } from '@/lib/delta';
+import { subscribeStream } from '@/lib/stream';
 
 interface CorrelatedEvent {
   id: string;
@@ -24,25 +26,23 @@ export function useCorrelatedEvents(): CorrelatedEventsData {
     error: null
   });
 
+  const cursor = useRef(newDeltaCursor());
+
   useEffect(() => {
     const fetchCorrelatedEvents = async () => {
       try {
         setData(prev => ({ ...prev, isLoading: true, error: null }));
         
-        const response = await fetch(`http://18.142.200.244:5000/api/correlated-logs?_t=${Date.now()}`);
-        
-        if (!response.ok) {
-          throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        
-        const result = await response.json();
-        const correlatedLogs = Array.isArray(result) ? result : [];
+        const result = await fetchDelta<CorrelatedEvent>('http://18.142.200.244:5000/api/correlated-logs', cursor.current);
         
-        setData({
-          correlatedLogs,
+        // null: nothing new since the last poll (304)
+        setData(prev => ({
+          correlatedLogs: result === null
+            ? prev.correlatedLogs
+            : mergeRows(result, prev.correlatedLogs, event => String(event.id), 50),
           isLoading: false,
           error: null
-        });
+        }));
         
       } catch (error) {
         console.error('Failed to fetch correlated events:', error);
@@ -57,10 +57,18 @@ export function useCorrelatedEvents(): CorrelatedEventsData {
 
     fetchCorrelatedEvents();
     
-    // Refresh data every 30 seconds
-    const interval = setInterval(fetchCorrelatedEvents, 30000);
+    // New correlations are pushed over the live stream; a delta fetch
+    // catches up after a (re)connect or a reset
+    const unsubscribe = [
+      subscribeStream('correlation', (rows: CorrelatedEvent[]) => setData(prev => ({
+        ...prev,
+        correlatedLogs: mergeRows(rows, prev.correlatedLogs, event => String(event.id), 50)
+      }))),
+      subscribeStream('open', fetchCorrelatedEvents),
+      subscribeStream('reset', fetchCorrelatedEvents),
+    ];
     
-    return () => clearInterval(interval);
+    return () => unsubscribe.forEach(stop => stop());
   }, []);
 
   return data;
@@ -1,4 +1,6 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
+import { fetchDelta, mergeRows, newDeltaCursor } from '@/lib/delta';
+import { subscribeStream } from '@/lib/stream';
 
 interface DashboardStats {
   totalLogs: number;
@@ -47,58 +49,65 @@ export function useDashboardData(): DashboardData {
     isAgentConnected: true
   });
 
+  // Logs seen so far; fetches and stream events only bring the rows newer than these
+  const logsRef = useRef<LogEntry[]>([]);
+  const cursor = useRef(newDeltaCursor());
+
   useEffect(() => {
+    // Merge new rows into the logs seen so far and recompute the stats
+    const showLogs = (incoming: LogEntry[]) => {
+      const allLogs = mergeRows(incoming, logsRef.current, log => `${log.source}-${log.id}`);
+      logsRef.current = allLogs;
+      console.log('Processed logs:', allLogs); // Debug log
+      
+      if (allLogs.length > 0) {
+        // Use real data if available
+        const totalLogs = allLogs.length || 0;
+        const criticalAlerts = allLogs.filter(log => log.severity === 'critical').length;
+        const highAlerts = allLogs.filter(log => log.severity === 'high').length;
+        const threatsBlocked = allLogs.length;
+        
+        const recentLogs = allLogs.slice(0, 10);
+
+        console.log('Setting real logs data:', recentLogs); // Debug log
+        setData(prev => ({
+          ...prev,
+          stats: {
+            totalLogs,
+            threatsBlocked,
+            criticalAlerts,
+            activeAgents: '3/3',
+            logsChange: '+12% from yesterday',
+            threatsChange: `${threatsBlocked} blocked today`,
+            alertsChange: `+${criticalAlerts} new alerts`
+          },
+          recentLogs,
+          isLoading: false,
+          error: null,
+          isAgentConnected: true
+        }));
+      } else {
+        console.log('No logs data, setting empty array'); // Debug log
+        setData(prev => ({ 
+          ...prev, 
+          recentLogs: [],
+          isLoading: false 
+        }));
+      }
+    };
+
     const fetchDashboardData = async () => {
       try {
         setData(prev => ({ ...prev, isLoading: true, error: null }));
         
-        const response = await fetch(`http://18.142.200.244:5000/api/logs?_t=${Date.now()}`);
-        
-        if (!response.ok) {
-          throw new Error(`HTTP error! status: ${response.status}`);
+        const result = await fetchDelta<LogEntry>('http://18.142.200.244:5000/api/logs', cursor.current);
+        if (result === null) {
+          // 304: nothing new since the last poll
+          setData(prev => ({ ...prev, isLoading: false }));
+          return;
         }
-        
-        const result = await response.json();
         console.log('Dashboard API response:', result); // Debug log
-        
-        // Process logs data
-        const allLogs = result || [];
-        console.log('Processed logs:', allLogs); // Debug log
-        
-        if (allLogs.length > 0) {
-          // Use real data if available
-          const totalLogs = allLogs.length || 0;
-          const criticalAlerts = allLogs.filter(log => log.severity === 'critical').length;
-          const highAlerts = allLogs.filter(log => log.severity === 'high').length;
-          const threatsBlocked = allLogs.length;
-          
-          const recentLogs = allLogs.slice(0, 10);
-
-          console.log('Setting real logs data:', recentLogs); // Debug log
-          setData(prev => ({
-            ...prev,
-            stats: {
-              totalLogs,
-              threatsBlocked,
-              criticalAlerts,
-              activeAgents: '3/3',
-              logsChange: '+12% from yesterday',
-              threatsChange: `${threatsBlocked} blocked today`,
-              alertsChange: `+${criticalAlerts} new alerts`
-            },
-            recentLogs,
-            isLoading: false,
-            error: null,
-            isAgentConnected: true
-          }));
-        } else {
-          console.log('No logs data, setting empty array'); // Debug log
-          setData(prev => ({ 
-            ...prev, 
-            recentLogs: [],
-            isLoading: false 
-          }));
-        }
+        showLogs(result);
         
       } catch (error) {
         console.error('Failed to fetch dashboard data:', error);
@@ -114,10 +123,16 @@ export function useDashboardData(): DashboardData {
 
     fetchDashboardData();
     
-    // Refresh data every 30 seconds
-    const interval = setInterval(fetchDashboardData, 30000);
+    // /api/logs covers Snort and correlation rows; both arrive over the live
+    // stream. A delta fetch catches up after a (re)connect or a reset.
+    const unsubscribe = [
+      subscribeStream('snort', (rows: LogEntry[]) => showLogs(rows)),
+      subscribeStream('correlation', (rows: LogEntry[]) => showLogs(rows)),
+      subscribeStream('open', fetchDashboardData),
+      subscribeStream('reset', fetchDashboardData),
+    ];
     
-    return () => clearInterval(interval);
+    return () => unsubscribe.forEach(stop => stop());
   }, []);
 
   return data;
@@ -0,0 +1,64 @@
+// Delta polling against the backend fetch endpoints.
+//
+// Each response carries X-Since-Id (newest id seen) and an ETag. The next
+// poll sends them back as ?since_id= and If-None-Match, so the backend
+// answers 304 when nothing is new, or returns only the newer rows, which
+// are merged into what is already on screen.
+
+export interface DeltaCursor {
+  sinceId: string | null;
+  etag: string | null;
+}
+
+export const newDeltaCursor = (): DeltaCursor => ({ sinceId: null, etag: null });
+
+// A burst larger than one response comes in pages (X-Delta-More): keep
+// asking, up to MAX_DELTA_PAGES per call, the rest waits for the next poll.
+const MAX_DELTA_PAGES = 10;
+
+/** Rows newer than the cursor, newest first, or null when nothing changed (304). Updates the cursor. */
+export async function fetchDelta<T>(url: string, cursor: DeltaCursor): Promise<T[] | null> {
+  let rows: T[] | null = null;
+  for (let page = 0; page < MAX_DELTA_PAGES; page++) {
+    const target = new URL(url);
+    if (cursor.sinceId) {
+      target.searchParams.set('since_id', cursor.sinceId);
+    }
+    const headers: Record<string, string> = {};
+    if (cursor.etag) {
+      headers['If-None-Match'] = cursor.etag;
+    }
+
+    const response = await fetch(target.toString(), { headers, cache: 'no-store' });
+    if (response.status === 304) {
+      return rows;
+    }
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    const body = await response.json();
+    cursor.etag = response.headers.get('ETag');
+    cursor.sinceId = response.headers.get('X-Since-Id') ?? cursor.sinceId;
+    // Later pages hold newer rows
+    rows = [...(Array.isArray(body) ? body : []), ...(rows ?? [])];
+    if (!response.headers.get('X-Delta-More')) {
+      break;
+    }
+  }
+  return rows;
+}
+
+/** New rows first, then the current ones; duplicates (by key) dropped, capped at limit. */
+export function mergeRows<T>(incoming: T[], current: T[], key: (row: T) => string, limit = 100): T[] {
+  const seen = new Set<string>();
+  const merged: T[] = [];
+  for (const row of [...incoming, ...current]) {
+    const k = key(row);
+    if (seen.has(k)) continue;
+    seen.add(k);
+    merged.push(row);
+    if (merged.length >= limit) break;
+  }
+  return merged;
+}
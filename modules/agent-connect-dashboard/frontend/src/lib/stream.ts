@@ -0,0 +1,61 @@
+// Live updates from the backend's /api/stream (Server-Sent Events).
+//
+// One EventSource is shared by every subscriber on the page and closed when
+// the last one unsubscribes. Events carry a JSON payload:
+//
+//   snort / wazuh / correlation   new rows, newest first (same shape as the REST endpoints)
+//   counters                      { critical, newest: { table: maxId } }
+//   reset                         missed events are gone; reload over REST
+//
+// 'open' is emitted on every (re)connect, so subscribers can catch up on
+// anything inserted while the stream was down with one delta fetch.
+
+const STREAM_URL = 'http://18.142.200.244:5000/api/stream';
+
+export type StreamEvent = 'snort' | 'wazuh' | 'correlation' | 'counters' | 'reset' | 'open';
+
+type Handler = (data: any) => void;
+
+const SERVER_EVENTS: StreamEvent[] = ['snort', 'wazuh', 'correlation', 'counters', 'reset'];
+
+const handlers = new Map<StreamEvent, Set<Handler>>();
+let source: EventSource | null = null;
+
+function emit(event: StreamEvent, data: any) {
+  handlers.get(event)?.forEach(handler => handler(data));
+}
+
+function connect() {
+  // EventSource reconnects on its own, resuming with Last-Event-ID
+  source = new EventSource(STREAM_URL);
+  source.onopen = () => emit('open', null);
+  for (const event of SERVER_EVENTS) {
+    source.addEventListener(event, (e: MessageEvent) => {
+      try {
+        emit(event, JSON.parse(e.data));
+      } catch (err) {
+        console.warn(`Bad ${event} stream event:`, err);
+      }
+    });
+  }
+}
+
+/** Call handler for every `event`; returns the unsubscribe function. */
+export function subscribeStream(event: StreamEvent, handler: Handler): () => void {
+  if (!handlers.has(event)) {
+    handlers.set(event, new Set());
+  }
+  handlers.get(event)!.add(handler);
+  if (!source) {
+    connect();
+  }
+
+  return () => {
+    handlers.get(event)?.delete(handler);
+    const remaining = [...handlers.values()].some(set => set.size > 0);
+    if (!remaining && source) {
+      source.close();
+      source = null;
+    }
+  };
+}
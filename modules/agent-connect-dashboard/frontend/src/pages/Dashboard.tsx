@@ -6,6 +6,7 @@ import { LogsTable } from "@/components/dashboard/LogsTable";
 import { useDashboardData } from "@/hooks/use-dashboard-data";
 import { useCorrelatedEvents } from "@/hooks/use-correlated-events";
 import { useState, useEffect } from "react";
+import { subscribeStream } from "@/lib/stream";
 import {
   Shield,
   AlertTriangle,
@@ -105,18 +106,22 @@ export default function Dashboard() {
     }
   };
 
-  // Auto-refreshh critical count every 15 seconds, correlated stats every 10 minutes, and active agents every 60 seconds
+  // Critical count is pushed over the live stream (refetched on reconnect); correlated stats refresh every 10 minutes, and active agents every 60 seconds
   useEffect(() => {
     fetchCriticalCount();
     fetchCorrelatedStats();
     fetchActiveCorrelatedAgents();
 
-    const criticalInterval = setInterval(fetchCriticalCount, 15000);
+    const stopCounters = subscribeStream("counters", (counters) =>
+      setCriticalCount(counters.critical || 0)
+    );
+    const stopReconnect = subscribeStream("open", fetchCriticalCount);
     const correlatedInterval = setInterval(fetchCorrelatedStats, 600000); // 10 minutes
     const agentsInterval = setInterval(fetchActiveCorrelatedAgents, 60000); // 60 seconds
 
     return () => {
-      clearInterval(criticalInterval);
+      stopCounters();
+      stopReconnect();
       clearInterval(correlatedInterval);
       clearInterval(agentsInterval);
     };
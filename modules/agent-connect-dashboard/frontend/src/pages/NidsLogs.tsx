@@ -1,9 +1,11 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { DashboardLayout } from '@/components/layout/DashboardLayout';
 import { Button } from '@/components/ui/button';
 import { Badge } from '@/components/ui/badge';
 import { RefreshCw } from 'lucide-react';
 import SeverityDistribution from '@/components/dashboard/SeverityDistribution';
+import { fetchDelta, mergeRows, newDeltaCursor } from '@/lib/delta';
+import { subscribeStream } from '@/lib/stream';
 
 const NIDSLogs = () => {
   const [logs, setLogs] = useState([]);
@@ -12,22 +14,20 @@ const NIDSLogs = () => {
 
   const API_URL = "http://18.142.200.244:5000/api/snort-logs";
 
+  // since_id / ETag of the last poll: only new rows are fetched
+  const cursor = useRef(newDeltaCursor());
+
   const fetchLogs = async () => {
     try {
       setLoading(true);
       setError(null);
-      const response = await fetch(API_URL);
-      
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
+      const data = await fetchDelta(API_URL, cursor.current);
       
-      const data = await response.json();
-      console.log('NIDS API Response:', data); // Debug log
-      if (data.length > 0) {
-        console.log('First NIDS log item:', data[0]); // Debug log
+      // null: nothing new since the last poll (304)
+      if (data && data.length > 0) {
+        console.log('NIDS API Response:', data); // Debug log
+        setLogs(prev => mergeRows(data, prev, log => String(log.id)));
       }
-      setLogs(data);
     } catch (err) {
       setError(err.message);
       console.error('Failed to fetch logs:', err);
@@ -39,10 +39,15 @@ const NIDSLogs = () => {
   useEffect(() => {
     fetchLogs();
     
-    // Auto-refresh every 5 seconds
-    const interval = setInterval(fetchLogs, 5000);
+    // New alerts are pushed over the live stream; after a (re)connect or a
+    // reset, one delta fetch picks up whatever was missed
+    const unsubscribe = [
+      subscribeStream('snort', rows => setLogs(prev => mergeRows(rows, prev, log => String(log.id)))),
+      subscribeStream('open', fetchLogs),
+      subscribeStream('reset', fetchLogs),
+    ];
     
-    return () => clearInterval(interval);
+    return () => unsubscribe.forEach(stop => stop());
   }, []);
 
   const getSeverityColor = (severity) => {
@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 
 import json
-import re
 from datetime import datetime
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 
+from fast_alert import parse_fast_alert
+
 SNORT_FAST_LOG = "/var/log/snort/snort.alert.fast"
 
 class SnortHandler(BaseHTTPRequestHandler):
@@ -53,36 +54,31 @@ class SnortHandler(BaseHTTPRequestHandler):
         return logs
     
     def parse_snort_line(self, line):
-        # Extract timestamp, rule info, IPs
-        timestamp_match = re.search(r'(\d{2}/\d{2}-\d{2}:\d{2}:\d{2}\.\d+)', line)
-        rule_match = re.search(r'\[(\d+):(\d+):(\d+)\]', line)
-        desc_match = re.search(r'\] ([^[]+) \[', line)
-        ip_match = re.search(r'{(\w+)} ([^:]+):(\d+) -> ([^:]+):(\d+)', line)
-        
-        if not all([timestamp_match, rule_match, desc_match, ip_match]):
+        alert = parse_fast_alert(line)
+        if alert is None:
             return None
             
         return {
-            'id': f"snort_{timestamp_match.group(1).replace('/', '').replace('-', '').replace(':', '').replace('.', '')}",
+            'id': f"snort_{alert.timestamp.replace('/', '').replace('-', '').replace(':', '').replace('.', '')}",
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'source_ip': ip_match.group(2),
-            'dest_ip': ip_match.group(4),
-            'source_port': ip_match.group(3),
-            'dest_port': ip_match.group(5),
-            'protocol': ip_match.group(1),
-            'rule_id': f"{rule_match.group(1)}:{rule_match.group(2)}:{rule_match.group(3)}",
-            'description': desc_match.group(1).strip(),
-            'severity': self.determine_severity(line),
+            'source_ip': alert.src_ip,
+            'dest_ip': alert.dst_ip,
+            'source_port': str(alert.src_port) if alert.src_port is not None else None,
+            'dest_port': str(alert.dst_port) if alert.dst_port is not None else None,
+            'protocol': alert.protocol,
+            'rule_id': alert.rule_id,
+            'description': alert.message,
+            'severity': self.determine_severity(alert.priority),
             'event_type': 'Snort IDS',
             'raw_log': line
         }
     
-    def determine_severity(self, line):
-        if 'Priority: 1' in line:
+    def determine_severity(self, priority):
+        if priority == 1:
             return 'critical'
-        elif 'Priority: 2' in line:
+        elif priority == 2:
             return 'high'
-        elif 'Priority: 3' in line:
+        elif priority == 3:
             return 'medium'
         else:
             return 'low'
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: the four ad-hoc Snort line parsers the agents used to have
+vs the shared single-pass parsers.fast_alert.parse_fast_alert.
+
+Usage: python3 benchmarks/bench_fast_alert.py [lines] [snort.alert.fast]
+Without a file, synthetic fast-alert lines are generated.
+"""
+
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from bench_snort_classifier import synth_line  # noqa: E402
+from parsers.fast_alert import parse_fast_alert  # noqa: E402
+from parsers.timestamps import snort_time  # noqa: E402
+
+# ---------- the previous parsers, as they were ----------
+
+def old_snort_push(line):
+    ip_match = re.search(r'(\d+\.\d+\.\d+\.\d+).*-> (\d+\.\d+\.\d+\.\d+)', line)
+    priority_match = re.search(r'Priority: (\d+)', line)
+    return (priority_match.group(1) if priority_match else "3",
+            ip_match.group(1) if ip_match else None, ip_match.group(2) if ip_match else None)
+
+
+OLD_ALERT_REGEX = re.compile(
+    r"\[\*\*\]\s+\[\d+:\d+:\d+\]\s+(.*?)\s+\[\*\*\]\s+"
+    r"\[Classification:\s+(.*?)\]\s+"
+    r"\[Priority:\s+(\d+)\]\s+"
+    r"\{(\w+)\}\s+([\d\.]+):\d+\s+->\s+([\d\.]+):\d+",
+    re.MULTILINE
+)
+
+
+def old_snort_parser(line):
+    m = OLD_ALERT_REGEX.search(line)
+    return m.groups() if m else None
+
+
+def old_snort_server(line):
+    timestamp_match = re.search(r'(\d{2}/\d{2}-\d{2}:\d{2}:\d{2}\.\d+)', line)
+    rule_match = re.search(r'\[(\d+):(\d+):(\d+)\]', line)
+    desc_match = re.search(r'\] ([^[]+) \[', line)
+    ip_match = re.search(r'{(\w+)} ([^:]+):(\d+) -> ([^:]+):(\d+)', line)
+    if not all([timestamp_match, rule_match, desc_match, ip_match]):
+        return None
+    return timestamp_match.group(1), rule_match.groups(), desc_match.group(1).strip(), ip_match.groups()
+
+
+def old_correlate(line):
+    try:
+        ts = line.split(" ")[0:2]
+        t = datetime.strptime(" ".join(ts), "%m/%d-%H:%M:%S.%f").replace(
+            year=datetime.now().year, tzinfo=timezone.utc)
+    except Exception:
+        t = datetime.now(timezone.utc)
+    m = re.search(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", line)
+    return t, m.group(0) if m else None
+
+
+def new_parser(line):
+    return parse_fast_alert(line)
+
+
+def new_parser_with_time(line):
+    alert = parse_fast_alert(line)
+    return alert, snort_time(alert.timestamp) if alert else None
+
+
+def run(name, parse, lines):
+    start = time.perf_counter()
+    parsed = 0
+    for line in lines:
+        if parse(line):
+            parsed += 1
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24} {len(lines) / elapsed:>12,.0f} lines/sec  ({parsed} parsed, {elapsed:.2f}s)")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], "r", errors="replace") as f:
+            lines = [line.rstrip("\n") for line in f][:count]
+    else:
+        rng = random.Random(7)
+        lines = [synth_line(rng).rstrip("\n") for _ in range(count)]
+
+    print(f"{len(lines):,} lines")
+    run("old snort_push", old_snort_push, lines)
+    run("old snort_parser", old_snort_parser, lines)
+    run("old snort_server", old_snort_server, lines)
+    run("old correlate", old_correlate, lines)
+    run("parse_fast_alert", new_parser, lines)
+    run("parse_fast_alert + time", new_parser_with_time, lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: parsers/snort_parser.py on a large fast-alert log.
+
+  full         the old mode: re-parse the whole log, rewrite the JSON array
+  incremental  first run of the new mode (whole log, appended as NDJSON)
+  append       a later run after 1% more lines were logged
+
+Usage: python3 benchmarks/bench_snort_parser.py [lines] [snort.alert.fast]
+Without a file, a synthetic fast-alert log is generated in a temp dir.
+"""
+
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from parsers import snort_parser  # noqa: E402
+
+MESSAGES = [
+    ("GPL CHAT IRC privmsg command", "policy-violation", 3),
+    ("ET POLICY Outbound HTTP request", "misc-activity", 3),
+    ("ICMP PING NMAP", "attempted-recon", 2),
+    ("TCP SYN Port Scan Detected", "attempted-recon", 2),
+    ("SSH Brute Force Attempt", "attempted-admin", 1),
+    ("Web Command Injection Attempt Detected", "web-application-attack", 1),
+]
+WEIGHTS = [60, 30, 3, 3, 2, 2]
+
+
+def synth_line(rng: random.Random) -> str:
+    msg, cls, prio = rng.choices(MESSAGES, WEIGHTS)[0]
+    return (
+        f"12/29-14:{rng.randrange(60):02d}:{rng.randrange(60):02d}.{rng.randrange(10**6):06d}  "
+        f"[**] [1:{rng.randrange(1000000, 1000100)}:1] {msg} [**] "
+        f"[Classification: {cls}] [Priority: {prio}] {{TCP}} "
+        f"10.0.{rng.randrange(256)}.{rng.randrange(256)}:{rng.randrange(1024, 65535)} -> "
+        f"172.21.93.154:{rng.choice([22, 80, 443])}\n"
+    )
+
+
+def write_log(path: str, count: int, rng: random.Random, mode: str = "w") -> None:
+    with open(path, mode) as f:
+        for _ in range(count):
+            f.write(synth_line(rng))
+
+
+def timed(name: str, lines: int, fn) -> None:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12} {lines / elapsed:>12,.0f} lines/sec  ({lines:,} lines, {elapsed:.2f}s)")
+
+
+def full_rewrite() -> None:
+    """What every run used to do."""
+    alerts = snort_parser.parse_snort_logs()
+    with open(snort_parser.OUTPUT_JSON, "w") as f:
+        json.dump(alerts, f, indent=2)
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, "snort.alert.fast")
+        if len(sys.argv) > 2:
+            shutil.copy(sys.argv[2], log)
+            with open(log, "rb") as f:
+                lines = sum(1 for _ in f)
+        else:
+            write_log(log, lines, rng)
+        print(f"{os.path.getsize(log) / 1024 / 1024:.0f} MB fast-alert log, {lines:,} lines")
+
+        snort_parser.SNORT_LOG = log
+        snort_parser.OUTPUT_JSON = os.path.join(tmp, "full.json")
+        timed("full", lines, full_rewrite)
+
+        snort_parser.OUTPUT_JSON = os.path.join(tmp, "snort.json")
+        snort_parser.STATE_FILE = os.path.join(tmp, "state.json")
+        timed("incremental", lines, snort_parser.run)
+
+        extra = max(1, lines // 100)
+        write_log(log, extra, rng, "a")
+        timed("append", extra, snort_parser.run)
+
+        start = time.perf_counter()
+        full_rewrite()
+        print(f"{'':<12} (full re-parse for the same append: {time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
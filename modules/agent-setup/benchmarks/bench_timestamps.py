@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: Snort and Wazuh timestamp parsing, strptime (what the
+correlator used to do per record) vs the sliced, per-second cached
+parsers.timestamps.
+
+Usage: python3 benchmarks/bench_timestamps.py [records]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from parsers.timestamps import snort_time, wazuh_time  # noqa: E402
+
+
+def strptime_snort(ts):
+    return datetime.strptime(f"{datetime.now().year}/{ts}", "%Y/%m/%d-%H:%M:%S.%f").replace(tzinfo=timezone.utc)
+
+
+def strptime_wazuh(ts):
+    return datetime.strptime(ts, "%Y-%m-%dT%H:%M:%S.%f%z")
+
+
+def run(name, parse, values):
+    start = time.perf_counter()
+    for value in values:
+        parse(value)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<18} {len(values) / elapsed:>12,.0f} records/sec  ({elapsed:.2f}s)")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    # ~50 alerts per second, like a busy sensor
+    start = datetime(2025, 12, 31, 23, 50, tzinfo=timezone.utc)
+    stamps = [start + timedelta(microseconds=i * 20_000 + i % 997) for i in range(count)]
+    snort = [t.strftime("%m/%d-%H:%M:%S.%f") for t in stamps]
+    wazuh = [t.strftime("%Y-%m-%dT%H:%M:%S.") + f"{t.microsecond // 1000:03d}+0000" for t in stamps]
+
+    # Sanity: the fast path agrees with strptime (and crosses New Year)
+    now = stamps[-1]
+    for s, w, t in zip(snort[::997], wazuh[::997], stamps[::997]):
+        assert snort_time(s, now) == t, (s, snort_time(s, now), t)
+        assert wazuh_time(w) == strptime_wazuh(w), w
+
+    print(f"{count:,} records")
+    run("strptime snort", strptime_snort, snort)
+    run("snort_time", snort_time, snort)
+    run("strptime wazuh", strptime_wazuh, wazuh)
+    run("wazuh_time", wazuh_time, wazuh)
+
+
+if __name__ == "__main__":
+    main()
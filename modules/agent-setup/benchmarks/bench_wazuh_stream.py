@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark: decoding a large Wazuh feed with resp.json()-style json.loads of
+the whole body vs streaming with iter_json_records.
+
+Reports peak RSS, time until the first alert is classified, and total time.
+Each decoder runs in its own child process so RSS numbers do not mix.
+
+Usage: python3 benchmarks/bench_wazuh_stream.py [size_mb] [array|ndjson]
+"""
+
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+sys.path.insert(0, SCRIPTS)
+
+from correlation.wazuh_classifier import classify_wazuh  # noqa: E402
+from ingest.json_stream import CHUNK_SIZE, iter_json_records  # noqa: E402
+
+RULES = [
+    ("5716", 5, "sshd: authentication failed."),
+    ("5402", 3, "Successful sudo to ROOT executed."),
+    ("200001", 12, "Privilege escalation detected"),
+    ("550", 7, "Integrity checksum changed."),
+]
+
+
+def synth_alert(rng: random.Random, n: int) -> dict:
+    rule_id, level, desc = rng.choice(RULES)
+    return {
+        "timestamp": f"2025-12-04T20:{n // 60 % 60:02d}:{n % 60:02d}.093+0000",
+        "rule": {"level": level, "description": desc, "id": rule_id, "groups": ["syslog", "sshd"]},
+        "agent": {"id": "001", "name": "agent2", "ip": "172.21.93.154"},
+        "manager": {"name": "wazuh-manager"},
+        "id": f"1733343481.{n}",
+        "full_log": f"Dec  4 20:18:01 agent2 sshd[{n}]: Failed password for root from 10.0.{n % 256}.7 port 52144 ssh2",
+        "data": {"srcip": f"10.0.{n % 256}.7", "srcport": "52144"},
+        "location": "/var/log/auth.log",
+    }
+
+
+def write_feed(path: str, size_mb: int, fmt: str) -> None:
+    rng = random.Random(7)
+    limit = size_mb * 1024 * 1024
+    written, n = 0, 0
+    with open(path, "w") as f:
+        if fmt == "array":
+            f.write("[")
+        while written < limit:
+            record = json.dumps(synth_alert(rng, n))
+            if fmt == "array":
+                record = ("," if n else "") + record
+            else:
+                record += "\n"
+            f.write(record)
+            written += len(record)
+            n += 1
+        if fmt == "array":
+            f.write("]")
+
+
+def read_chunks(path: str):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def decode(mode: str, path: str, fmt: str) -> None:
+    start = time.perf_counter()
+    first = None
+    count = 0
+
+    if mode == "json.loads":
+        with open(path, "rb") as f:
+            body = f.read()
+        if fmt == "array":
+            alerts = json.loads(body)
+        else:
+            alerts = [json.loads(line) for line in body.splitlines() if line.strip()]
+        del body
+    else:
+        alerts = iter_json_records(read_chunks(path))
+
+    for alert in alerts:
+        if classify_wazuh(alert) and first is None:
+            first = time.perf_counter() - start
+        count += 1
+
+    total = time.perf_counter() - start
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<12} peak RSS {rss_mb:>8.1f} MB   first alert classified {first * 1000:>9.1f} ms   "
+          f"total {total:>6.2f}s   ({count:,} alerts)")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        decode(*sys.argv[2:5])
+        return
+
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    fmt = sys.argv[2] if len(sys.argv) > 2 else "array"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "alerts.json")
+        write_feed(path, size_mb, fmt)
+        print(f"{os.path.getsize(path) / 1024 / 1024:.0f} MB synthetic {fmt} feed")
+        for mode in ("json.loads", "stream"):
+            subprocess.run([sys.executable, __file__, "--child", mode, path, fmt], check=True)
+
+
+if __name__ == "__main__":
+    main()
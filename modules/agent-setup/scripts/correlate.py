@@ -1,13 +1,23 @@
 #!/usr/bin/env python3
 
 import time
-import json
 import re
 import os
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 
 import requests
 
+from correlation.rules import RuleEngine, load_rules, pretty_time
+from correlation.signatures import load_signatures
+from correlation.wazuh_classifier import classify_wazuh
+from ingest.json_stream import CHUNK_SIZE, iter_json_records
+from ingest.tailer import FileTailer, wait_any
+from ingest.wazuh_feed import WazuhRangeFeed
+from ingest.wazuh_file import WazuhFileFeed, file_url_path
+from output.sink import CorrelationSink, parse_fsync_policy
+from parsers.fast_alert import parse_fast_alert
+from parsers.timestamps import snort_time, wazuh_time
+
 API_ENDPOINT = "http://18.142.200.244:5000/api/correlation"
 API_KEY = "ids_vm_secret_key_123"
 CORRELATOR_AGENT_ID = os.environ.get("AGENT_ID", "vm-correlator-01")
@@ -16,178 +26,88 @@ AGENT_NAME = os.environ.get("AGENT_NAME", "agent2")
 # ---------- CONFIG ----------
 
 SNORT_FAST_LOG = "/var/log/snort/snort.alert.fast"
-WAZUH_ALERTS_URL = "http://47.130.204.203:8001/alerts.json"
+# file:///var/ossec/logs/alerts/alerts.json tails the file directly when the
+# correlator runs on the Wazuh manager (inotify, millisecond latency)
+WAZUH_ALERTS_URL = os.environ.get("WAZUH_ALERTS_URL", "http://47.130.204.203:8001/alerts.json")
 CORRELATION_JSON = "/opt/ids/output/correlation.json"
-# Time windows for correlation
-SCAN_TO_SUDO_WINDOW = timedelta(seconds=180)
-SCAN_TO_SSH_WINDOW = timedelta(seconds=120)
-SSH_FAIL_WINDOW = timedelta(seconds=120)
-PACKAGE_INSTALL_WINDOW = timedelta(seconds=90)
-WEB_TO_PKG_WINDOW = timedelta(seconds=180)
+# fsync correlation.json: "none" (default), "batch", or every N seconds
+CORRELATION_FSYNC = os.environ.get("CORRELATION_FSYNC", "none")
+# How often to log output queue / drop counters (seconds)
+OUTPUT_STATS_INTERVAL = 60
+# Correlation rule table (JSON, or YAML when PyYAML is installed)
+CORRELATION_RULES = os.environ.get(
+    "CORRELATION_RULES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "correlation", "rules.json")
+)
+# Snort signature categories (substrings matched against the rule message)
+SNORT_SIGNATURES = os.environ.get(
+    "SNORT_SIGNATURES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "correlation", "signatures.json")
+)
 
 # How often to poll Wazuh alerts.json (seconds)
 WAZUH_POLL_INTERVAL = 5
+# "full": download all of alerts.json each poll and keep alerts newer than the
+# last timestamp seen. "range": fetch only bytes appended since the last poll
+# (NDJSON alerts.json), cursor persisted in WAZUH_STATE_FILE. Ignored for
+# file:// URLs, which are always tailed incrementally.
+WAZUH_FETCH_MODE = os.environ.get("WAZUH_FETCH_MODE", "full")
+WAZUH_STATE_FILE = os.environ.get("WAZUH_STATE_FILE", "/opt/ids/state/wazuh_feed.json")
 
 
 # ---------- HELPERS ----------
 
-def parse_wazuh_timestamp(ts: str) -> datetime:
-    """
-    Wazuh timestamp example:
-    2025-12-04T20:18:01.093+0000
-    """
-    try:
-        return datetime.strptime(ts, "%Y-%m-%dT%H:%M:%S.%f%z")
-    except Exception:
-        # Fallback: treat as naive UTC
-        return datetime.fromisoformat(ts.replace("Z", "+00:00")).replace(tzinfo=timezone.utc)
-
-
-def parse_snort_time(line: str) -> datetime:
-    """
-    Parse Snort timestamp from fast alert format.
-    Example: 12/29-14:23:45.123456
-    """
-    try:
-        ts = line.split(" ")[0:2]
-        return datetime.strptime(
-            " ".join(ts), "%m/%d-%H:%M:%S.%f"
-        ).replace(year=datetime.now().year, tzinfo=timezone.utc)
-    except Exception:
-        return datetime.now(timezone.utc)
-
-
 def extract_first_ip(text: str) -> str | None:
     """Return first IPv4 addr in text, or None."""
     m = re.search(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", text)
     return m.group(0) if m else None
 
 
-def write_correlation_event(event: dict):
-    """Write correlation event to JSON log file"""
-    try:
-        with open(CORRELATION_JSON, "a") as f:
-            f.write(json.dumps(event) + "\n")
-    except Exception as e:
-        print(f"[ERROR] Failed to write correlation JSON: {e}")
-
-
-def push_correlation_event(event):
-    """Push correlation event to API endpoint"""
-    try:
-        r = requests.post(
-            API_ENDPOINT,
-            json=event,
-            headers={
-                "X-API-Key": API_KEY,
-                "Content-Type": "application/json"
-            },
-            timeout=3
-        )
-        if r.status_code != 200:
-            print(f"[WARN] Correlation push failed: {r.status_code}")
-    except Exception as e:
-        print(f"[ERROR] Correlation push error: {e}")
-
-
-# ---------- SNORT CLASSIFIERS ----------
-
-def is_nmap_scan_snort(line: str) -> bool:
-    """Detect Nmap scans (ICMP, ping sweep)"""
-    up = line.upper()
-    return "NMAP" in up or "PING SWEEP" in up
-
-
-def is_port_scan_snort(line: str) -> bool:
-    """Detect SYN/FIN/Xmas scans - matches YOUR rule messages"""
-    up = line.upper()
-    return (
-        "TCP SYN PORT SCAN" in up or
-        "TCP FIN PORT SCAN" in up or
-        "TCP XMAS PORT SCAN" in up
-    )
-
-
-def is_ssh_bruteforce_snort(line: str) -> bool:
-    """Detect SSH brute force from Snort"""
-    up = line.upper()
-    return "SSH BRUTE FORCE" in up
-
-
-def is_web_attack_snort(line: str) -> bool:
-    """
-    Detect web-based exploit payloads (command injection / web shell)
-    """
-    up = line.upper()
-    return "WEB COMMAND INJECTION ATTEMPT DETECTED" in up
-
-
-# ---------- WAZUH CLASSIFIERS ----------
-
-def is_sudo_or_priv_esc_wazuh(alert: dict) -> bool:
-    """Detect privilege escalation (rule 200001, 200004)"""
-    rule_id = str(alert.get("rule", {}).get("id", ""))
-    desc = alert.get("rule", {}).get("description", "").lower()
-
-    return (
-        rule_id in ["200001", "200004"] or
-        "privilege escalation" in desc or
-        ("sudo" in desc and "root" in desc) or
-        "suspicious privileged modification" in desc
-    )
-
-
-def is_ssh_fail_wazuh(alert: dict) -> bool:
-    """Detect SSH authentication failure (rule 100001, 5716)"""
-    rule_id = str(alert.get("rule", {}).get("id", ""))
-    desc = alert.get("rule", {}).get("description", "").lower()
-
-    return (
-        rule_id in ["100001", "5716"] or
-        ("authentication failed" in desc and "sshd" in desc) or
-        "failed password" in desc
-    )
-
-
-def is_ssh_success_wazuh(alert: dict) -> bool:
-    """Detect successful SSH login (rule 200003)"""
-    rule_id = str(alert.get("rule", {}).get("id", ""))
-    desc = alert.get("rule", {}).get("description", "").lower()
-
-    return (
-        rule_id == "200003" or
-        ("session opened" in desc and "sshd" in desc)
-    )
-
-
-def is_package_install_wazuh(alert: dict) -> bool:
-    """Detect package installation (rule 12002)"""
-    rule_id = str(alert.get("rule", {}).get("id", ""))
-    desc = alert.get("rule", {}).get("description", "").lower()
-
-    return (
-        rule_id == "12002" or
-        "package was installed" in desc or
-        "dpkg" in desc
-    )
-
-
-def is_cron_persistence_wazuh(alert: dict) -> bool:
+def stream_wazuh_alerts(feed: WazuhRangeFeed | WazuhFileFeed | None):
     """
-    Detect cron persistence (local override of rule 2834)
+    Yield Wazuh alerts as they are decoded from the response body (JSON array
+    or NDJSON), without holding the whole body in memory. Fetch errors are
+    logged and end the poll.
     """
-    rule_id = str(alert.get("rule", {}).get("id", ""))
-    desc = alert.get("rule", {}).get("description", "").lower()
-
-    return (
-        rule_id == "2834" or
-        "cron" in desc or
-        "scheduled task" in desc
-    )
-
-
-def pretty_time(dt: datetime) -> str:
-    return dt.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f UTC")
+    try:
+        if feed:
+            yield from feed.poll()  # Only alerts appended since last poll
+        else:
+            with requests.get(WAZUH_ALERTS_URL, stream=True, timeout=3) as resp:
+                resp.raise_for_status()
+                yield from iter_json_records(resp.iter_content(CHUNK_SIZE))
+    except Exception as e:
+        print(f"[WARN] Could not fetch Wazuh alerts: {e}")
+
+
+# ---------- OUTPUT ----------
+
+def emit_correlation(sink: CorrelationSink, event: dict, title: str):
+    """Stamp, queue (file + API, written in the background) and print one correlation event."""
+    event["agent_id"] = CORRELATOR_AGENT_ID
+    event["source"] = "correlation"
+    event["correlated"] = True
+
+    sink.emit(event)
+
+    critical = event["severity"] == "critical"
+    print("\n" + "="*60)
+    print(f"[{'CRITICAL' if critical else 'WARNING'}] CORRELATED {'ATTACK' if critical else 'ACTIVITY'}: {title}")
+    print("="*60)
+    print(f"[*] Correlation ID  : {event['correlation_id']}")
+    if "stage1" in event:
+        print(f"[*] Timeline:")
+        for n, stage in enumerate((event["stage1"], event["stage2"]), 1):
+            where = f"from {stage['src_ip']}" if "src_ip" in stage else f"on {stage['agent']}"
+            print(f"    {n}. {stage['type']:<22}: {stage['time']} {where}")
+            print(f"       {stage.get('snort_alert') or stage.get('wazuh_alert')}")
+        print(f"[*] Time difference : {event['time_difference_seconds']:.1f} seconds")
+    else:
+        for field, value in event.items():
+            if field not in ("correlation_id", "timestamp", "correlation_type", "severity",
+                             "agent_id", "source", "correlated"):
+                print(f"[*] {field:<16}: {value}")
+    print("="*60 + "\n")
 
 
 # ---------- MAIN CORRELATOR ----------
@@ -196,515 +116,130 @@ def main():
     print("[INFO] Starting Enhanced Correlation Engine")
     print(f"       Correlator Agent ID: {CORRELATOR_AGENT_ID}")
     print(f"       Watching Snort log : {SNORT_FAST_LOG}")
-    print(f"       Reading Wazuh JSON: {WAZUH_ALERTS_URL}")
+    print(f"       Reading Wazuh JSON: {WAZUH_ALERTS_URL} "
+          f"({'file' if WAZUH_ALERTS_URL.startswith('file:') else WAZUH_FETCH_MODE})")
     print(f"       Output JSON       : {CORRELATION_JSON}")
     print()
 
-    # State for Snort
-    snort_pos = 0
-    recent_nmap_scans = []      # {time, src_ip, raw}
-    recent_port_scans = []      # {time, src_ip, raw}
-    recent_ssh_bruteforce = []  # {time, src_ip, raw}
-    recent_web_attacks = []     # {time, src_ip, raw} - NEW!
+    # State for Snort: fd stays open, rotation/truncation are followed
+    snort_tailer = FileTailer(SNORT_FAST_LOG, from_end=False)
+
+    # Rules are compiled once into a stage-2 category -> rules dispatch map;
+    # the engine keeps the recent stage-1 events each rule can join against.
+    engine = RuleEngine(load_rules(CORRELATION_RULES))
+    print(f"[INFO] Loaded {len(engine.rules)} correlation rules from {CORRELATION_RULES}")
+
+    # All Snort signatures compiled into one matcher, one pass per line
+    signatures = load_signatures(SNORT_SIGNATURES)
 
     # State for Wazuh
     last_wazuh_ts = datetime.min.replace(tzinfo=timezone.utc)
-    recent_ssh_fails = []       # list of {time, src_ip}
-    recent_priv_esc = []        # list of {time, agent, desc}
-    recent_cron_persistence = [] # list of {time, agent, desc}
+    wazuh_feed = None
+    wazuh_path = file_url_path(WAZUH_ALERTS_URL)
+    if wazuh_path:
+        wazuh_feed = WazuhFileFeed(wazuh_path, WAZUH_STATE_FILE)
+    elif WAZUH_FETCH_MODE == "range":
+        wazuh_feed = WazuhRangeFeed(WAZUH_ALERTS_URL, WAZUH_STATE_FILE)
 
     last_wazuh_poll = 0
 
-    while True:
-        now = datetime.now(timezone.utc)
-
-        # ----- 1) Read new Snort alerts (tail) -----
-        try:
-            with open(SNORT_FAST_LOG, "r", errors="ignore") as f:
-                f.seek(snort_pos)
-                new_lines = f.readlines()
-                snort_pos = f.tell()
-        except FileNotFoundError:
-            new_lines = []
-
-        for line in new_lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            src_ip = extract_first_ip(line) or "unknown"
-            event = {
-                "time": parse_snort_time(line),
-                "src_ip": src_ip,
-                "raw": line,
-            }
-
-            # Classify Snort alerts
-            if is_nmap_scan_snort(line):
-                recent_nmap_scans.append(event)
-                print("\n[SNORT] Detected Nmap/ICMP scan:")
-                print(f"  Time : {pretty_time(event['time'])}")
-                print(f"  SrcIP: {event['src_ip']}")
-                print(f"  Raw  : {event['raw']}")
+    # File writes and API pushes happen on background threads
+    sink = CorrelationSink(CORRELATION_JSON, API_ENDPOINT, API_KEY,
+                           fsync_interval=parse_fsync_policy(CORRELATION_FSYNC))
+    last_stats = time.time()
 
-            elif is_port_scan_snort(line):
-                recent_port_scans.append(event)
-                print("\n[SNORT] Detected port scan (SYN/FIN/Xmas):")
-                print(f"  Time : {pretty_time(event['time'])}")
-                print(f"  SrcIP: {event['src_ip']}")
-                print(f"  Raw  : {event['raw']}")
+    try:
+        while True:
+            now = datetime.now(timezone.utc)
 
-            elif is_ssh_bruteforce_snort(line):
-                recent_ssh_bruteforce.append(event)
-                print("\n[SNORT] Detected SSH brute force:")
-                print(f"  Time : {pretty_time(event['time'])}")
-                print(f"  SrcIP: {event['src_ip']}")
-                print(f"  Raw  : {event['raw']}")
+            # ----- 1) Read new Snort alerts (tail) -----
+            for line in snort_tailer.read_lines():
+                line = line.strip()
+                if not line:
+                    continue
+
+                # Classify Snort alerts (a line may hit several categories)
+                categories = signatures.classify(line)
+                if not categories:
+                    continue
+
+                alert = parse_fast_alert(line)
+                event = {
+                    "time": snort_time(alert.timestamp, now) if alert else now,
+                    "src_ip": (alert.src_ip if alert else extract_first_ip(line)) or "unknown",
+                    "raw": line,
+                }
+                for category in categories:
+                    engine.record(category, event)
 
-            elif is_web_attack_snort(line):
-                recent_web_attacks.append(event)
-                print("\n[SNORT] Detected Web Command Injection:")
+                print(f"\n[SNORT] Detected {', '.join(signatures.labels[c] for c in categories)}:")
                 print(f"  Time : {pretty_time(event['time'])}")
                 print(f"  SrcIP: {event['src_ip']}")
                 print(f"  Raw  : {event['raw']}")
 
-        # Remove old Snort events
-        max_window = max(SCAN_TO_SUDO_WINDOW, SCAN_TO_SSH_WINDOW, SSH_FAIL_WINDOW, PACKAGE_INSTALL_WINDOW, WEB_TO_PKG_WINDOW)
-        cutoff = now - max_window
-        recent_nmap_scans = [e for e in recent_nmap_scans if e["time"] >= cutoff]
-        recent_port_scans = [e for e in recent_port_scans if e["time"] >= cutoff]
-        recent_ssh_bruteforce = [e for e in recent_ssh_bruteforce if e["time"] >= cutoff]
-        recent_web_attacks = [e for e in recent_web_attacks if e["time"] >= cutoff]
-
-        # ----- 2) Periodically pull new Wazuh alerts -----
-        if (now - datetime.fromtimestamp(last_wazuh_poll, tz=timezone.utc)).total_seconds() >= WAZUH_POLL_INTERVAL:
-            last_wazuh_poll = time.time()
-            try:
-                resp = requests.get(WAZUH_ALERTS_URL, timeout=3)
-                resp.raise_for_status()
-                body = resp.json()  # Directly parse JSON response
-            except Exception as e:
-                print(f"[WARN] Could not fetch Wazuh alerts: {e}")
-                body = []
+            # Remove old events (amortized O(1) per event)
+            engine.expire(now)
 
-            max_ts_seen = last_wazuh_ts
+            # ----- 2) Pull new Wazuh alerts (local file: every pass) -----
+            if wazuh_path or (now - datetime.fromtimestamp(last_wazuh_poll, tz=timezone.utc)).total_seconds() >= WAZUH_POLL_INTERVAL:
+                last_wazuh_poll = time.time()
+                max_ts_seen = last_wazuh_ts
 
-            for alert in body:  # Iterate over each alert in the list
+                # Each alert is classified and correlated as soon as it is decoded
+                for alert in stream_wazuh_alerts(wazuh_feed):
 
-                ts_str = alert.get("timestamp")
-                if not ts_str:
-                    continue
+                    ts_str = alert.get("timestamp")
+                    if not ts_str:
+                        continue
 
-                ts = parse_wazuh_timestamp(ts_str)
+                    ts = wazuh_time(ts_str)
 
-                # Only process new alerts
-                if ts <= last_wazuh_ts:
-                    continue
+                    # Only process new alerts (full mode re-sends the whole file)
+                    if wazuh_feed is None and ts <= last_wazuh_ts:
+                        continue
 
-                if ts > max_ts_seen:
-                    max_ts_seen = ts
+                    if ts > max_ts_seen:
+                        max_ts_seen = ts
 
-                # Improved source IP extraction
-                agent_name = alert.get("agent", {}).get("name", "unknown")
-                rule_desc = alert.get("rule", {}).get("description", "")
-                src_ip = (
-                    alert.get("data", {}).get("srcip") or
-                    extract_first_ip(alert.get("full_log", "")) or
-                    "unknown"
-                )
-
-                # --- CORRELATION LOGIC ---
-
-                # CORRELATION 1: Nmap/Port Scan → Privilege Escalation
-                if is_sudo_or_priv_esc_wazuh(alert):
-                    recent_priv_esc.append({
-                        "time": ts,
-                        "agent": agent_name,
-                        "desc": rule_desc
-                    })
-
-                    # CORRELATION 1A: Web Attack → Privilege Escalation (NEW!)
-                    for web in recent_web_attacks[:]:
-                        if (web["src_ip"] == src_ip or src_ip == "unknown") and \
-                           abs((ts - web["time"]).total_seconds()) <= SCAN_TO_SUDO_WINDOW.total_seconds():
-
-                            correlation_event = {
-                                "correlation_id": f"CORR-{int(time.time()*1000)}",
-                                "timestamp": pretty_time(now),
-                                "correlation_type": "WEB_ATTACK_TO_PRIVILEGE_ESCALATION",
-                                "severity": "critical",
-                                "agent_id": CORRELATOR_AGENT_ID,
-                                "stage1": {
-                                    "type": "web_command_injection",
-                                    "time": pretty_time(web["time"]),
-                                    "src_ip": web["src_ip"],
-                                    "snort_alert": web["raw"]
-                                },
-                                "stage2": {
-                                    "type": "privilege_escalation",
-                                    "time": pretty_time(ts),
-                                    "agent": agent_name,
-                                    "wazuh_alert": rule_desc
-                                },
-                                "time_difference_seconds": abs((ts - web["time"]).total_seconds()),
-                                "source": "correlation",
-                                "correlated": True
-                            }
-
-                            write_correlation_event(correlation_event)
-                            push_correlation_event(correlation_event)
-
-                            print("\n" + "="*60)
-                            print("[CRITICAL] CORRELATED ATTACK:")
-                            print("WEB COMMAND INJECTION → PRIVILEGE ESCALATION")
-                            print("="*60)
-                            print(f"[*] Correlation ID  : {correlation_event['correlation_id']}")
-                            print(f"[*] Attack Timeline:")
-                            print(f"    1. Web injection  : {pretty_time(web['time'])} from {web['src_ip']}")
-                            print(f"    2. Priv escalation: {pretty_time(ts)} on {agent_name}")
-                            print(f"[*] Time difference : {abs((ts - web['time']).total_seconds()):.1f} seconds")
-                            print(f"[*] Snort Alert     : {web['raw']}")
-                            print(f"[*] Wazuh Alert     : {rule_desc}")
-                            print("="*60 + "\n")
-
-                            recent_web_attacks.remove(web)
-                            break
-
-                    # CORRELATION 1B: Nmap Scan → Privilege Escalation
-                    for scan in recent_nmap_scans[:]:
-                        if (scan["src_ip"] == src_ip or src_ip == "unknown") and \
-                           abs((ts - scan["time"]).total_seconds()) <= SCAN_TO_SUDO_WINDOW.total_seconds():
-                            correlation_event = {
-                                "correlation_id": f"CORR-{int(time.time()*1000)}",
-                                "timestamp": pretty_time(now),
-                                "correlation_type": "NMAP_SCAN_TO_PRIV_ESC",
-                                "severity": "critical",
-                                "agent_id": CORRELATOR_AGENT_ID,
-                                "stage1": {
-                                    "type": "nmap_scan",
-                                    "time": pretty_time(scan['time']),
-                                    "src_ip": scan['src_ip'],
-                                    "snort_alert": scan['raw']
-                                },
-                                "stage2": {
-                                    "type": "privilege_escalation",
-                                    "time": pretty_time(ts),
-                                    "agent": agent_name,
-                                    "wazuh_alert": rule_desc
-                                },
-                                "time_difference_seconds": abs((ts - scan['time']).total_seconds()),
-                                "source": "correlation",
-                                "correlated": True
-                            }
-
-                            write_correlation_event(correlation_event)
-                            push_correlation_event(correlation_event)
-
-                            print("\n" + "="*60)
-                            print("[CRITICAL] CORRELATED ATTACK: NMAP SCAN → PRIVILEGE ESCALATION")
-                            print("="*60)
-                            print(f"[*] Correlation ID  : {correlation_event['correlation_id']}")
-                            print(f"[*] Attack Timeline:")
-                            print(f"    1. Nmap scan    : {pretty_time(scan['time'])} from {scan['src_ip']}")
-                            print(f"    2. Priv escalation: {pretty_time(ts)} on {agent_name}")
-                            print(f"[*] Time difference : {abs((ts - scan['time']).total_seconds()):.1f} seconds")
-                            print(f"[*] Snort Alert     : {scan['raw']}")
-                            print(f"[*] Wazuh Alert     : {rule_desc}")
-                            print("="*60 + "\n")
-
-                            recent_nmap_scans.remove(scan)
-                            break
-
-                    # CORRELATION 1C: Port Scan → Privilege Escalation
-                    for scan in recent_port_scans[:]:
-                        if (scan["src_ip"] == src_ip or src_ip == "unknown") and \
-                           abs((ts - scan["time"]).total_seconds()) <= SCAN_TO_SUDO_WINDOW.total_seconds():
-                            correlation_event = {
-                                "correlation_id": f"CORR-{int(time.time()*1000)}",
-                                "timestamp": pretty_time(now),
-                                "correlation_type": "PORT_SCAN_TO_PRIV_ESC",
-                                "severity": "critical",
-                                "agent_id": CORRELATOR_AGENT_ID,
-                                "stage1": {
-                                    "type": "port_scan",
-                                    "time": pretty_time(scan['time']),
-                                    "src_ip": scan['src_ip'],
-                                    "snort_alert": scan['raw']
-                                },
-                                "stage2": {
-                                    "type": "privilege_escalation",
-                                    "time": pretty_time(ts),
-                                    "agent": agent_name,
-                                    "wazuh_alert": rule_desc
-                                },
-                                "time_difference_seconds": abs((ts - scan['time']).total_seconds()),
-                                "source": "correlation",
-                                "correlated": True
-                            }
-
-                            write_correlation_event(correlation_event)
-                            push_correlation_event(correlation_event)
-
-                            print("\n" + "="*60)
-                            print("[CRITICAL] CORRELATED ATTACK: PORT SCAN → PRIVILEGE ESCALATION")
-                            print("="*60)
-                            print(f"[*] Correlation ID  : {correlation_event['correlation_id']}")
-                            print(f"[*] Attack Timeline:")
-                            print(f"    1. Port scan    : {pretty_time(scan['time'])} from {scan['src_ip']}")
-                            print(f"    2. Priv escalation: {pretty_time(ts)} on {agent_name}")
-                            print(f"[*] Time difference : {abs((ts - scan['time']).total_seconds()):.1f} seconds")
-                            print(f"[*] Snort Alert     : {scan['raw']}")
-                            print(f"[*] Wazuh Alert     : {rule_desc}")
-                            print("="*60 + "\n")
-
-                            recent_port_scans.remove(scan)
-                            break
-
-                # CORRELATION 2: SSH Brute Force (Snort + Wazuh) → Success
-                if is_ssh_fail_wazuh(alert):
-                    recent_ssh_fails.append({"time": ts, "src_ip": src_ip})
-
-                    # Correlate: Snort SSH brute force + Wazuh SSH failure
-                    snort_bruteforce = [
-                        b for b in recent_ssh_bruteforce
-                        if (b["src_ip"] == src_ip or src_ip == "unknown") and
-                           (ts - b["time"]) <= SSH_FAIL_WINDOW
-                    ]
-
-                    if snort_bruteforce:
-                        correlation_event = {
-                            "correlation_id": f"CORR-{int(time.time()*1000)}",
-                            "timestamp": pretty_time(now),
-                            "correlation_type": "SSH_BRUTEFORCE_WITH_FAILURE",
-                            "severity": "warning",
-                            "agent_id": CORRELATOR_AGENT_ID,
-                            "failed_attempt_time": pretty_time(ts),
-                            "src_ip": src_ip,
-                            "snort_alert": snort_bruteforce[0]["raw"],
-                            "wazuh_alert": rule_desc,
-                            "source": "correlation",
-                            "correlated": True
-                        }
-
-                        write_correlation_event(correlation_event)
-                        push_correlation_event(correlation_event)
-
-                        print("\n" + "="*60)
-                        print("[WARNING] CORRELATED ACTIVITY: SSH BRUTE FORCE → SSH FAILURE")
-                        print("="*60)
-                        print(f"[*] Src IP      : {src_ip}")
-                        print(f"[*] Snort Alert : {snort_bruteforce[0]['raw']}")
-                        print(f"[*] Wazuh Alert : {rule_desc}")
-                        print("="*60 + "\n")
-
-                        recent_ssh_bruteforce.remove(snort_bruteforce[0])
-                        recent_ssh_fails.clear()
-
-                if is_ssh_success_wazuh(alert):
-                    # Filter SSH failures by same IP
-                    recent_ssh_fails[:] = [
-                        f for f in recent_ssh_fails
-                        if f["src_ip"] == src_ip and (ts - f["time"]) <= SSH_FAIL_WINDOW
-                    ]
-
-                    # Check Snort SSH brute force
-                    snort_bruteforce = [
-                        b for b in recent_ssh_bruteforce
-                        if ((b["src_ip"] == src_ip or src_ip == "unknown") and
-                            (ts - b["time"]) <= SCAN_TO_SSH_WINDOW)
-                    ]
-
-                    if len(recent_ssh_fails) >= 3 or snort_bruteforce:
-                        correlation_event = {
-                            "correlation_id": f"CORR-{int(time.time()*1000)}",
-                            "timestamp": pretty_time(now),
-                            "correlation_type": "SSH_BRUTEFORCE_TO_SUCCESS",
-                            "severity": "critical",
-                            "agent_id": CORRELATOR_AGENT_ID,
-                            "failed_attempts": len(recent_ssh_fails),
-                            "snort_detections": len(snort_bruteforce),
-                            "successful_login": {
-                                "time": pretty_time(ts),
-                                "agent": agent_name,
-                                "wazuh_alert": rule_desc
-                            },
-                            "source": "correlation",
-                            "correlated": True
-                        }
-                        if snort_bruteforce:
-                            correlation_event["snort_alert"] = snort_bruteforce[0]['raw']
-
-                        write_correlation_event(correlation_event)
-                        push_correlation_event(correlation_event)
-
-                        print("\n" + "="*60)
-                        print("[CRITICAL] CORRELATED ATTACK: SSH BRUTE FORCE → SUCCESS")
-                        print("="*60)
-                        print(f"[*] Correlation ID  : {correlation_event['correlation_id']}")
-                        print(f"[*] Successful login: {pretty_time(ts)} on {agent_name}")
-                        print(f"[*] Failed attempts (Wazuh): {len(recent_ssh_fails)}")
-                        print(f"[*] Snort detections: {len(snort_bruteforce)}")
-                        if snort_bruteforce:
-                            print(f"[*] Snort alert: {snort_bruteforce[0]['raw']}")
-                        print(f"[*] Wazuh alert: {rule_desc}")
-                        print("="*60 + "\n")
-
-                        recent_ssh_fails.clear()
-                        recent_ssh_bruteforce.clear()
-
-                # CORRELATION 4: Privilege Escalation → Package Install
-                if is_package_install_wazuh(alert):
-                    # CORRELATION 4A: Priv Esc → Package Install
-                    for priv in recent_priv_esc[:]:
-                        if abs((ts - priv["time"]).total_seconds()) <= PACKAGE_INSTALL_WINDOW.total_seconds():
-                            correlation_event = {
-                                "correlation_id": f"CORR-{int(time.time()*1000)}",
-                                "timestamp": pretty_time(now),
-                                "correlation_type": "PRIV_ESC_TO_PACKAGE_INSTALL",
-                                "severity": "warning",
-                                "agent_id": CORRELATOR_AGENT_ID,
-                                "stage1": {
-                                    "type": "privilege_escalation",
-                                    "time": pretty_time(priv['time']),
-                                    "agent": priv['agent'],
-                                    "wazuh_alert": priv['desc']
-                                },
-                                "stage2": {
-                                    "type": "package_installation",
-                                    "time": pretty_time(ts),
-                                    "agent": agent_name,
-                                    "wazuh_alert": rule_desc
-                                },
-                                "time_difference_seconds": abs((ts - priv['time']).total_seconds()),
-                                "source": "correlation",
-                                "correlated": True
-                            }
-
-                            write_correlation_event(correlation_event)
-                            push_correlation_event(correlation_event)
-
-                            print("\n" + "="*60)
-                            print("[WARNING] CORRELATED ACTIVITY: PRIV ESC → PACKAGE INSTALL")
-                            print("="*60)
-                            print(f"[*] Correlation ID  : {correlation_event['correlation_id']}")
-                            print(f"[*] Activity Timeline:")
-                            print(f"    1. Privilege escalation: {pretty_time(priv['time'])} on {priv['agent']}")
-                            print(f"    2. Package installation: {pretty_time(ts)} on {agent_name}")
-                            print(f"[*] Time difference: {abs((ts - priv['time']).total_seconds()):.1f} seconds")
-                            print(f"[*] Priv esc alert : {priv['desc']}")
-                            print(f"[*] Package alert  : {rule_desc}")
-                            print("="*60 + "\n")
-
-                            recent_priv_esc.remove(priv)
-                            break
-
-                    # CORRELATION 4B: Web Command Injection → Package Install
-                    for web in recent_web_attacks[:]:
-                        if (web["src_ip"] == src_ip or src_ip == "unknown") and \
-                           abs((ts - web["time"]).total_seconds()) <= WEB_TO_PKG_WINDOW.total_seconds():
-
-                            correlation_event = {
-                                "correlation_id": f"CORR-{int(time.time()*1000)}",
-                                "timestamp": pretty_time(now),
-                                "correlation_type": "WEB_ATTACK_TO_PACKAGE_INSTALL",
-                                "severity": "critical",
-                                "agent_id": CORRELATOR_AGENT_ID,
-                                "stage1": {
-                                    "type": "web_command_injection",
-                                    "time": pretty_time(web["time"]),
-                                    "src_ip": web["src_ip"],
-                                    "snort_alert": web["raw"]
-                                },
-                                "stage2": {
-                                    "type": "package_installation",
-                                    "time": pretty_time(ts),
-                                    "agent": agent_name,
-                                    "wazuh_alert": rule_desc
-                                },
-                                "time_difference_seconds": abs((ts - web["time"]).total_seconds()),
-                                "source": "correlation",
-                                "correlated": True
-                            }
-
-                            write_correlation_event(correlation_event)
-                            push_correlation_event(correlation_event)
-
-                            print("\n" + "="*60)
-                            print("[CRITICAL] CORRELATED ATTACK:")
-                            print("WEB COMMAND INJECTION → PACKAGE INSTALLATION")
-                            print("="*60)
-                            print(f"[*] Correlation ID  : {correlation_event['correlation_id']}")
-                            print(f"[*] Attack Timeline:")
-                            print(f"    1. Web injection  : {pretty_time(web['time'])} from {web['src_ip']}")
-                            print(f"    2. Package install: {pretty_time(ts)} on {agent_name}")
-                            print(f"[*] Time difference : {abs((ts - web['time']).total_seconds()):.1f} seconds")
-                            print(f"[*] Snort Alert     : {web['raw']}")
-                            print(f"[*] Wazuh Alert     : {rule_desc}")
-                            print("="*60 + "\n")
-
-                            recent_web_attacks.remove(web)
-                            break
-
-                # CORRELATION 5: Network Recon → Cron Persistence
-                if is_cron_persistence_wazuh(alert):
-
-                    recent_cron_persistence.append({
+                    # Improved source IP extraction
+                    agent_name = alert.get("agent", {}).get("name", "unknown")
+                    rule_desc = alert.get("rule", {}).get("description", "")
+                    src_ip = (
+                        alert.get("data", {}).get("srcip") or
+                        extract_first_ip(alert.get("full_log", "")) or
+                        "unknown"
+                    )
+                    event = {
                         "time": ts,
+                        "src_ip": src_ip,
                         "agent": agent_name,
-                        "desc": rule_desc
-                    })
-
-                    # Check for prior Nmap scan OR port scan
-                    for scan in (recent_nmap_scans + recent_port_scans):
-                        if abs((ts - scan["time"]).total_seconds()) <= SCAN_TO_SUDO_WINDOW.total_seconds():
-
-                            correlation_event = {
-                                "correlation_id": f"CORR-{int(time.time()*1000)}",
-                                "timestamp": pretty_time(now),
-                                "correlation_type": "RECON_TO_CRON_PERSISTENCE",
-                                "severity": "critical",
-                                "agent_id": CORRELATOR_AGENT_ID,
-                                "stage1": {
-                                    "type": "network_scan",
-                                    "time": pretty_time(scan["time"]),
-                                    "src_ip": scan["src_ip"],
-                                    "snort_alert": scan["raw"]
-                                },
-                                "stage2": {
-                                    "type": "cron_persistence",
-                                    "time": pretty_time(ts),
-                                    "agent": agent_name,
-                                    "wazuh_alert": rule_desc
-                                },
-                                "time_difference_seconds": abs((ts - scan["time"]).total_seconds()),
-                                "source": "correlation",
-                                "correlated": True
-                            }
-
-                            write_correlation_event(correlation_event)
-                            push_correlation_event(correlation_event)
-
-                            print("\n" + "="*60)
-                            print("[CRITICAL] CORRELATED ATTACK:")
-                            print("NETWORK SCAN → CRON PERSISTENCE")
-                            print("="*60)
-                            print(f"[*] Correlation ID : {correlation_event['correlation_id']}")
-                            print(f"[*] Attack Timeline:")
-                            print(f"    1. Network scan : {pretty_time(scan['time'])} from {scan['src_ip']}")
-                            print(f"    2. Cron modify  : {pretty_time(ts)} on {agent_name}")
-                            print(f"[*] Time difference: {abs((ts - scan['time']).total_seconds()):.1f} seconds")
-                            print(f"[*] Scan alert     : {scan['raw']}")
-                            print(f"[*] Cron alert     : {rule_desc}")
-                            print("="*60 + "\n")
-
-                            # Clear both scan lists to prevent duplicate correlations
-                            recent_port_scans.clear()
-                            recent_nmap_scans.clear()
-                            break
-
-            last_wazuh_ts = max_ts_seen
-
-        time.sleep(1)
+                        "desc": rule_desc,
+                    }
+
+                    # --- CORRELATION LOGIC ---
+                    # Only the rules completed by this alert's categories run
+                    for category in classify_wazuh(alert):
+                        engine.record(category, event)
+                        for match in engine.evaluate(category, event, now):
+                            emit_correlation(sink, engine.build(match), match.rule.title)
+
+                last_wazuh_ts = max_ts_seen
+
+            # Back-pressure: queue depth and drops of the background output
+            if time.time() - last_stats >= OUTPUT_STATS_INTERVAL:
+                last_stats = time.time()
+                stats = sink.stats()
+                if stats["write_dropped"] or stats["send_dropped"] or stats.get("send_queue"):
+                    print(f"[WARN] Output backlog: {stats}")
+
+            # Wake as soon as Snort (or a local alerts.json) is written to; the
+            # timeout keeps HTTP polling and window expiry going when idle
+            tailers = [snort_tailer] + ([wazuh_feed.tailer] if wazuh_path else [])
+            wait_any(tailers, 1.0)
+    finally:
+        print("[INFO] Flushing correlation output...")
+        sink.close()
+        print(f"[INFO] Output stats: {sink.stats()}")
 
 
 if __name__ == "__main__":
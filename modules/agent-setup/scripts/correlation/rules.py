@@ -0,0 +1,279 @@
+"""
+Declarative correlation rules.
+
+A rule joins one or more stage-1 categories (Snort or Wazuh events held in
+the WindowStore) with a stage-2 Wazuh category. The rule table is loaded
+from JSON (or YAML when PyYAML is installed) and compiled into a dispatch
+map, so each Wazuh alert only evaluates the rules its categories complete.
+
+Rule fields:
+    name        correlation_type written to the event
+    title       banner text for the console
+    stage1      list of categories, any of which may satisfy the rule
+    stage2      Wazuh category that triggers evaluation
+    join        "src_ip", "agent" or "any"
+    window      seconds either side of the stage-2 alert
+    severity    severity written to the event
+    min_count   optional {category: n} thresholds (default 1)
+    exact       stage-1 categories joined on the exact value: a stage-2
+                alert without one (no source IP) only counts events without
+                one, instead of events of any source (default none)
+    consume     mark the matched stage-1 event as used (default true)
+    clear       categories to empty after a match
+    event       event builder name (default "sequence")
+"""
+
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from correlation.window_store import WindowStore
+
+JOIN_KEYS = ("src_ip", "agent", "any")
+
+# Labels used for stage1/stage2 "type" in correlation events
+CATEGORY_TYPES = {
+    "nmap_scan": "nmap_scan",
+    "port_scan": "port_scan",
+    "ssh_bruteforce": "ssh_bruteforce",
+    "web_attack": "web_command_injection",
+    "priv_esc": "privilege_escalation",
+    "ssh_fail": "ssh_failure",
+    "ssh_success": "ssh_success",
+    "package_install": "package_installation",
+    "cron_persistence": "cron_persistence",
+}
+
+
+def pretty_time(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f UTC")
+
+
+# ---------- RULE LOADING ----------
+
+class Rule:
+    def __init__(self, spec: dict):
+        missing = [k for k in ("name", "stage1", "stage2", "window") if k not in spec]
+        if missing:
+            raise ValueError(f"rule {spec.get('name', '?')}: missing {', '.join(missing)}")
+
+        self.name = spec["name"]
+        self.title = spec.get("title", self.name.replace("_", " "))
+        self.stage1 = list(spec["stage1"])
+        self.stage2 = spec["stage2"]
+        self.join = spec.get("join", "src_ip")
+        self.window = timedelta(seconds=float(spec["window"]))
+        self.severity = spec.get("severity", "warning")
+        self.min_count = dict(spec.get("min_count", {}))
+        self.exact = list(spec.get("exact", []))
+        self.consume = bool(spec.get("consume", True))
+        self.clear = list(spec.get("clear", []))
+        self.stage1_type = spec.get("stage1_type")
+        self.stage2_type = spec.get("stage2_type") or CATEGORY_TYPES.get(self.stage2, self.stage2)
+        self.event = spec.get("event", "sequence")
+
+        if self.join not in JOIN_KEYS:
+            raise ValueError(f"rule {self.name}: join must be one of {JOIN_KEYS}")
+        if self.event not in EVENT_BUILDERS:
+            raise ValueError(f"rule {self.name}: unknown event builder {self.event!r}")
+        if self.exact and self.join == "any":
+            raise ValueError(f"rule {self.name}: exact needs a src_ip or agent join")
+
+
+def load_rules(path: str) -> list[Rule]:
+    """Read a rule table from a .json or .yaml/.yml file."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("PyYAML is required for YAML rule files")
+            specs = yaml.safe_load(f)
+        else:
+            specs = json.load(f)
+
+    return [Rule(spec) for spec in specs or []]
+
+
+# ---------- MATCHING ----------
+
+class Match:
+    """A satisfied rule: the stage-2 alert plus what it joined against."""
+
+    def __init__(self, engine, rule: Rule, alert: dict, first: dict | None, now: datetime):
+        self._engine = engine
+        self.rule = rule
+        self.alert = alert
+        self.first = first
+        self.now = now
+
+    def latest(self, category: str) -> dict | None:
+        ts = self.alert["time"]
+        return self._engine.store.latest(
+            self._engine.slot(category, self.rule.join), _join_key(self.rule, category, self.alert),
+            ts - self.rule.window, ts + self.rule.window
+        )
+
+    def count(self, category: str) -> int:
+        ts = self.alert["time"]
+        return self._engine.store.count(
+            self._engine.slot(category, self.rule.join), _join_key(self.rule, category, self.alert),
+            ts - self.rule.window, ts + self.rule.window
+        )
+
+
+class RuleEngine:
+    def __init__(self, rules: list[Rule]):
+        self.rules = rules
+
+        # stage-2 category -> rules it can complete
+        self.dispatch = {}
+        # stage-1 category -> join keys it must be indexed by
+        self.indexes = {}
+        for rule in rules:
+            self.dispatch.setdefault(rule.stage2, []).append(rule)
+            for category in rule.stage1:
+                joins = self.indexes.setdefault(category, [])
+                if _index_field(rule.join) not in joins:
+                    joins.append(_index_field(rule.join))
+
+        horizon = max((r.window for r in rules), default=timedelta(0))
+        self.store = WindowStore(horizon)
+
+    @staticmethod
+    def slot(category: str, join: str) -> str:
+        return f"{category}:{_index_field(join)}"
+
+    def record(self, category: str, event: dict) -> None:
+        """Keep an event if any rule uses its category as stage 1."""
+        for field in self.indexes.get(category, ()):
+            # Each slot gets its own copy; the store tags events in place
+            self.store.add(f"{category}:{field}", event.get(field) or "unknown",
+                           dict(event, category=category))
+
+    def expire(self, now: datetime) -> None:
+        self.store.expire(now)
+
+    def evaluate(self, category: str, alert: dict, now: datetime) -> list[Match]:
+        """Run every rule triggered by a stage-2 alert of this category."""
+        matches = []
+        for rule in self.dispatch.get(category, ()):
+            match = self._evaluate(rule, alert, now)
+            if match:
+                matches.append(match)
+        return matches
+
+    def _evaluate(self, rule: Rule, alert: dict, now: datetime) -> Match | None:
+        start, end = alert["time"] - rule.window, alert["time"] + rule.window
+
+        first = None
+        satisfied = False
+        for category in rule.stage1:
+            slot = self.slot(category, rule.join)
+            key = _join_key(rule, category, alert)
+            latest = self.store.latest(slot, key, start, end)
+            if latest is None:
+                continue
+
+            needed = rule.min_count.get(category, 1)
+            if needed > 1 and self.store.count(slot, key, start, end) < needed:
+                continue
+
+            satisfied = True
+            if first is None or latest["time"] > first["time"]:
+                first = latest
+
+        if not satisfied:
+            return None
+
+        match = Match(self, rule, alert, first, now)
+        if rule.consume and first is not None:
+            self.store.consume(first)
+        return match
+
+    def build(self, match: Match) -> dict:
+        """Turn a match into a correlation event and apply its clear list."""
+        event = EVENT_BUILDERS[match.rule.event](match)
+        for category in match.rule.clear:
+            for field in self.indexes.get(category, ()):
+                self.store.clear(f"{category}:{field}")
+        return event
+
+
+def _index_field(join: str) -> str:
+    # "any" lookups scan the whole category, so any index will do
+    return "src_ip" if join == "any" else join
+
+
+def _join_key(rule: Rule, category: str, alert: dict):
+    if rule.join == "any":
+        return None
+    value = alert.get(rule.join)
+    if category in rule.exact:
+        return value or "unknown"   # as filed by RuleEngine.record()
+    # Alerts without a source IP may join any source
+    return None if not value or value == "unknown" else value
+
+
+# ---------- EVENT BUILDERS ----------
+
+def _base_event(match: Match) -> dict:
+    return {
+        "correlation_id": f"CORR-{int(time.time()*1000)}",
+        "timestamp": pretty_time(match.now),
+        "correlation_type": match.rule.name,
+        "severity": match.rule.severity,
+    }
+
+
+def _stage(event: dict, stage_type: str) -> dict:
+    stage = {"type": stage_type, "time": pretty_time(event["time"])}
+    if "raw" in event:
+        stage["src_ip"] = event["src_ip"]
+        stage["snort_alert"] = event["raw"]
+    else:
+        stage["agent"] = event["agent"]
+        stage["wazuh_alert"] = event["desc"]
+    return stage
+
+
+def build_sequence(match: Match) -> dict:
+    first, alert = match.first, match.alert
+    stage1_type = match.rule.stage1_type or CATEGORY_TYPES.get(first["category"], first["category"])
+
+    event = _base_event(match)
+    event["stage1"] = _stage(first, stage1_type)
+    event["stage2"] = _stage(alert, match.rule.stage2_type)
+    event["time_difference_seconds"] = abs((alert["time"] - first["time"]).total_seconds())
+    return event
+
+
+def build_ssh_failure(match: Match) -> dict:
+    event = _base_event(match)
+    event["failed_attempt_time"] = pretty_time(match.alert["time"])
+    event["src_ip"] = match.alert["src_ip"]
+    event["snort_alert"] = match.first["raw"]
+    event["wazuh_alert"] = match.alert["desc"]
+    return event
+
+
+def build_ssh_success(match: Match) -> dict:
+    event = _base_event(match)
+    event["failed_attempts"] = match.count("ssh_fail")
+    event["snort_detections"] = match.count("ssh_bruteforce")
+    event["successful_login"] = {
+        "time": pretty_time(match.alert["time"]),
+        "agent": match.alert["agent"],
+        "wazuh_alert": match.alert["desc"],
+    }
+    snort = match.latest("ssh_bruteforce")
+    if snort:
+        event["snort_alert"] = snort["raw"]
+    return event
+
+
+EVENT_BUILDERS = {
+    "sequence": build_sequence,
+    "ssh_failure": build_ssh_failure,
+    "ssh_success": build_ssh_success,
+}
@@ -0,0 +1,94 @@
+"""
+Single-pass Snort signature classifier.
+
+All signature substrings are compiled into one lookahead alternation regex,
+so one scan of an alert returns every category it matches, including
+signatures nested in or overlapping other signatures. Only the rule message of a
+fast-alert line is scanned, and results are memoized per message: Snort emits
+as many distinct messages as it has rules, so a typical line costs two
+str.find calls and one dict lookup.
+
+Categories and their substrings come from signatures.json (or a file named
+by SNORT_SIGNATURES) and can be extended without code changes.
+"""
+
+import json
+import re
+
+# Distinct messages to remember before starting over
+CACHE_SIZE = 4096
+
+
+class SignatureMatcher:
+    def __init__(self, categories: dict, cache_size: int = CACHE_SIZE):
+        """categories: {name: {"label": str, "patterns": [str, ...]}}"""
+        self.labels = {}
+        self._category_of = {}   # upper-cased pattern -> [category, ...]
+
+        for name, spec in categories.items():
+            if isinstance(spec, dict):
+                patterns, label = spec.get("patterns", []), spec.get("label", name)
+            else:
+                patterns, label = spec, name
+            self.labels[name] = label
+            for pattern in patterns:
+                owners = self._category_of.setdefault(pattern.upper(), [])
+                if name not in owners:
+                    owners.append(name)
+
+        # A zero-width lookahead is tried at every position, so overlapping
+        # and nested signatures all match. Longest first: the regex reports
+        # the longest literal at a position, _prefixes supplies the shorter
+        # ones starting there.
+        literals = sorted(self._category_of, key=len, reverse=True)
+        self._regex = re.compile("(?=(" + "|".join(map(re.escape, literals)) + "))") if literals else None
+        self._prefixes = {
+            literal: [other for other in literals if literal.startswith(other)]
+            for literal in literals
+        }
+
+        self._cache = {}
+        self._cache_size = cache_size
+
+    def classify(self, line: str) -> tuple:
+        """Return every category whose signatures appear in the alert message."""
+        message = alert_message(line)
+        found = self._cache.get(message)
+        if found is None:
+            found = self._scan(message)
+            if len(self._cache) >= self._cache_size:
+                self._cache.clear()
+            self._cache[message] = found
+        return found
+
+    def _scan(self, text: str) -> tuple:
+        if self._regex is None:
+            return ()
+
+        found = []
+        for longest in self._regex.findall(text.upper()):
+            for literal in self._prefixes[longest]:
+                for name in self._category_of[literal]:
+                    if name not in found:
+                        found.append(name)
+        return tuple(found)
+
+
+def alert_message(line: str) -> str:
+    """
+    Rule message of a fast-alert line, or the whole line if it is not one:
+    12/29-14:23:45.123456  [**] [1:1000001:1] MESSAGE [**] [Classification: ...
+    """
+    start = line.find("[**] [")
+    if start < 0:
+        return line
+    start = line.find("] ", start + 6)
+    end = line.find(" [**]", start)
+    if start < 0 or end < 0:
+        return line
+    return line[start + 2:end]
+
+
+def load_signatures(path: str) -> SignatureMatcher:
+    with open(path, "r", encoding="utf-8") as f:
+        return SignatureMatcher(json.load(f))
@@ -0,0 +1,63 @@
+"""
+Wazuh alert classification.
+
+Known rule IDs map straight to their categories (one dict lookup). Only
+alerts with an unknown rule ID fall back to description substring tests,
+and those results are memoized per (rule_id, description) in a bounded LRU;
+Wazuh repeats the same few hundred descriptions, so the fallback rarely runs.
+"""
+
+from functools import lru_cache
+
+# rule.id -> categories
+RULE_CATEGORIES = {
+    "200001": ("priv_esc",),          # privilege escalation
+    "200004": ("priv_esc",),          # suspicious privileged modification
+    "100001": ("ssh_fail",),          # SSH authentication failure
+    "5716": ("ssh_fail",),            # sshd: authentication failed
+    "200003": ("ssh_success",),       # successful SSH login
+    "12002": ("package_install",),    # package installed
+    "2834": ("cron_persistence",),    # local override: crontab changed
+}
+
+# Distinct (rule_id, description) pairs kept by the fallback cache
+DESCRIPTION_CACHE_SIZE = 1024
+
+
+def classify_wazuh(alert: dict) -> tuple:
+    """Return every category the alert belongs to."""
+    rule = alert.get("rule") or {}
+    rule_id = str(rule.get("id", ""))
+
+    categories = RULE_CATEGORIES.get(rule_id)
+    if categories is not None:
+        return categories
+    return classify_description(rule_id, rule.get("description", ""))
+
+
+@lru_cache(maxsize=DESCRIPTION_CACHE_SIZE)
+def classify_description(rule_id: str, description: str) -> tuple:
+    """Substring fallback for rule IDs not in RULE_CATEGORIES."""
+    desc = description.lower()
+    found = []
+
+    if (
+        "privilege escalation" in desc or
+        ("sudo" in desc and "root" in desc) or
+        "suspicious privileged modification" in desc
+    ):
+        found.append("priv_esc")
+
+    if ("authentication failed" in desc and "sshd" in desc) or "failed password" in desc:
+        found.append("ssh_fail")
+
+    if "session opened" in desc and "sshd" in desc:
+        found.append("ssh_success")
+
+    if "package was installed" in desc or "dpkg" in desc:
+        found.append("package_install")
+
+    if "cron" in desc or "scheduled task" in desc:
+        found.append("cron_persistence")
+
+    return tuple(found)
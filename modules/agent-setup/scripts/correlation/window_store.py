@@ -0,0 +1,109 @@
+"""
+Sliding-window store for recent correlator events.
+
+Each category (nmap_scan, port_scan, priv_esc, ...) keeps one time-ordered
+deque of all its events plus one deque per join key (src_ip or agent name).
+Expiry pops from the heads, lookups bisect on event time, so a Wazuh alert
+only touches the events of its own source that fall inside the window.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import datetime, timedelta
+
+
+def _event_time(event: dict) -> datetime:
+    return event["time"]
+
+
+class WindowStore:
+    def __init__(self, horizon: timedelta):
+        # Events older than (now - horizon) are dropped by expire()
+        self.horizon = horizon
+        self._all = {}      # category -> deque[event]
+        self._by_key = {}   # category -> {key: deque[event]}
+
+    # ---------- WRITES ----------
+
+    def add(self, category: str, key: str, event: dict) -> None:
+        """Insert an event ({time, ...}) under category and join key."""
+        event["_key"] = key
+        event["_consumed"] = False
+
+        _insert(self._all.setdefault(category, deque()), event)
+        _insert(self._by_key.setdefault(category, {}).setdefault(key, deque()), event)
+
+    def consume(self, event: dict) -> None:
+        """Mark an event as used so later lookups skip it (freed on expiry)."""
+        event["_consumed"] = True
+
+    def clear(self, category: str) -> None:
+        self._all.pop(category, None)
+        self._by_key.pop(category, None)
+
+    def expire(self, now: datetime) -> None:
+        """Drop every event older than now - horizon."""
+        cutoff = now - self.horizon
+
+        for category, events in self._all.items():
+            keyed = self._by_key[category]
+
+            while events and events[0]["time"] < cutoff:
+                key = events.popleft()["_key"]
+                bucket = keyed.get(key)
+                if bucket is None:
+                    continue
+                while bucket and bucket[0]["time"] < cutoff:
+                    bucket.popleft()
+                if not bucket:
+                    del keyed[key]
+
+    # ---------- READS ----------
+
+    def latest(self, category: str, key: str | None,
+               start: datetime, end: datetime | None = None) -> dict | None:
+        """
+        Most recent unconsumed event with start <= time <= end.
+        key=None searches every source in the category.
+        """
+        events = self._events(category, key)
+        if not events:
+            return None
+
+        i = len(events) if end is None else bisect_right(events, end, key=_event_time)
+        while i > 0:
+            i -= 1
+            event = events[i]
+            if event["time"] < start:
+                break
+            if not event["_consumed"]:
+                return event
+        return None
+
+    def count(self, category: str, key: str | None,
+              start: datetime, end: datetime | None = None) -> int:
+        """Number of unconsumed events with start <= time <= end."""
+        events = self._events(category, key)
+        if not events:
+            return 0
+
+        lo = bisect_left(events, start, key=_event_time)
+        hi = len(events) if end is None else bisect_right(events, end, key=_event_time)
+        return sum(1 for i in range(lo, hi) if not events[i]["_consumed"])
+
+    def __len__(self) -> int:
+        return sum(len(events) for events in self._all.values())
+
+    def _events(self, category: str, key: str | None):
+        if key is None:
+            return self._all.get(category)
+        return self._by_key.get(category, {}).get(key)
+
+
+def _insert(events: deque, event: dict) -> None:
+    # Alerts almost always arrive in time order; fall back to an ordered
+    # insert for the occasional late line.
+    if not events or events[-1]["time"] <= event["time"]:
+        events.append(event)
+    else:
+        events.insert(bisect_right(events, event["time"], key=_event_time), event)
@@ -0,0 +1,59 @@
+"""
+Client for the backend's bulk endpoint (/api/ingest/batch).
+
+One keep-alive requests.Session per client; each batch is sent as a single
+gzipped NDJSON body. send() returns True when the batch is done with
+(stored, or rejected by the API as invalid) and False when it should be
+retried, which is what SpoolSender expects. A 200 whose body is not the
+API's JSON counts as done: a retry would get the same answer forever.
+"""
+
+import gzip
+import json
+
+import requests
+
+
+class BatchClient:
+    def __init__(self, url: str, api_key: str, label: str = "events", timeout=(10, 20)):
+        self.url = url
+        self.label = label
+        self.timeout = timeout  # connect timeout, read timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            "X-API-Key": api_key,
+            "Content-Type": "application/x-ndjson",
+            "Content-Encoding": "gzip",
+        })
+
+    def send(self, events: list) -> bool:
+        body = gzip.compress(
+            "".join(json.dumps(e) + "\n" for e in events).encode("utf-8"),
+            compresslevel=5,
+        )
+
+        try:
+            r = self.session.post(self.url, data=body, timeout=self.timeout)
+        except Exception as e:
+            print("[ERROR] Push error:", e)
+            return False
+
+        if r.status_code == 200:
+            try:
+                failed = r.json().get("failed", 0)
+            except (ValueError, AttributeError):
+                # Not the API's JSON (e.g. a proxy page): retrying the batch would
+                # stall the spool, so count it as sent with unknown per-event results
+                print(f"[WARN] Unexpected 200 body for {len(events)} {self.label}: {r.text[:200]}")
+                return True
+            if failed:
+                print(f"[WARN] {failed} of {len(events)} {self.label} rejected by the API")
+            print(f"[OK] Pushed {len(events)} {self.label} ({len(body)} bytes gzipped)")
+            return True
+
+        print(f"[WARN] Push failed: {r.status_code} body={r.text[:200]}")
+        if 400 <= r.status_code < 500 and r.status_code not in (401, 408, 429):
+            # The batch itself is invalid; retrying will not help
+            print(f"[WARN] Dropping {len(events)} {self.label} rejected with {r.status_code}")
+            return True
+        return False
@@ -0,0 +1,99 @@
+"""
+Streaming JSON record decoding for HTTP bodies and files.
+
+iter_json_records() takes an iterable of byte chunks (resp.iter_content(),
+a file read loop, ...) and yields one record at a time, so memory stays flat
+no matter how large the body is and the first record is available as soon
+as its bytes arrive. Both a top-level JSON array and NDJSON are accepted;
+the format is picked from the first non-whitespace byte.
+"""
+
+import codecs
+import itertools
+import json
+
+CHUNK_SIZE = 64 * 1024
+
+# A single record larger than this is treated as a corrupt body
+MAX_RECORD_BYTES = 16 * 1024 * 1024
+
+
+def iter_lines(chunks, final: bool = False):
+    """
+    Yield complete lines (including the trailing newline) from byte chunks.
+    An unterminated last line is only yielded when final=True.
+    """
+    pending = b""
+    for chunk in chunks:
+        if pending:
+            chunk = pending + chunk
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                break
+            yield chunk[start:end + 1]
+            start = end + 1
+        pending = chunk[start:]
+        if len(pending) > MAX_RECORD_BYTES:
+            raise ValueError(f"line exceeds {MAX_RECORD_BYTES} bytes")
+
+    if final and pending:
+        yield pending
+
+
+def iter_json_records(chunks):
+    """Yield each record of a JSON array or NDJSON byte stream."""
+    chunks = iter(chunks)
+    for first in chunks:
+        first = first.lstrip()
+        if first:
+            break
+    else:
+        return
+
+    chunks = itertools.chain([first], chunks)
+    if first[:1] == b"[":
+        yield from _iter_array(chunks)
+        return
+
+    for line in iter_lines(chunks, final=True):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            print(f"[WARN] Skipping malformed JSON line ({len(line)} bytes)")
+
+
+def _iter_array(chunks):
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buf, pos = "", 0
+    opened = False
+
+    for chunk in chunks:
+        buf = buf[pos:] + text.decode(chunk)
+        pos = 0
+
+        while True:
+            # Skip whitespace, the opening bracket and separators
+            while pos < len(buf) and (buf[pos] in " \t\r\n," or (buf[pos] == "[" and not opened)):
+                opened = opened or buf[pos] == "["
+                pos += 1
+            if pos >= len(buf):
+                break
+            if buf[pos] == "]":
+                return
+            try:
+                record, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Record continues in the next chunk
+                if len(buf) - pos > MAX_RECORD_BYTES:
+                    raise ValueError(f"JSON record exceeds {MAX_RECORD_BYTES} bytes")
+                break
+            yield record
+
+    if buf[pos:].strip():
+        raise ValueError("truncated JSON array")
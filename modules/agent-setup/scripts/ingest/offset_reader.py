@@ -0,0 +1,91 @@
+"""
+Incremental reader for append-only NDJSON files (snort.json, correlation.json).
+
+The position is a byte offset plus the file's inode, persisted in a small
+state file, so each cycle reads only the bytes appended since the last one
+(cost proportional to new data, not to file age). Rotation (new inode) and
+truncation are handled by FileTailer: the new file is read from the start.
+
+Older releases stored an element count in a "<name>.offset" file; it is
+converted once into a byte offset by skipping that many lines.
+"""
+
+import json
+import os
+
+from ingest.tailer import FileTailer
+
+
+class OffsetReader:
+    def __init__(self, path: str, state_file: str, legacy_offset_file: str | None = None):
+        self.path = path
+        self.state_file = state_file
+        self.legacy_offset_file = legacy_offset_file
+        self.tailer = None
+        self._waiting = False
+
+    def read_records(self) -> list:
+        """Records appended since the last call (malformed lines are skipped)."""
+        if self.tailer is None:
+            resume = self._load_state()
+            if resume is False:
+                return []   # legacy JSON array, not yet rewritten as NDJSON
+            self.tailer = FileTailer(self.path, from_end=False, resume=resume)
+
+        records = []
+        for line in self.tailer.read_lines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"[WARN] Skipping malformed line in {self.path} ({len(line)} bytes)")
+        return records
+
+    def commit(self) -> None:
+        """Persist the position of the last record returned by read_records()."""
+        if self.tailer is None:
+            return
+        inode, offset = self.tailer.position()
+        tmp = f"{self.state_file}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"inode": inode, "offset": offset}, f)
+        os.replace(tmp, self.state_file)
+
+    # ---------- STATE ----------
+
+    def _load_state(self):
+        """(inode, offset), None to start at 0, or False to wait."""
+        try:
+            with open(self.state_file, "r") as f:
+                state = json.load(f)
+            return state["inode"], state["offset"]
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+
+        if not self.legacy_offset_file:
+            return None
+        try:
+            with open(self.legacy_offset_file, "r") as f:
+                count = int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+        try:
+            with open(self.path, "rb") as f:
+                if f.read(64).lstrip()[:1] == b"[":
+                    if not self._waiting:
+                        print(f"[INFO] {self.path} is still a JSON array; waiting for NDJSON output")
+                        self._waiting = True
+                    return False
+                f.seek(0)
+                for _ in range(count):
+                    if not f.readline():
+                        break
+                position = os.fstat(f.fileno()).st_ino, f.tell()
+        except FileNotFoundError:
+            return None
+
+        print(f"[INFO] Converted {self.legacy_offset_file} ({count} records) to byte offset {position[1]}")
+        return position
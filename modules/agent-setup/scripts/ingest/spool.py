@@ -0,0 +1,308 @@
+"""
+Durable on-disk spool between a log reader and the dashboard API.
+
+Events are appended as NDJSON lines to numbered segment files at line rate;
+a sender thread reads them back from the committed cursor, POSTs a batch
+and only then moves the cursor (written atomically to the "commit" file).
+If the API is down the sender backs off exponentially while the reader
+keeps appending, so nothing is dropped and a restart resumes from the last
+commit. Fully sent segments are deleted.
+
+Delivery is at-least-once: a crash between a successful POST and the
+commit re-sends that batch. Every record carries an event_uid (see
+event_uid()), which the backend stores under a UNIQUE key, so a replay
+does not create duplicate rows.
+
+Bounds: when the spool exceeds max_bytes, or a segment is older than
+retention seconds, the oldest segments are discarded with a warning and
+counted in stats()["dropped"].
+
+Standard library only; wazuh-manager-setup/scripts/spool.py is a copy of
+this file for the Wazuh manager host, keep the two in sync
+(agent-setup/tests/test_shared_copies.py fails when the code differs).
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+SEGMENT_BYTES = 8 * 1024 * 1024
+MAX_BYTES = 512 * 1024 * 1024
+RETENTION_SECONDS = 7 * 24 * 3600
+BATCH_SIZE = 500
+MAX_BACKOFF = 60
+
+_SEGMENT_RE = re.compile(r"^(\d{12})\.ndjson$")
+
+
+def event_uid(*parts) -> str:
+    """Stable id for an event, from what identifies it at the source."""
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(str(part).encode("utf-8", "replace"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class Spool:
+    def __init__(self, directory: str, segment_bytes: int = SEGMENT_BYTES,
+                 max_bytes: int = MAX_BYTES, retention: float = RETENTION_SECONDS,
+                 fsync: bool = False):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.retention = retention
+        self.fsync = fsync
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._appended = threading.Condition(self._lock)
+        self._commit_file = os.path.join(directory, "commit")
+        self._stats = {"appended": 0, "committed": 0, "dropped": 0}
+
+        self._segments = sorted(
+            int(m.group(1)) for m in map(_SEGMENT_RE.match, os.listdir(directory)) if m
+        )
+        self._cursor = self._load_commit()
+        if not self._segments or self._cursor[0] > self._segments[-1]:
+            self._segments.append(self._cursor[0])
+
+        self._active = self._segments[-1]
+        self._out = open(self._path(self._active), "ab")
+        self._active_size = self._out.tell()
+        self._total = sum(self._size(s) for s in self._segments)
+        self._last_retention_check = 0.0
+
+    # ---------- WRITER ----------
+
+    def append(self, records: list) -> None:
+        """Append dicts as NDJSON lines; durable against process crashes once this returns."""
+        if not records:
+            return
+        data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records).encode("utf-8")
+
+        with self._lock:
+            if self._active_size and self._active_size + len(data) > self.segment_bytes:
+                self._roll()
+            self._out.write(data)
+            self._out.flush()
+            if self.fsync:
+                os.fsync(self._out.fileno())
+            self._active_size += len(data)
+            self._total += len(data)
+            self._stats["appended"] += len(records)
+            self._enforce_limits()
+            self._appended.notify_all()
+
+    # ---------- READER ----------
+
+    def read(self, max_records: int = BATCH_SIZE) -> tuple:
+        """
+        Up to max_records records from the committed cursor.
+        Returns (records, cursor_after); pass cursor_after to commit().
+        """
+        with self._lock:
+            segment, offset = self._cursor
+            segments = list(self._segments)
+
+        records = []
+        while len(records) < max_records:
+            try:
+                with open(self._path(segment), "rb") as f:
+                    f.seek(offset)
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break   # being written right now
+                        offset += len(line)
+                        try:
+                            records.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            print(f"[WARN] Spool {self.directory}: skipping corrupt record")
+                        if len(records) >= max_records:
+                            break
+            except FileNotFoundError:
+                pass
+
+            later = [s for s in segments if s > segment]
+            if len(records) >= max_records or not later:
+                break
+            if os.path.exists(self._path(segment)) and offset < os.path.getsize(self._path(segment)):
+                break   # partial line at the end of a finished segment: wait
+            segment, offset = later[0], 0
+
+        return records, (segment, offset)
+
+    def commit(self, cursor: tuple, count: int = 0) -> None:
+        """Persist the cursor after a successful send and delete finished segments."""
+        with self._lock:
+            self._cursor = cursor
+            self._stats["committed"] += count
+            self._save_commit()
+            for seg in [s for s in self._segments if s < cursor[0]]:
+                self._delete(seg)
+
+    def committed(self) -> tuple:
+        with self._lock:
+            return self._cursor
+
+    def wait(self, timeout: float) -> None:
+        """Block until something is appended (or timeout)."""
+        with self._appended:
+            self._appended.wait(timeout)
+
+    def wake(self) -> None:
+        with self._appended:
+            self._appended.notify_all()
+
+    def pending_bytes(self) -> int:
+        with self._lock:
+            return max(0, self._total - self._cursor[1])
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["segments"] = len(self._segments)
+        stats["pending_bytes"] = self.pending_bytes()
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._out.close()
+
+    # ---------- INTERNALS (called with the lock held) ----------
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:012d}.ndjson")
+
+    def _roll(self) -> None:
+        self._out.close()
+        self._active += 1
+        self._segments.append(self._active)
+        self._out = open(self._path(self._active), "ab")
+        self._active_size = 0
+
+    def _size(self, segment: int) -> int:
+        try:
+            return os.path.getsize(self._path(segment))
+        except FileNotFoundError:
+            return 0
+
+    def _enforce_limits(self) -> None:
+        now = time.time()
+        check_age = now - self._last_retention_check >= 60
+        if self._total <= self.max_bytes and not check_age:
+            return
+        if check_age:
+            self._last_retention_check = now
+
+        for seg in list(self._segments[:-1]):   # never the active segment
+            try:
+                mtime = os.stat(self._path(seg)).st_mtime
+            except FileNotFoundError:
+                self._delete(seg)
+                continue
+            too_big = self._total > self.max_bytes
+            too_old = now - mtime > self.retention
+            if not (too_big or too_old):
+                break
+
+            unsent = self._count_unsent(seg)
+            if unsent:
+                reason = "size cap" if too_big else "retention"
+                print(f"[WARN] Spool {self.directory}: {reason} reached, dropping {unsent} unsent events")
+                self._stats["dropped"] += unsent
+            self._delete(seg)
+            if self._cursor[0] <= seg:
+                self._cursor = (self._segments[0], 0)
+                self._save_commit()
+
+    def _count_unsent(self, segment: int) -> int:
+        if segment < self._cursor[0]:
+            return 0
+        start = self._cursor[1] if segment == self._cursor[0] else 0
+        with open(self._path(segment), "rb") as f:
+            f.seek(start)
+            return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1024 * 1024), b""))
+
+    def _delete(self, segment: int) -> None:
+        self._total -= self._size(segment)
+        try:
+            os.remove(self._path(segment))
+        except FileNotFoundError:
+            pass
+        self._segments.remove(segment)
+
+    def _load_commit(self) -> tuple:
+        try:
+            with open(self._commit_file, "r") as f:
+                state = json.load(f)
+            cursor = (int(state["segment"]), int(state["offset"]))
+        except (FileNotFoundError, ValueError, KeyError):
+            return (self._segments[0] if self._segments else 0), 0
+        if cursor[0] not in self._segments:
+            # Committed segment is gone: start of the next one, or of a new empty one
+            later = [s for s in self._segments if s > cursor[0]]
+            return (later[0] if later else cursor[0]), 0
+        return cursor
+
+    def _save_commit(self) -> None:
+        tmp = f"{self._commit_file}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"segment": self._cursor[0], "offset": self._cursor[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._commit_file)
+
+
+class SpoolSender(threading.Thread):
+    """
+    Drains a spool in batches. send(records) returns True when the batch is
+    done with (stored, or permanently rejected) and False to retry it later
+    with exponential backoff. A batch smaller than batch_size waits up to
+    linger seconds for more records first.
+    """
+
+    def __init__(self, spool: Spool, send, batch_size: int = BATCH_SIZE, linger: float = 0.0,
+                 max_backoff: float = MAX_BACKOFF, name: str = "spool-sender"):
+        super().__init__(name=name, daemon=True)
+        self.spool = spool
+        self.send = send
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_backoff = max_backoff
+        self._stopping = threading.Event()
+
+    def run(self) -> None:
+        backoff = 1
+        while not self._stopping.is_set():
+            records, cursor = self.spool.read(self.batch_size)
+            if not records:
+                if cursor != self.spool.committed():
+                    self.spool.commit(cursor)   # skipped corrupt lines / segment boundary
+                self.spool.wait(1.0)
+                continue
+            if len(records) < self.batch_size and self.linger:
+                self._stopping.wait(self.linger)
+                records, cursor = self.spool.read(self.batch_size)
+
+            try:
+                ok = self.send(records)
+            except Exception as e:
+                print(f"[ERROR] Spool send failed: {e}")
+                ok = False
+
+            if ok:
+                self.spool.commit(cursor, len(records))
+                backoff = 1
+            else:
+                print(f"[WARN] Backend unavailable; {self.spool.pending_bytes()} bytes spooled, retrying in {backoff}s")
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stopping.set()
+        self.spool.wake()
+        self.join(timeout)
@@ -0,0 +1,207 @@
+"""
+Persistent tailer for append-only log files.
+
+FileTailer keeps the file descriptor open, reads new data in large chunks
+and splits lines incrementally (a partial last line waits for its newline).
+Rotation is detected by an inode change on the path, truncation by the
+size dropping below the read position; either way the old file is drained
+first so no complete line is lost.
+
+Change notification uses Linux inotify (through ctypes, no extra packages)
+on the file's directory, so rotation and re-creation are seen too, waiting
+costs nothing, and new lines are picked up within milliseconds. Without
+inotify the tailer falls back to stat polling.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import time
+
+READ_CHUNK = 1024 * 1024
+POLL_INTERVAL = 0.5
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+class _Inotify:
+    """Minimal non-blocking inotify watch on one directory."""
+
+    _libc = None
+
+    def __init__(self, directory: str):
+        if _Inotify._libc is None:
+            _Inotify._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc = _Inotify._libc
+
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for {directory}")
+
+    def drain(self) -> None:
+        """Consume pending events; the tailer re-checks the file itself."""
+        while True:
+            try:
+                os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class FileTailer:
+    def __init__(self, path: str, from_end: bool = True, resume: tuple | None = None,
+                 chunk_size: int = READ_CHUNK, poll_interval: float = POLL_INTERVAL):
+        """
+        from_end: start at EOF (True) or at the beginning of the file.
+        resume:   (inode, offset) from position(); used if the inode still matches,
+                  otherwise the file was replaced meanwhile and is read from the start.
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+
+        self._fd = None
+        self._inode = None
+        self._pos = 0         # offset just past the last complete line
+        self._partial = b""
+
+        self._notify = None
+        try:
+            self._notify = _Inotify(os.path.dirname(os.path.abspath(path)))
+        except (OSError, AttributeError) as e:
+            print(f"[INFO] inotify unavailable for {path} ({e}); polling every {poll_interval}s")
+
+        self._open(from_end, resume)
+
+    # ---------- PUBLIC ----------
+
+    def fileno(self) -> int | None:
+        """inotify descriptor to select() on, or None when polling."""
+        return self._notify.fd if self._notify else None
+
+    def position(self) -> tuple:
+        """(inode, offset) of the next unread complete line, for resume=."""
+        return self._inode, self._pos
+
+    def backlog(self) -> int:
+        """Bytes between the last complete line read and the end of the file."""
+        if self._fd is None:
+            return 0
+        try:
+            return max(0, os.fstat(self._fd).st_size - self._pos)
+        except OSError:
+            return 0
+
+    def wait(self, timeout: float) -> None:
+        wait_any([self], timeout)
+
+    def read_lines(self) -> list[str]:
+        """Every complete line appended since the last call (newline stripped)."""
+        if self._notify:
+            self._notify.drain()
+
+        if self._fd is None and not self._open(from_end=False):
+            return []
+
+        lines = self._read_available()
+
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return lines   # rotated away, new file not created yet
+
+        if st.st_ino != self._inode:
+            # Rotated: the old file is drained, a last unterminated line is complete now
+            if self._partial:
+                lines.append(self._partial.decode("utf-8", errors="replace"))
+            print(f"[INFO] {self.path} rotated; following new file")
+            self._close_fd()
+            if self._open(from_end=False):
+                lines.extend(self._read_available())
+        elif st.st_size < self._pos + len(self._partial):
+            print(f"[INFO] {self.path} truncated; reading from start")
+            self._pos, self._partial = 0, b""
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            lines.extend(self._read_available())
+
+        return lines
+
+    def close(self) -> None:
+        self._close_fd()
+        if self._notify:
+            self._notify.close()
+            self._notify = None
+
+    # ---------- INTERNALS ----------
+
+    def _open(self, from_end: bool, resume: tuple | None = None) -> bool:
+        try:
+            fd = os.open(self.path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+        except FileNotFoundError:
+            return False
+
+        st = os.fstat(fd)
+        if resume and resume[0] == st.st_ino and resume[1] <= st.st_size:
+            pos = resume[1]
+        elif resume:
+            pos = 0
+        elif from_end:
+            pos = st.st_size
+        else:
+            pos = 0
+        os.lseek(fd, pos, os.SEEK_SET)
+
+        self._fd, self._inode, self._pos, self._partial = fd, st.st_ino, pos, b""
+        return True
+
+    def _close_fd(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd, self._partial = None, b""
+
+    def _read_available(self) -> list[str]:
+        lines = []
+        while True:
+            chunk = os.read(self._fd, self.chunk_size)
+            if not chunk:
+                return lines
+
+            data = self._partial + chunk if self._partial else chunk
+            end = data.rfind(b"\n")
+            if end < 0:
+                self._partial = data
+                continue
+
+            complete, self._partial = data[:end + 1], data[end + 1:]
+            self._pos += len(complete)
+            lines.extend(complete[:-1].decode("utf-8", errors="replace").split("\n"))
+
+
+def wait_any(tailers, timeout: float) -> None:
+    """Block until any tailer's file may have changed, or timeout elapses."""
+    fds = [t.fileno() for t in tailers]
+    if fds and all(fd is not None for fd in fds):
+        try:
+            select.select(fds, [], [], timeout)
+        except InterruptedError:
+            pass
+        return
+
+    # At least one tailer polls: never sleep longer than its interval
+    time.sleep(min([timeout] + [t.poll_interval for t in tailers if t.fileno() is None]))
@@ -0,0 +1,151 @@
+"""
+Incremental Wazuh alerts.json reader over HTTP.
+
+alerts.json is NDJSON (one alert per line) and only ever appended to, so the
+feed keeps a byte offset and asks for "Range: bytes=<offset>-" on every poll.
+Each poll then costs O(new alerts) instead of O(file), and alerts that share
+a timestamp are no longer dropped.
+
+The cursor (offset plus the last few bytes before it) is kept in a state file.
+Every request re-reads those bytes; if they no longer match, the file was
+rotated or rewritten and the feed starts again from 0. Servers without Range
+support (python -m http.server) answer 200 with the whole file; that still
+works, only without the bandwidth saving. Bodies are streamed, so alerts
+are yielded as they arrive and memory stays flat either way.
+"""
+
+import itertools
+import json
+import os
+
+import requests
+
+from ingest.json_stream import CHUNK_SIZE, iter_lines
+
+# Bytes before the offset re-read on each poll to detect rotation
+FINGERPRINT_BYTES = 64
+
+
+class WazuhRangeFeed:
+    def __init__(self, url: str, state_file: str, timeout: float = 3):
+        self.url = url
+        self.state_file = state_file
+        self.timeout = timeout
+        self.session = requests.Session()
+
+        self.offset = 0
+        self.tail = b""
+        self._warned_no_range = False
+        self._load_state()
+
+    def poll(self):
+        """Yield every complete alert appended since the last poll, as it arrives."""
+        try:
+            for line in iter_lines(self._new_bytes()):
+                # Advance the cursor per line; a partial last line is re-read next poll
+                self.offset += len(line)
+                self.tail = (self.tail + line)[-FINGERPRINT_BYTES:]
+
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"[WARN] Skipping malformed Wazuh alert line ({len(line)} bytes)")
+        finally:
+            self._save_state()
+
+    # ---------- HTTP ----------
+
+    def _new_bytes(self):
+        """Byte chunks of alerts.json from the current offset onward."""
+        overlap = len(self.tail)
+        start = self.offset - overlap
+
+        with self.session.get(
+            self.url,
+            headers={"Range": f"bytes={start}-"} if self.offset else {},
+            stream=True,
+            timeout=self.timeout,
+        ) as resp:
+            if resp.status_code == 416:
+                # Offset is at or past EOF: either nothing new, or the file shrank
+                total = _content_range_total(resp.headers.get("Content-Range", ""))
+                if total is None or total < self.offset:
+                    yield from self._restart("truncated")
+                return
+
+            resp.raise_for_status()
+
+            if resp.status_code == 206:
+                prefix = overlap
+            else:
+                # 200: the server ignored Range and is sending the whole file
+                prefix = self.offset
+                if self.offset and not self._warned_no_range:
+                    print("[WARN] Wazuh alerts server ignores Range requests; downloading full file")
+                    self._warned_no_range = True
+
+            tail, skipped, rest = _skip(resp.iter_content(CHUNK_SIZE), prefix, overlap)
+            if skipped < prefix or tail != self.tail:
+                yield from self._restart("rotated")
+                return
+            yield from rest
+
+    def _restart(self, reason: str):
+        print(f"[INFO] Wazuh alerts.json {reason}; reading from start")
+        self._reset()
+        with self.session.get(self.url, stream=True, timeout=self.timeout) as resp:
+            resp.raise_for_status()
+            yield from resp.iter_content(CHUNK_SIZE)
+
+    def _reset(self) -> None:
+        self.offset = 0
+        self.tail = b""
+
+    # ---------- STATE ----------
+
+    def _load_state(self) -> None:
+        try:
+            with open(self.state_file, "r") as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+
+        if state.get("url") != self.url:
+            return
+        self.offset = int(state.get("offset", 0))
+        self.tail = bytes.fromhex(state.get("tail", ""))
+
+    def _save_state(self) -> None:
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        tmp = f"{self.state_file}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"url": self.url, "offset": self.offset, "tail": self.tail.hex()}, f)
+        os.replace(tmp, self.state_file)
+
+
+def _skip(chunks, count: int, keep: int):
+    """
+    Drop the first count bytes of a chunk stream without buffering them.
+    Returns (last `keep` dropped bytes, bytes dropped, remaining chunks).
+    """
+    chunks = iter(chunks)
+    kept, dropped = b"", 0
+
+    for chunk in chunks:
+        if dropped + len(chunk) >= count:
+            cut = count - dropped
+            kept = (kept + chunk[:cut])[-keep:] if keep else b""
+            return kept, count, itertools.chain([chunk[cut:]], chunks)
+        kept = (kept + chunk)[-keep:] if keep else b""
+        dropped += len(chunk)
+
+    return kept, dropped, iter(())
+
+
+def _content_range_total(value: str) -> int | None:
+    # "bytes */12345" or "bytes 0-99/12345"
+    total = value.rpartition("/")[2]
+    return int(total) if total.isdigit() else None
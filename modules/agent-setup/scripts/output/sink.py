@@ -0,0 +1,207 @@
+"""
+Asynchronous, batched output for correlation events.
+
+emit() only enqueues; it never touches the disk or the network, so a slow
+dashboard API or disk can no longer stall detection. Two background threads
+drain their own bounded queue:
+
+  writer: keeps the NDJSON file open, writes each batch with one write()
+          and flushes it; fsync per batch, every N seconds, or never.
+  sender: POSTs batches (a JSON list) to the API over a keep-alive
+          session, retrying with backoff while the API is unreachable.
+
+When a queue is full the event is dropped for that output and counted, so
+back-pressure shows up in stats() instead of in detection latency.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+
+import requests
+
+QUEUE_SIZE = 10000
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 0.5      # seconds a partial batch may wait
+MAX_BACKOFF = 30          # seconds between retries while the API is down
+
+_STOP = object()
+
+
+def parse_fsync_policy(value: str) -> float | None:
+    """'none' -> None, 'batch' -> 0 (every batch), '<seconds>' -> interval."""
+    value = (value or "none").strip().lower()
+    if value == "none":
+        return None
+    if value == "batch":
+        return 0.0
+    return float(value)
+
+
+class CorrelationSink:
+    def __init__(self, json_path: str, api_url: str | None, api_key: str,
+                 fsync_interval: float | None = None, queue_size: int = QUEUE_SIZE,
+                 batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL,
+                 timeout: float = 3):
+        self.json_path = json_path
+        self.api_url = api_url
+        self.api_key = api_key
+        self.fsync_interval = fsync_interval
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._stats = {
+            "emitted": 0,
+            "written": 0, "write_batches": 0, "write_dropped": 0, "write_errors": 0,
+            "sent": 0, "send_batches": 0, "send_dropped": 0, "send_errors": 0,
+            "write_queue_peak": 0, "send_queue_peak": 0,
+        }
+
+        self._outputs = []
+        self._write_q = queue.Queue(queue_size)
+        self._outputs.append(("write", self._write_q, threading.Thread(
+            target=self._writer, name="correlation-writer", daemon=True)))
+        self._send_q = None
+        if api_url:
+            self._send_q = queue.Queue(queue_size)
+            self._outputs.append(("send", self._send_q, threading.Thread(
+                target=self._sender, name="correlation-sender", daemon=True)))
+
+        for _, _, thread in self._outputs:
+            thread.start()
+
+    # ---------- PUBLIC ----------
+
+    def emit(self, event: dict) -> None:
+        """Queue one event for every output; never blocks."""
+        line = json.dumps(event)
+        with self._lock:
+            self._stats["emitted"] += 1
+        for name, q, _ in self._outputs:
+            try:
+                q.put_nowait(line if name == "write" else event)
+            except queue.Full:
+                self._count(f"{name}_dropped")
+                continue
+            depth = q.qsize()
+            with self._lock:
+                if depth > self._stats[f"{name}_queue_peak"]:
+                    self._stats[f"{name}_queue_peak"] = depth
+
+    def stats(self) -> dict:
+        """Counters plus current queue depths (back-pressure metrics)."""
+        with self._lock:
+            stats = dict(self._stats)
+        for name, q, _ in self._outputs:
+            stats[f"{name}_queue"] = q.qsize()
+        return stats
+
+    def close(self, timeout: float = 10) -> None:
+        """Flush what is queued and stop the threads (bounded wait)."""
+        deadline = time.monotonic() + timeout
+        for _, q, _ in self._outputs:
+            try:
+                q.put(_STOP, timeout=max(0, deadline - time.monotonic()))
+            except queue.Full:
+                continue
+        for _, _, thread in self._outputs:
+            thread.join(max(0, deadline - time.monotonic()))
+
+    # ---------- WORKERS ----------
+
+    def _next_batch(self, q: queue.Queue) -> tuple[list, bool]:
+        """Block for the first item, then gather up to batch_size within flush_interval."""
+        batch = []
+        first = q.get()
+        if first is _STOP:
+            return batch, True
+        batch.append(first)
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                item = q.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _writer(self) -> None:
+        f = None
+        last_sync = time.monotonic()
+        stop = False
+
+        while not stop:
+            batch, stop = self._next_batch(self._write_q)
+            if not batch:
+                continue
+            try:
+                if f is None:
+                    os.makedirs(os.path.dirname(self.json_path) or ".", exist_ok=True)
+                    f = open(self.json_path, "a")
+                f.write("\n".join(batch) + "\n")
+                f.flush()
+                if self.fsync_interval is not None and time.monotonic() - last_sync >= self.fsync_interval:
+                    os.fsync(f.fileno())
+                    last_sync = time.monotonic()
+                self._count("written", len(batch))
+                self._count("write_batches")
+            except Exception as e:
+                print(f"[ERROR] Failed to write correlation JSON: {e}")
+                self._count("write_errors")
+                self._count("write_dropped", len(batch))
+                if f is not None:
+                    f.close()
+                    f = None   # Reopen on the next batch
+
+        if f is not None:
+            if self.fsync_interval is not None:
+                os.fsync(f.fileno())
+            f.close()
+
+    def _sender(self) -> None:
+        session = requests.Session()
+        session.headers.update({"X-API-Key": self.api_key, "Content-Type": "application/json"})
+        stop = False
+
+        while not stop:
+            batch, stop = self._next_batch(self._send_q)
+            backoff = 1
+            while batch:
+                try:
+                    r = session.post(self.api_url, json=batch, timeout=self.timeout)
+                except Exception as e:
+                    print(f"[ERROR] Correlation push error: {e}")
+                    r = None
+
+                if r is not None and r.status_code == 200:
+                    self._count("sent", len(batch))
+                    self._count("send_batches")
+                    break
+
+                self._count("send_errors")
+                if r is not None and 400 <= r.status_code < 500 and r.status_code != 429:
+                    # The API rejected the batch itself; retrying will not help
+                    print(f"[WARN] Correlation push failed: {r.status_code}; dropping {len(batch)} events")
+                    self._count("send_dropped", len(batch))
+                    break
+                if r is not None:
+                    print(f"[WARN] Correlation push failed: {r.status_code}; retrying in {backoff}s")
+                if stop:
+                    self._count("send_dropped", len(batch))
+                    break
+                # New events keep queueing (and dropping when full) meanwhile
+                time.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+
+        session.close()
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
@@ -0,0 +1,59 @@
+"""
+Snort fast-alert line parser shared by the agent scripts.
+
+One precompiled regex, anchored at the start of the line, pulls every field
+in a single pass:
+
+  12/29-14:23:45.123456  [**] [1:1000001:1] SSH Brute Force Attempt [**]
+  [Classification: attempted-admin] [Priority: 1] {TCP} 10.0.0.5:52144 -> 172.21.93.154:22
+
+Classification and priority are optional (rules without classtype), ports
+are absent for ICMP, and snort -y adds the year to the timestamp. A line
+that is not a fast alert gives None.
+
+agent-connect-dashboard/fast_alert.py is a copy of this file for the
+standalone snort_server.py; keep the two in sync
+(agent-setup/tests/test_shared_copies.py fails when the code differs).
+"""
+
+import re
+from collections import namedtuple
+
+# Snort writes these with single spaces (two after the timestamp); literal
+# spaces instead of \s+ keep the match fast
+FAST_ALERT_REGEX = re.compile(
+    r"\s*(\d\d/\d\d(?:/\d{2,4})?-\d\d:\d\d:\d\d\.\d+)\s+"   # timestamp
+    r"\[\*\*\] \[(\d+):(\d+):(\d+)\] (.*?) \[\*\*\]"        # gid:sid:rev, message
+    r"(?: \[Classification: ?([^\]]*)\])?"
+    r"(?: \[Priority: ?(\d+)\])?"
+    r" \{(\w+)\} "                                        # protocol
+    r"([\d.]+)(?::(\d+))? -> "
+    r"([\d.]+)(?::(\d+))?"
+)
+
+
+class FastAlert(namedtuple("FastAlert", (
+        "timestamp", "gid", "sid", "rev", "message", "classification", "priority",
+        "protocol", "src_ip", "src_port", "dst_ip", "dst_port"))):
+    __slots__ = ()
+
+    @property
+    def rule_id(self) -> str:
+        return f"{self.gid}:{self.sid}:{self.rev}"
+
+
+_new = tuple.__new__
+
+
+def parse_fast_alert(line: str) -> FastAlert | None:
+    m = FAST_ALERT_REGEX.match(line)
+    if m is None:
+        return None
+    ts, gid, sid, rev, message, classification, priority, proto, src, sport, dst, dport = m.groups()
+    # tuple.__new__ skips the namedtuple constructor's argument handling
+    return _new(FastAlert, (
+        ts, int(gid), int(sid), int(rev), message, classification,
+        int(priority) if priority else None, proto,
+        src, int(sport) if sport else None, dst, int(dport) if dport else None,
+    ))
+
@@ -1,51 +1,137 @@
+#!/usr/bin/env python3
+"""
+Snort fast-alert log -> /opt/ids/output/snort.json (NDJSON, one alert per line).
+
+Each run resumes from the byte offset + inode saved in STATE_FILE, parses
+only the lines appended since, and appends them to the output, so a run
+costs O(new lines) instead of O(total history). Log rotation and
+truncation are followed (the new file is parsed from the start).
+
+    snort_parser.py            parse what is new, then exit (cron)
+    snort_parser.py --follow   keep running, parse lines as they arrive
+    snort_parser.py --rebuild  re-parse the whole log and rewrite the output
+"""
+
 import json
-import re
+import os
+import sys
+
+# Run as a script from parsers/: make the sibling packages importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest.spool import event_uid  # noqa: E402
+from ingest.tailer import FileTailer  # noqa: E402
+from parsers.fast_alert import parse_fast_alert  # noqa: E402
 
 SNORT_LOG = "/var/log/snort/snort.alert.fast"
 OUTPUT_JSON = "/opt/ids/output/snort.json"
+STATE_FILE = os.getenv("SNORT_PARSER_STATE", "/opt/ids/state/snort_parser.json")
+AGENT_ID = os.getenv("AGENT_ID", "vm-snort-01")
 
-# Regex that matches Snort fast alert format with classification & priority
-ALERT_REGEX = re.compile(
-    r"\[\*\*\]\s+\[\d+:\d+:\d+\]\s+(.*?)\s+\[\*\*\]\s+"
-    r"\[Classification:\s+(.*?)\]\s+"
-    r"\[Priority:\s+(\d+)\]\s+"
-    r"\{(\w+)\}\s+([\d\.]+):\d+\s+->\s+([\d\.]+):\d+",
-    re.MULTILINE
-)
+def parse_snort_line(line):
+    """Alert dict for one fast-alert line, or None if it is not an alert."""
+    alert = parse_fast_alert(line)
+    if alert is None:
+        return None
+    priority = alert.priority or 3
 
-def parse_snort_logs():
-    alerts = []
+    return {
+        "source": "snort",
+        "message": alert.message,
+        "rule_id": alert.rule_id,
+        "classification": alert.classification,
+        "priority": priority,
+        "protocol": alert.protocol,
+        "src_ip": alert.src_ip,
+        "src_port": alert.src_port,
+        "dst_ip": alert.dst_ip,
+        "dst_port": alert.dst_port,
+        "severity": "high" if priority <= 2 else "medium",
+        "correlated": False,
+        # Same uid as snort_push.py for the same line, so repeats dedupe
+        "event_uid": event_uid(AGENT_ID, line.strip()),
+    }
 
+def parse_snort_logs():
+    """Every alert in SNORT_LOG (full re-parse)."""
     try:
         with open(SNORT_LOG, "r") as f:
-            data = f.read()
+            return [alert for alert in map(parse_snort_line, f) if alert]
     except FileNotFoundError:
         return []
 
-    for match in ALERT_REGEX.finditer(data):
-        message, classification, priority, protocol, src_ip, dst_ip = match.groups()
+def write_json(alerts):
+    """Replace the output with `alerts` as NDJSON."""
+    os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
+    tmp = f"{OUTPUT_JSON}.tmp"
+    with open(tmp, "w") as f:
+        f.writelines(json.dumps(a) + "\n" for a in alerts)
+    os.replace(tmp, OUTPUT_JSON)
 
-        alert = {
-            "source": "snort",
-            "message": message,
-            "classification": classification,
-            "priority": int(priority),
-            "protocol": protocol,
-            "src_ip": src_ip,
-            "dst_ip": dst_ip,
-            "severity": "high" if int(priority) <= 2 else "medium",
-            "correlated": False
-        }
+# ================= INCREMENTAL =================
 
-        alerts.append(alert)
+def load_position():
+    try:
+        with open(STATE_FILE, "r") as f:
+            state = json.load(f)
+        return state["inode"], state["offset"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
 
-    return alerts
+def save_position(position):
+    tmp = f"{STATE_FILE}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"inode": position[0], "offset": position[1]}, f)
+    os.replace(tmp, STATE_FILE)
 
-def write_json(alerts):
-    with open(OUTPUT_JSON, "w") as f:
-        json.dump(alerts, f, indent=2)
+def append_new(tailer, out):
+    """Parse the lines appended since the last call; returns how many alerts were written."""
+    lines = tailer.read_lines()
+    if not lines:
+        return 0
+    alerts = [alert for alert in map(parse_snort_line, lines) if alert]
+    if alerts:
+        out.write("".join(json.dumps(a) + "\n" for a in alerts))
+        out.flush()
+    # The output is written before the position: a crash in between
+    # re-appends those lines, and push_logs/the backend drop them by event_uid
+    save_position(tailer.position())
+    return len(alerts)
 
-if __name__ == "__main__":
-    alerts = parse_snort_logs()
-    write_json(alerts)
+def run(follow=False):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
+
+    if not os.path.exists(SNORT_LOG) and not follow:
+        return
+
+    resume = load_position()
+    if resume is None:
+        # No saved position (first run of this version, or the state file is
+        # gone): rebuild the output once from the whole log. Alerts it already
+        # held come back with the same event_uid and are dropped downstream
+        write_json([])
+
+    tailer = FileTailer(SNORT_LOG, from_end=False, resume=resume)
+    try:
+        with open(OUTPUT_JSON, "a") as out:
+            count = append_new(tailer, out)
+            print(f"[INFO] {count} new alerts -> {OUTPUT_JSON}")
+            while follow:
+                tailer.wait(1.0)
+                append_new(tailer, out)
+    finally:
+        tailer.close()
 
+def rebuild():
+    """Forget the position and start a fresh output from the whole log."""
+    write_json([])
+    try:
+        os.remove(STATE_FILE)
+    except FileNotFoundError:
+        pass
+
+if __name__ == "__main__":
+    if "--rebuild" in sys.argv[1:]:
+        rebuild()
+    run(follow="--follow" in sys.argv[1:])
@@ -0,0 +1,130 @@
+"""
+Fast timestamp parsing for Snort and Wazuh records.
+
+Both layouts are fixed-width, so fields are sliced at known offsets instead
+of going through strptime:
+
+  Snort fast alert   12/29-14:23:45.123456      (snort -y: 12/29/25-14:23:45.123456)
+  Wazuh alerts.json  2025-12-04T20:18:01.093+0000
+
+Everything up to the second (plus the UTC offset for Wazuh) is cached, so
+alerts within the same second cost one dict lookup and one replace() for
+the fraction. Anything that does not fit the layout falls back to the slow
+parsers.
+
+Snort omits the year; it is taken from the clock and moved to the previous
+or next year when that puts the alert closer to now, so a 12/31 alert read
+on 01/01 (or the other way round, with some clock skew) is dated correctly.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+# Distinct seconds to remember before starting over
+CACHE_SIZE = 4096
+
+_HALF_YEAR = timedelta(days=183)
+
+_snort_cache = {}
+_wazuh_cache = {}
+
+
+def _fraction(digits: str) -> int:
+    """'123456' / '093' / '5' -> microseconds."""
+    if len(digits) == 6:
+        return int(digits)
+    return int((digits + "000000")[:6])
+
+
+def snort_time(ts: str, now: datetime | None = None) -> datetime:
+    """
+    '12/29-14:23:45.123456' -> aware UTC datetime. `now` (default: the
+    clock) picks the year; it is only consulted for a second not yet cached.
+    """
+    if len(ts) > 15 and ts[5] == "-" and ts[14] == ".":
+        second, fraction = ts[:14], ts[15:]
+    elif len(ts) > 18 and ts[5] == "/" and ts[8] == "-" and ts[17] == ".":
+        second, fraction = ts[:17], ts[18:]
+    else:
+        return _snort_time_slow(ts, now)
+
+    base = _snort_cache.get(second)
+    if base is None:
+        try:
+            base = _snort_second(second, now)
+        except ValueError:
+            return _snort_time_slow(ts, now)
+        if len(_snort_cache) >= CACHE_SIZE:
+            _snort_cache.clear()
+        _snort_cache[second] = base
+    return base.replace(microsecond=_fraction(fraction)) if fraction.isdigit() else base
+
+
+def _snort_second(second: str, now: datetime | None) -> datetime:
+    month, day = int(second[0:2]), int(second[3:5])
+    clock = second[-8:]
+    hour, minute, sec = int(clock[0:2]), int(clock[3:5]), int(clock[6:8])
+
+    if second[5] == "/":
+        year = int(second[6:8]) + 2000
+        return datetime(year, month, day, hour, minute, sec, tzinfo=timezone.utc)
+
+    now = now or datetime.now(timezone.utc)
+    for year in (now.year, now.year - 1, now.year + 1):
+        try:
+            dt = datetime(year, month, day, hour, minute, sec, tzinfo=timezone.utc)
+        except ValueError:
+            continue    # 02/29 outside a leap year
+        if abs(dt - now) <= _HALF_YEAR:
+            return dt
+    return datetime(now.year, month, day, hour, minute, sec, tzinfo=timezone.utc)
+
+
+def _snort_time_slow(ts: str, now: datetime | None) -> datetime:
+    now = now or datetime.now(timezone.utc)
+    if ts.count("/") == 2:
+        candidates = (ts, "%m/%d/%Y-%H:%M:%S.%f"), (ts, "%m/%d/%y-%H:%M:%S.%f")
+    else:
+        # Year prefixed before parsing so 02/29 is valid in leap years
+        candidates = (f"{now.year}/{ts}", "%Y/%m/%d-%H:%M:%S.%f"),
+    for value, fmt in candidates:
+        try:
+            return datetime.strptime(value, fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    return now
+
+
+def wazuh_time(ts: str) -> datetime:
+    """'2025-12-04T20:18:01.093+0000' -> aware datetime (offset kept)."""
+    if len(ts) > 24 and ts[10] == "T" and ts[19] == ".":
+        end = len(ts) - 5
+        if ts[end] in "+-":
+            key = ts[:19] + ts[end:]
+            base = _wazuh_cache.get(key)
+            if base is None:
+                try:
+                    base = _wazuh_second(ts[:19], ts[end:])
+                except ValueError:
+                    return _wazuh_time_slow(ts)
+                if len(_wazuh_cache) >= CACHE_SIZE:
+                    _wazuh_cache.clear()
+                _wazuh_cache[key] = base
+            fraction = ts[20:end]
+            if fraction.isdigit():
+                return base.replace(microsecond=_fraction(fraction))
+    return _wazuh_time_slow(ts)
+
+
+def _wazuh_second(second: str, offset: str) -> datetime:
+    minutes = int(offset[1:3]) * 60 + int(offset[3:5])
+    tz = timezone.utc if minutes == 0 else timezone(timedelta(minutes=-minutes if offset[0] == "-" else minutes))
+    return datetime(int(second[0:4]), int(second[5:7]), int(second[8:10]),
+                    int(second[11:13]), int(second[14:16]), int(second[17:19]), tzinfo=tz)
+
+
+def _wazuh_time_slow(ts: str) -> datetime:
+    try:
+        return datetime.strptime(ts, "%Y-%m-%dT%H:%M:%S.%f%z")
+    except ValueError:
+        # Fallback: treat as naive UTC
+        return datetime.fromisoformat(ts.replace("Z", "+00:00")).replace(tzinfo=timezone.utc)
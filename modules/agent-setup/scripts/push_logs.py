@@ -2,12 +2,18 @@
 import json
 import time
 import os
-import requests
+
+from ingest.batch_client import BatchClient
+from ingest.offset_reader import OffsetReader
+from ingest.spool import Spool, SpoolSender, event_uid
 
 # ================= CONFIG =================
 SNORT_JSON = "/opt/ids/output/snort.json"
 CORRELATION_JSON = "/opt/ids/output/correlation.json"
 STATE_DIR = "/opt/ids/state"
+# Byte offset + inode per source; *.offset are the old element counts
+SNORT_POS_FILE = f"{STATE_DIR}/snort.pos"
+CORR_POS_FILE = f"{STATE_DIR}/correlation.pos"
 SNORT_OFFSET_FILE = f"{STATE_DIR}/snort.offset"
 CORR_OFFSET_FILE = f"{STATE_DIR}/correlation.offset"
 
@@ -17,91 +23,60 @@ CORRELATOR_AGENT_ID = os.environ.get("AGENT_ID", "vm-correlator-01")
 AGENT_NAME = os.environ.get("AGENT_NAME", "agent2")
 
 PUSH_INTERVAL = 5  # seconds
-# =========================================
-
-def read_offset(path):
-    try:
-        with open(path, "r") as f:
-            return int(f.read().strip())
-    except:
-        return 0
 
-def write_offset(path, value):
-    with open(path, "w") as f:
-        f.write(str(value))
+# New events are spooled on disk and sent by a background sender
+SPOOL_DIR = os.environ.get("SPOOL_DIR", f"{STATE_DIR}/spool")
+SPOOL_MAX_MB = int(os.environ.get("SPOOL_MAX_MB", "512"))
+# =========================================
 
-def push_events(file_path, offset_file, endpoint, source, correlated):
-    if not os.path.exists(file_path):
+def spool_events(spool, reader, source, correlated):
+    if not os.path.exists(reader.path):
         return
-    
-    offset = read_offset(offset_file)
-    events = []
-    
+
     try:
-        with open(file_path, "r") as f:
-            content = f.read().strip()
-            
-            # Case 1: JSON array (Snort)
-            if content.startswith("["):
-                data = json.loads(content)
-                if isinstance(data, list):
-                    events = data[offset:]
-            
-            # Case 2: Line-delimited JSON (Correlation)
-            else:
-                lines = content.splitlines()
-                for line in lines[offset:]:
-                    try:
-                        events.append(json.loads(line))
-                    except json.JSONDecodeError:
-                        continue
-    
+        events = reader.read_records()
     except Exception as e:
-        print(f"[ERROR] Failed reading {file_path}: {e}")
+        print(f"[ERROR] Failed reading {reader.path}: {e}")
         return
-    
+
     if not events:
         return
-    
+
     for event in events:
+        # Same event re-read after a crash -> same uid, skipped by the backend
+        event.setdefault("event_uid", event_uid(source, json.dumps(event, sort_keys=True)))
         event["source"] = source
         event["correlated"] = correlated
         # 🔑 Inject agent_id ONLY for correlation
         if source == "correlation":
             event["agent_name"] = AGENT_NAME
-            print(f"[PUSH] {source} event →", event.get("correlation_id", "no-id"))
-        
-        try:
-            r = requests.post(
-                endpoint,
-                json=event,
-                headers={"X-API-Key": API_KEY},
-                timeout=3
-            )
-            if r.status_code != 200:
-                print(f"[WARN] Push failed ({source}): {r.status_code}")
-        except Exception as e:
-            print(f"[ERROR] Push failed: {e}")
-            return
-    
-    write_offset(offset_file, offset + len(events))
+            print(f"[SPOOL] {source} event →", event.get("correlation_id", "no-id"))
+
+    # Spooled locally: the position advances even while the backend is down
+    spool.append(events)
+    reader.commit()
 
 def main():
     os.makedirs(STATE_DIR, exist_ok=True)
-    
+
+    spool = Spool(os.path.join(SPOOL_DIR, "push_logs"), max_bytes=SPOOL_MAX_MB * 1024 * 1024)
+    client = BatchClient(f"{API_BASE}/ingest/batch", API_KEY, label="events")
+    SpoolSender(spool, client.send, name="push-logs-sender").start()
+
+    corr_reader = OffsetReader(CORRELATION_JSON, CORR_POS_FILE, CORR_OFFSET_FILE)
+    snort_reader = OffsetReader(SNORT_JSON, SNORT_POS_FILE, SNORT_OFFSET_FILE)
+
     while True:
-        push_events(
-            CORRELATION_JSON,
-            CORR_OFFSET_FILE,
-            f"{API_BASE}/correlation",
+        spool_events(
+            spool,
+            corr_reader,
             "correlation",
             True
         )
         
-        push_events(
-            SNORT_JSON,
-            SNORT_OFFSET_FILE,
-            f"{API_BASE}/snort",
+        spool_events(
+            spool,
+            snort_reader,
             source="snort",
             correlated=False
         )
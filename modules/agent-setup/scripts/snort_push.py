@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 
 import os
+import json
 import time
-import re
-import requests
 from datetime import datetime, timezone
 
+from ingest.batch_client import BatchClient
+from ingest.spool import Spool, SpoolSender, event_uid
+from ingest.tailer import FileTailer
+from parsers.fast_alert import parse_fast_alert
+from parsers.timestamps import snort_time
+
 ENV_FILE = "/etc/ids-agent/agent.env"
 
 def load_env_file(path: str) -> None:
@@ -34,43 +39,63 @@ API_KEY = os.getenv("API_KEY", "ids_vm_secret_key_123")
 AGENT_ID = os.getenv("AGENT_ID", "vm-snort-01")
 SNORT_LOG = os.getenv("SNORT_FAST_LOG", "/var/log/snort/snort.alert.fast")
 
-API_URL = f"{DASHBOARD_API_BASE_URL}/api/snort"
+API_URL = f"{DASHBOARD_API_BASE_URL}/api/ingest/batch"
 
-def parse_snort_line(line: str) -> dict:
-    ip_match = re.search(r'(\d+\.\d+\.\d+\.\d+).*-> (\d+\.\d+\.\d+\.\d+)', line)
-    priority_match = re.search(r'Priority: (\d+)', line)
+# Micro-batching: send when BATCH_SIZE events are queued or the oldest has
+# waited BATCH_LINGER_MS, whichever comes first
+BATCH_SIZE = int(os.getenv("SNORT_BATCH_SIZE", "500"))
+BATCH_LINGER_MS = int(os.getenv("SNORT_BATCH_LINGER_MS", "200"))
+STATS_INTERVAL = 30  # seconds between throughput / lag reports
+
+# Alerts are spooled on disk first, so a backend outage delays them instead of dropping them
+SPOOL_DIR = os.getenv("SPOOL_DIR", "/opt/ids/state/spool")
+SPOOL_MAX_MB = int(os.getenv("SPOOL_MAX_MB", "512"))
+STATE_FILE = os.getenv("SNORT_PUSH_STATE", "/opt/ids/state/snort_push.json")
 
-    return {
+def parse_snort_line(line: str) -> dict:
+    # The alert's own time, so a line re-read after a crash (spooled, position
+    # not saved yet) carries the same timestamp and event_uid and the backend
+    # skips it; only lines that do not parse are stamped with the clock
+    event = {
         "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
         "source": "snort",
         "agent_id": AGENT_ID,
         "message": line.strip(),
-        "priority": priority_match.group(1) if priority_match else "3",
-        "src_ip": ip_match.group(1) if ip_match else None,
-        "dest_ip": ip_match.group(2) if ip_match else None,
+        "priority": "3",
+        "src_ip": None,
+        "dest_ip": None,
+        "event_uid": event_uid(AGENT_ID, line.strip()),
     }
 
-def push_event(event: dict) -> None:
-    print("[DEBUG] Payload being sent:", event)
-
+    alert = parse_fast_alert(line)
+    if alert:
+        event.update({
+            "timestamp": snort_time(alert.timestamp).strftime("%Y-%m-%d %H:%M:%S"),
+            "priority": str(alert.priority or 3),
+            "src_ip": alert.src_ip,
+            "dest_ip": alert.dst_ip,
+            "src_port": alert.src_port,
+            "dest_port": alert.dst_port,
+            "protocol": alert.protocol,
+            "rule_id": alert.rule_id,
+            "classification": alert.classification,
+        })
+    return event
+
+def load_position():
+    """(inode, offset) of the last line spooled, so a restart resumes there."""
     try:
-        r = requests.post(
-            API_URL,
-            json=event,
-            headers={
-                "X-API-Key": API_KEY,
-                "Content-Type": "application/json",
-            },
-            timeout=(10, 20),  # connect timeout, read timeout
-        )
-
-        if r.status_code != 200:
-            print(f"[WARN] Push failed: {r.status_code} body={r.text[:200]}")
-        else:
-            print("[OK] Snort event pushed")
-
-    except Exception as e:
-        print("[ERROR] Push error:", e)
+        with open(STATE_FILE, "r") as f:
+            state = json.load(f)
+        return state["inode"], state["offset"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+def save_position(position) -> None:
+    tmp = f"{STATE_FILE}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"inode": position[0], "offset": position[1]}, f)
+    os.replace(tmp, STATE_FILE)
 
 def main() -> None:
     print("[INFO] Snort push service started")
@@ -78,20 +103,37 @@ def main() -> None:
     print("[INFO] AGENT_ID:", AGENT_ID)
     print("[INFO] Watching:", SNORT_LOG)
 
-    try:
-        with open(SNORT_LOG, "r", errors="ignore") as f:
-            f.seek(0, 2)  # jump to end
+    print(f"[INFO] Batching: {BATCH_SIZE} events or {BATCH_LINGER_MS} ms")
 
-            while True:
-                line = f.readline()
-                if not line:
-                    time.sleep(1)
-                    continue
-
-                if line.strip():
-                    print("[DEBUG] New snort alert:", line.strip())
-                    event = parse_snort_line(line)
-                    push_event(event)
+    try:
+        os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+        spool = Spool(os.path.join(SPOOL_DIR, "snort"), max_bytes=SPOOL_MAX_MB * 1024 * 1024)
+        client = BatchClient(API_URL, API_KEY, label="snort events")
+        sender = SpoolSender(spool, client.send, batch_size=BATCH_SIZE,
+                             linger=BATCH_LINGER_MS / 1000, name="snort-sender")
+        sender.start()
+
+        # Resumes after the last spooled line (first start: at the end);
+        # follows logrotate and truncation without losing lines
+        tailer = FileTailer(SNORT_LOG, from_end=True, resume=load_position())
+        last_stats = time.monotonic()
+        last_committed = 0
+
+        while True:
+            events = [parse_snort_line(line) for line in tailer.read_lines() if line.strip()]
+            if events:
+                spool.append(events)
+                save_position(tailer.position())
+
+            now = time.monotonic()
+            if now - last_stats >= STATS_INTERVAL:
+                stats = spool.stats()
+                rate = (stats["committed"] - last_committed) / (now - last_stats)
+                print(f"[INFO] {rate:.1f} events/s pushed, {tailer.backlog()} bytes behind EOF, "
+                      f"{stats['pending_bytes']} bytes spooled")
+                last_committed, last_stats = stats["committed"], now
+
+            tailer.wait(1.0)
 
     except Exception as e:
         print("[FATAL]", e)
@@ -0,0 +1,61 @@
+"""
+Regression tests for the declarative correlation rules (rules.json).
+
+Usage: python3 -m unittest discover -s tests   (from modules/agent-setup)
+"""
+
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from correlation.rules import RuleEngine, load_rules  # noqa: E402
+
+RULES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts", "correlation", "rules.json")
+
+NOW = datetime(2026, 1, 4, 12, 0, tzinfo=timezone.utc)
+
+
+def wazuh(seconds, src_ip, desc="sshd"):
+    return {"time": NOW + timedelta(seconds=seconds), "src_ip": src_ip, "agent": "agent1", "desc": desc}
+
+
+class SshBruteforceToSuccessTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = RuleEngine(load_rules(RULES))
+
+    def success(self, src_ip):
+        matches = self.engine.evaluate("ssh_success", wazuh(30, src_ip), NOW)
+        return [m for m in matches if m.rule.name == "SSH_BRUTEFORCE_TO_SUCCESS"]
+
+    def fail(self, seconds, src_ip):
+        self.engine.record("ssh_fail", wazuh(seconds, src_ip))
+
+    def test_failures_from_the_same_ip(self):
+        for s in (1, 2, 3):
+            self.fail(s, "10.0.0.5")
+        matches = self.success("10.0.0.5")
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(self.engine.build(matches[0])["failed_attempts"], 3)
+
+    def test_failures_from_another_ip(self):
+        for s in (1, 2, 3):
+            self.fail(s, "10.0.0.5")
+        self.assertEqual(self.success("10.0.0.6"), [])
+
+    def test_success_without_source_ip(self):
+        # Failures of a known IP do not count toward a login of unknown origin
+        for s in (1, 2, 3):
+            self.fail(s, "10.0.0.5")
+        self.assertEqual(self.success("unknown"), [])
+
+    def test_snort_bruteforce_from_unknown_source(self):
+        # The Snort stage still joins a login without a source IP
+        self.engine.record("ssh_bruteforce", {"time": NOW, "src_ip": "10.0.0.5", "raw": "line"})
+        self.assertEqual(len(self.success("unknown")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
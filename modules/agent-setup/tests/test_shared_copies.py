@@ -0,0 +1,39 @@
+"""
+Modules deployed as verbatim copies elsewhere in the repo (hosts that do
+not get agent-setup): the code after the module docstring must match.
+
+Usage: python3 -m unittest discover -s tests   (from modules/agent-setup)
+"""
+
+import ast
+import os
+import unittest
+
+MODULES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+
+# original (agent-setup) -> copy
+COPIES = {
+    "agent-setup/scripts/ingest/spool.py": "wazuh-manager-setup/scripts/spool.py",
+    "agent-setup/scripts/parsers/fast_alert.py": "agent-connect-dashboard/fast_alert.py",
+}
+
+
+def code(path):
+    """Source of `path` without its module docstring."""
+    with open(os.path.join(MODULES, path), "r", encoding="utf-8") as f:
+        source = f.read()
+    body = ast.parse(source).body
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant):
+        return "".join(source.splitlines(keepends=True)[body[0].end_lineno:])
+    return source
+
+
+class SharedCopiesTest(unittest.TestCase):
+    def test_copies_match(self):
+        for original, copy in COPIES.items():
+            with self.subTest(copy=copy):
+                self.assertEqual(code(copy), code(original), f"{copy} differs from {original}; copy it over")
+
+
+if __name__ == "__main__":
+    unittest.main()
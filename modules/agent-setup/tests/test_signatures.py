@@ -0,0 +1,40 @@
+"""
+Regression tests for the single-pass Snort signature classifier.
+
+Usage: python3 -m unittest discover -s tests   (from modules/agent-setup)
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from correlation.signatures import SignatureMatcher  # noqa: E402
+
+
+def fast_alert(message):
+    return (f"12/29-14:23:45.123456  [**] [1:1000001:1] {message} [**] "
+            f"[Classification: attempted-recon] [Priority: 2] {{TCP}} 10.0.0.5:4444 -> 172.21.93.154:22")
+
+
+class SignatureMatcherTest(unittest.TestCase):
+    def test_nested_literals(self):
+        matcher = SignatureMatcher({"a": ["TCP SYN PORT SCAN"], "b": ["PORT SCAN"], "c": ["SYN"]})
+        self.assertEqual(set(matcher.classify(fast_alert("TCP SYN PORT SCAN"))), {"a", "b", "c"})
+
+    def test_overlapping_literals(self):
+        matcher = SignatureMatcher({"x": ["SCAN NMAP"], "y": ["NMAP XMAS"]})
+        self.assertEqual(set(matcher.classify(fast_alert("SCAN NMAP XMAS"))), {"x", "y"})
+
+    def test_prefix_literals(self):
+        matcher = SignatureMatcher({"p": ["PORT"], "q": ["PORT SCAN"]})
+        self.assertEqual(set(matcher.classify(fast_alert("Port Scan Detected"))), {"p", "q"})
+
+    def test_no_match(self):
+        matcher = SignatureMatcher({"a": ["NMAP"]})
+        self.assertEqual(matcher.classify(fast_alert("SSH Brute Force Attempt")), ())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Regression tests for the on-disk spool's commit cursor.
+
+Usage: python3 -m unittest discover -s tests   (from modules/agent-setup)
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from ingest.spool import Spool  # noqa: E402
+
+
+class SpoolCursorTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write_commit(self, segment, offset):
+        with open(os.path.join(self.directory, "commit"), "w") as f:
+            json.dump({"segment": segment, "offset": offset}, f)
+
+    def test_resume_from_commit(self):
+        spool = Spool(self.directory)
+        spool.append([{"n": 1}, {"n": 2}])
+        records, cursor = spool.read(1)
+        spool.commit(cursor, len(records))
+        spool.close()
+
+        records, _ = Spool(self.directory).read()
+        self.assertEqual(records, [{"n": 2}])
+
+    def test_missing_committed_segment(self):
+        self.write_commit(5, 100)
+        spool = Spool(self.directory)
+        spool.append([{"n": 1}])
+        records, _ = spool.read()
+        self.assertEqual(records, [{"n": 1}])
+
+    def test_committed_segment_between_segments(self):
+        spool = Spool(self.directory, segment_bytes=1)
+        spool.append([{"n": 1}])
+        spool.append([{"n": 2}])
+        spool.append([{"n": 3}])
+        spool.close()
+        os.remove(os.path.join(self.directory, f"{1:012d}.ndjson"))
+        self.write_commit(1, 5)
+
+        records, _ = Spool(self.directory).read()
+        self.assertEqual(records, [{"n": 3}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,36 +1,39 @@
-from flask import Flask, request, jsonify
+import base64
+import binascii
+import functools
+import hashlib
+import json
+import zlib
+from datetime import datetime, timedelta
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from datetime import datetime, timezone
 from db import (
     insert_snort_log,
     insert_wazuh_log,
     fetch_correlated_logs,
     insert_correlation_log,
+    insert_batch,
     fetch_logs,
-    get_conn
+    fetch_snort_logs,
+    fetch_wazuh_logs,
+    fetch_max_ids,
+    fetch_active_correlated_agents,
+    pool_stats,
+    PAGE_SIZE,
+    MAX_PAGE_SIZE
 )
+from timestamps import mysql_datetime
+from stream import broker, feed
+from rollups import ROLLUP_CACHE_TABLES, compactor, window_counts
+from partitions import maintainer
+from cache import read_cache
 
 API_KEY = "ids_vm_secret_key_123"
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["X-Next-Cursor", "X-Since-Id", "X-Delta-More", "X-Rollup-Lag", "ETag"])
 
 
 
-# ======================
-# TIMESTAMP NORMALIZATION
-# ======================
-def normalize_ts(ts):
-    try:
-        s = str(ts).replace("Z", "+00:00")
-        if s.endswith(" UTC"):
-            s = s.replace(" UTC", "+00:00")
-        if len(s) >= 5 and s[-5] in ["+", "-"] and s[-2:].isdigit():
-            s = s[:-5] + s[-5:-2] + ":" + s[-2:]
-        dt = datetime.fromisoformat(s)
-        return dt.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-    except Exception:
-        return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-
 # ======================
 # API KEY AUTH
 # ======================
@@ -40,32 +43,34 @@ def authorize(req):
 # ======================
 # SNORT ENDPOINT
 # ======================
-@app.route("/api/snort", methods=["POST"])
-def snort_logs():
-    if not authorize(request):
-        return jsonify({"error": "unauthorized"}), 401
-    event = request.json or {}
-    normalized = {
+def normalize_snort(event):
+    return {
         "timestamp": event.get("timestamp"),
         "agent_id": event.get("agent_id", "unknown-agent"),
         "message": event.get("msg") or event.get("message", ""),
         "severity": str(event.get("priority", "INFO")),
         "src_ip": event.get("src_ip"),
         "dest_ip": event.get("dest_ip"),
+        "src_port": event.get("src_port"),
+        "dest_port": event.get("dest_port"),
+        "protocol": event.get("protocol"),
+        "event_uid": event.get("event_uid"),
         "correlated": 0
     }
-    insert_snort_log(normalized)
+
+@app.route("/api/snort", methods=["POST"])
+def snort_logs():
+    if not authorize(request):
+        return jsonify({"error": "unauthorized"}), 401
+    event = request.json or {}
+    insert_snort_log(normalize_snort(event))
     return jsonify({"status": "snort log stored"}), 200
 
 # ======================
 # WAZUH ENDPOINT
 # ======================
-@app.route("/api/wazuh", methods=["POST"])
-def wazuh_logs():
-    raw = request.get_json(force=True)
-
-    # ---- NORMALIZE WAZUH EVENT ----
-    normalized = {
+def normalize_wazuh(raw):
+    return {
         "alert_id": raw.get("id"),
         "timestamp": raw.get("timestamp"),
 
@@ -81,7 +86,12 @@ def wazuh_logs():
         "event_type": "wazuh_alert"
     }
 
-    insert_wazuh_log(normalized)
+@app.route("/api/wazuh", methods=["POST"])
+def wazuh_logs():
+    raw = request.get_json(force=True)
+
+    # ---- NORMALIZE WAZUH EVENT ----
+    insert_wazuh_log(normalize_wazuh(raw))
 
     return jsonify({"status": "wazuh log stored"})
 
@@ -89,29 +99,313 @@ def wazuh_logs():
 # ======================
 # CORRELATION ENDPOINT
 # ======================
-@app.route("/api/correlation", methods=["POST"])
-def correlation_logs():
-    if not authorize(request):
-        return jsonify({"error": "unauthorized"}), 401
-    event = request.json or {}
-    if not event.get("correlated", False):
-        return jsonify({"ignored": "not correlated"}), 200
-    normalized = {
+def normalize_correlation(event):
+    return {
         "timestamp": event.get("timestamp"),
         "agent_id": event.get("agent_id", "correlator-unknown"),
         "severity": event.get("severity", "medium"),
+        "event_uid": event.get("event_uid"),
         "correlated": True,
         "raw": event
     }
-    insert_correlation_log(normalized)
+
+@app.route("/api/correlation", methods=["POST"])
+def correlation_logs():
+    if not authorize(request):
+        return jsonify({"error": "unauthorized"}), 401
+    payload = request.json or {}
+
+    # Batched agents send a list of events; stored in one transaction
+    if isinstance(payload, list):
+        events = [
+            normalize_correlation(e) for e in payload
+            if isinstance(e, dict) and e.get("correlated", False)
+        ]
+        if events:
+            insert_batch({"correlation": events})
+        return jsonify({"status": "correlations stored", "stored": len(events)}), 200
+
+    if not payload.get("correlated", False):
+        return jsonify({"ignored": "not correlated"}), 200
+    insert_correlation_log(normalize_correlation(payload))
     return jsonify({"status": "correlation stored"}), 200
 
+# ======================
+# BULK INGEST ENDPOINT
+# ======================
+MAX_BATCH_ITEMS = 5000
+MAX_BATCH_BYTES = 64 * 1024 * 1024   # decompressed body
+
+INGEST_NORMALIZERS = {
+    "snort": normalize_snort,
+    "wazuh": normalize_wazuh,
+    "correlation": normalize_correlation,
+}
+
+def ingest_type(event):
+    """Table group of a mixed-batch item: explicit type/source, else a raw Wazuh alert."""
+    kind = event.get("type") or event.get("source")
+    if kind in INGEST_NORMALIZERS:
+        return kind
+    if isinstance(event.get("rule"), dict):
+        return "wazuh"
+    return None
+
+def read_batch_body(req):
+    """Raw body, gunzipped when sent with Content-Encoding: gzip (size-capped)."""
+    body = req.get_data()
+    if req.headers.get("Content-Encoding", "").lower() != "gzip":
+        return body
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    body = inflater.decompress(body, MAX_BATCH_BYTES + 1)
+    if len(body) > MAX_BATCH_BYTES:
+        raise OverflowError(f"decompressed body exceeds {MAX_BATCH_BYTES} bytes")
+    return body
+
+def parse_batch_body(body):
+    """
+    JSON array or NDJSON body -> list of (item, error). A malformed NDJSON
+    line only fails that item.
+    """
+    if body.lstrip()[:1] == b"[":
+        items = json.loads(body)
+        return [(item, None) for item in items]
+
+    parsed = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            parsed.append((json.loads(line), None))
+        except ValueError as e:
+            parsed.append((None, f"invalid JSON: {e}"))
+    return parsed
+
+@app.route("/api/ingest/batch", methods=["POST"])
+def ingest_batch():
+    if not authorize(request):
+        return jsonify({"error": "unauthorized"}), 401
+
+    try:
+        parsed = parse_batch_body(read_batch_body(request))
+    except OverflowError as e:
+        return jsonify({"error": str(e)}), 413
+    except zlib.error as e:
+        return jsonify({"error": f"invalid gzip body: {e}"}), 400
+    except ValueError as e:
+        return jsonify({"error": f"invalid JSON body: {e}"}), 400
+    if len(parsed) > MAX_BATCH_ITEMS:
+        return jsonify({"error": f"batch exceeds {MAX_BATCH_ITEMS} items"}), 413
+
+    groups = {kind: [] for kind in INGEST_NORMALIZERS}
+    results = []
+    for index, (item, error) in enumerate(parsed):
+        kind = None
+        if error is None and not isinstance(item, dict):
+            error = "item is not an object"
+        if error is None:
+            kind = ingest_type(item)
+            if kind is None:
+                error = "unknown event type"
+
+        if error:
+            results.append({"index": index, "status": "error", "error": error})
+        elif kind == "correlation" and not item.get("correlated", False):
+            results.append({"index": index, "type": kind, "status": "ignored"})
+        else:
+            groups[kind].append(INGEST_NORMALIZERS[kind](item))
+            results.append({"index": index, "type": kind, "status": "stored"})
+
+    accepted = sum(len(events) for events in groups.values())
+    inserted = {}
+    if accepted:
+        try:
+            inserted = insert_batch(groups)
+        except Exception as e:
+            print("❌ BATCH DB INSERT FAILED:", e)
+            for r in results:
+                if r["status"] == "stored":
+                    r["status"] = "error"
+                    r["error"] = "database error"
+            return jsonify({"stored": 0, "failed": len(results), "results": results}), 500
+
+    return jsonify({
+        "stored": accepted,
+        # Replays (same event_uid, or Wazuh alert_id) are skipped
+        "duplicates": sum(len(events) - inserted.get(group, len(events)) for group, events in groups.items()),
+        "failed": sum(1 for r in results if r["status"] == "error"),
+        "results": results
+    }), 200
+
+# ======================
+# DB POOL METRICS
+# ======================
+@app.route("/api/db-pool", methods=["GET"])
+def db_pool_metrics():
+    return jsonify(pool_stats()), 200
+
+# ======================
+# PAGINATION / FILTERS
+# ======================
+# GET /api/logs, /api/snort-logs and /api/wazuh-logs accept
+#   limit, since, until, severity (comma list), agent, src_ip, signature,
+#   cursor (from the X-Next-Cursor header of the previous page)
+# The body stays a JSON array; X-Next-Cursor is absent on the last page.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(value, size):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+    except (ValueError, binascii.Error):
+        raise ValueError("invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("invalid cursor")
+    return values
+
+def cursor_ts(value):
+    if isinstance(value, datetime):
+        # security_logs.timestamp has microseconds; a truncated cursor would skip rows
+        return value.isoformat(sep=" ")
+    return str(value)
+
+def page_args(args, cursor_size=2):
+    """(filters, after, limit) from the query string; ValueError on bad input."""
+    try:
+        limit = int(args.get("limit", PAGE_SIZE))
+    except ValueError:
+        raise ValueError("invalid limit")
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+
+    filters = {}
+    for name in ("since", "until"):
+        value = args.get(name)
+        if not value:
+            continue
+        if len(value) == 10:
+            value += " 00:00:00"   # date only
+        ts = mysql_datetime(value)
+        if ts is None:
+            raise ValueError(f"invalid {name}")
+        filters[name] = ts
+    if args.get("severity"):
+        filters["severity"] = [v.strip().lower() for v in args["severity"].split(",") if v.strip()]
+    for name in ("agent", "src_ip", "signature"):
+        if args.get(name):
+            filters[name] = args[name]
+
+    after = decode_cursor(args["cursor"], cursor_size) if args.get("cursor") else None
+    return filters, after, limit
+
+def paged_response(items, has_more, last_cursor, headers=None):
+    resp = jsonify(items)
+    if has_more:
+        resp.headers[NEXT_CURSOR_HEADER] = encode_cursor(last_cursor)
+    for name, value in (headers or {}).items():
+        resp.headers[name] = value
+    return resp, 200
+
+# ======================
+# DELTA POLLING (since_id / ETag)
+# ======================
+# Every fetch response carries X-Since-Id (the newest id per table when the
+# request was served) and an ETag. A poller sends them back as ?since_id=
+# to get only newer rows, and as If-None-Match to get a bodiless 304 when
+# nothing was inserted since; that costs one MAX(id) primary-key lookup.
+# /api/logs spans two tables, its since_id is "<snort id>:<correlation id>".
+#
+# A delta returns the oldest new rows first (up to `limit` per table). When
+# more are waiting, X-Since-Id is the highest id delivered rather than
+# MAX(id) and X-Delta-More is set, so the poller asks again right away
+# instead of skipping the rest of a burst.
+SINCE_ID_HEADER = "X-Since-Id"
+DELTA_MORE_HEADER = "X-Delta-More"
+ETAG_IGNORED_ARGS = ("_t", "since_id")   # cache busters and the watermark itself
+
+def parse_since_id(args, size=1):
+    value = args.get("since_id")
+    if not value:
+        return None
+    try:
+        ids = [int(v) for v in value.split(":")]
+    except ValueError:
+        raise ValueError("invalid since_id")
+    if len(ids) != size or min(ids) < 0:
+        raise ValueError("invalid since_id")
+    return ids if size > 1 else ids[0]
+
+def change_check(tables, since_ids=None):
+    """
+    (headers, not_modified, marks) for a fetch over `tables`. The ETag
+    covers the path, the query (minus ETAG_IGNORED_ARGS) and each table's
+    MAX(id); a poller whose since_ids are behind MAX(id) is never answered
+    304.
+    """
+    marks = fetch_max_ids(tables)
+    args = sorted((k, v) for k, v in request.args.items(multi=True) if k not in ETAG_IGNORED_ARGS)
+    raw = json.dumps([request.path, args, [marks[t] for t in tables]])
+    etag = '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest() + '"'
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        SINCE_ID_HEADER: ":".join(str(marks[t]) for t in tables),
+    }
+    sent = request.headers.get("If-None-Match") or ""
+    not_modified = etag in [t.strip().removeprefix("W/") for t in sent.split(",")]
+    if since_ids is not None and any(since < marks[t] for since, t in zip(since_ids, tables)):
+        not_modified = False
+    return headers, not_modified, marks
+
+def delta_rows(rows, limit, since_id, mark):
+    """
+    (rows newest first, next since_id, more) from the rows of a delta poll
+    (lowest ids first, up to limit + 1).
+    """
+    more = len(rows) > limit
+    rows = sorted(rows, key=lambda r: r["id"])[:limit]
+    delivered = max([since_id] + [r["id"] for r in rows])
+    rows.sort(key=lambda r: (r["timestamp"], r["id"]), reverse=True)
+    return rows, (delivered if more else max(mark, delivered)), more
+
 # ======================
 # UNIFIED FETCH ENDPOINT
 # ======================
 @app.route("/api/logs", methods=["GET"])
 def get_logs():
-    rows = fetch_logs()
+    try:
+        filters, after, limit = page_args(request.args, cursor_size=3)
+        since_ids = parse_since_id(request.args, size=2)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    tables = ["snort_logs", "security_logs"]
+    headers, not_modified, marks = change_check(tables, since_ids)
+    if not_modified:
+        return "", 304, headers
+    if since_ids:
+        filters["since_ids"] = {"snort": since_ids[0], "correlation": since_ids[1]}
+
+    rows = fetch_logs(filters, after, limit + 1)
+    if since_ids and not after:
+        # Delta: up to `limit` rows per table, each table continuing on its own
+        fetched, rows, next_ids, has_more = rows, [], [], False
+        for source, since_id, table in zip(("snort", "correlation"), since_ids, tables):
+            branch, next_id, more = delta_rows([r for r in fetched if r["source"] == source],
+                                               limit, since_id, marks[table])
+            rows.extend(branch)
+            next_ids.append(str(next_id))
+            if more:
+                headers[DELTA_MORE_HEADER] = "1"
+        rows.sort(key=lambda r: (r["timestamp"], r["source"], r["id"]), reverse=True)
+        headers[SINCE_ID_HEADER] = ":".join(next_ids)
+    else:
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
     logs = []
     for r in rows:
         logs.append({
@@ -123,233 +417,230 @@ def get_logs():
             "severity": r["severity"],
             "correlated": r["correlated"]
         })
-    return jsonify(logs), 200
+    last = [cursor_ts(rows[-1]["timestamp"]), rows[-1]["source"], rows[-1]["id"]] if rows else None
+    return paged_response(logs, has_more, last, headers)
 
 # ======================
 # SNORT LOGS ENDPOINT
 # ======================
+def snort_row(r):
+    return {
+        "id": r["id"],
+        "timestamp": r["timestamp"],
+        "agent_id": r["agent_id"],
+        "source": "snort",
+        "source_ip": r["source_ip"],
+        "dest_ip": r["dest_ip"],
+        "source_port": r["source_port"],
+        "dest_port": r["dest_port"],
+        "protocol": r["protocol"],
+        "message": r["message"],
+        "severity": r["severity"],
+        "correlated": False
+    }
+
 @app.route("/api/snort-logs", methods=["GET"])
 def get_snort_logs():
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("""
-        SELECT
-            id,
-            timestamp,
-            agent_id,
-            source_ip,
-            dest_ip,
-            source_port,
-            dest_port,
-            protocol,
-            signature AS message,
-            severity
-        FROM snort_logs
-        ORDER BY timestamp DESC
-        LIMIT 100
-    """)
-
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    try:
+        filters, after, limit = page_args(request.args)
+        filters["since_id"] = parse_since_id(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    since_id = filters["since_id"]
+    headers, not_modified, marks = change_check(["snort_logs"], None if since_id is None else [since_id])
+    if not_modified:
+        return "", 304, headers
+
+    rows = fetch_snort_logs(filters, after, limit + 1)
+    if since_id is not None and not after:
+        rows, next_id, more = delta_rows(rows, limit, since_id, marks["snort_logs"])
+        headers[SINCE_ID_HEADER] = str(next_id)
+        if more:
+            headers[DELTA_MORE_HEADER] = "1"
+        has_more = False
+    else:
+        has_more = len(rows) > limit
+        rows = rows[:limit]
 
-    results = []
-    for r in rows:
-        results.append({
-            "id": r["id"],
-            "timestamp": r["timestamp"],
-            "agent_id": r["agent_id"],
-            "source": "snort",
-            "source_ip": r["source_ip"],
-            "dest_ip": r["dest_ip"],
-            "source_port": r["source_port"],
-            "dest_port": r["dest_port"],
-            "protocol": r["protocol"],
-            "message": r["message"],
-            "severity": r["severity"],
-            "correlated": False
-        })
+    results = [snort_row(r) for r in rows]
 
-    return jsonify(results), 200
+    last = [cursor_ts(rows[-1]["timestamp"]), rows[-1]["id"]] if rows else None
+    return paged_response(results, has_more, last, headers)
 
 # ======================
 # WAZUH LOGS ENDPOINT (HIDS)
 # ======================
+def wazuh_row(r):
+    return {
+        "id": r["id"],
+        "timestamp": r["timestamp"],
+        "source": "wazuh",
+        "agent_name": r["agent_name"],
+        "agent_ip": r["agent_ip"],
+        "rule_level": r["rule_level"],
+        "source_ip": r["source_ip"],
+        "dest_ip": r["dest_ip"],
+        "message": r["rule_description"],
+        "severity": r["severity"],
+        "correlated": False
+    }
+
 @app.route("/api/wazuh-logs", methods=["GET"])
 def get_wazuh_logs():
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("""
-        SELECT
-            id,
-            timestamp,
-            agent_name,
-            agent_ip,
-            rule_level,
-            rule_description,
-            source_ip,
-            dest_ip,
-            severity
-        FROM wazuh_logs
-        ORDER BY timestamp DESC
-        LIMIT 100
-    """)
-
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    try:
+        filters, after, limit = page_args(request.args)
+        filters["since_id"] = parse_since_id(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    since_id = filters["since_id"]
+    headers, not_modified, marks = change_check(["wazuh_logs"], None if since_id is None else [since_id])
+    if not_modified:
+        return "", 304, headers
+
+    rows = fetch_wazuh_logs(filters, after, limit + 1)
+    if since_id is not None and not after:
+        rows, next_id, more = delta_rows(rows, limit, since_id, marks["wazuh_logs"])
+        headers[SINCE_ID_HEADER] = str(next_id)
+        if more:
+            headers[DELTA_MORE_HEADER] = "1"
+        has_more = False
+    else:
+        has_more = len(rows) > limit
+        rows = rows[:limit]
 
-    logs = []
-    for r in rows:
-        logs.append({
-            "id": r["id"],
-            "timestamp": r["timestamp"],
-            "source": "wazuh",
-            "agent_name": r["agent_name"],
-            "agent_ip": r["agent_ip"],
-            "rule_level": r["rule_level"],
-            "source_ip": r["source_ip"],
-            "dest_ip": r["dest_ip"],
-            "message": r["rule_description"],
-            "severity": r["severity"],
-            "correlated": False
-        })
+    logs = [wazuh_row(r) for r in rows]
 
-    return jsonify(logs), 200
+    last = [cursor_ts(rows[-1]["timestamp"]), rows[-1]["id"]] if rows else None
+    return paged_response(logs, has_more, last, headers)
+
+# ======================
+# READ CACHE
+# ======================
+# Dashboard read endpoints are cached in-process (cache.py), so N open
+# dashboards cost one query per TTL instead of N: concurrent misses share
+# one load, expired values are served stale while one refresh runs in the
+# background, and changes to the listed tables expire them: inserts into a
+# raw table (db.after_insert), a compactor pass for the rollups
+# (ROLLUP_CACHE_TABLES), dropped partitions (partitions.py).
+# The view is re-run in its own request context (same path and args), so a
+# background refresh does not depend on the request that triggered it.
+def cached(ttl, stale=0, tables=()):
+    def wrap(view):
+        @functools.wraps(view)
+        def cached_view(*args, **kwargs):
+            args_key = tuple(sorted((k, v) for k, v in request.args.items(multi=True) if k not in ETAG_IGNORED_ARGS))
+            full_path = request.full_path
+
+            def load():
+                with app.test_request_context(full_path):
+                    resp = app.make_response(view(*args, **kwargs))
+                    headers = [(k, v) for k, v in resp.headers.items() if k != "Content-Length"]
+                    return resp.get_data(), resp.status_code, headers
+
+            body, status, headers = read_cache.get((request.path, args_key), load, ttl, stale, tables)
+            return Response(body, status=status, headers=headers)
+        return cached_view
+    return wrap
+
+@app.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(read_cache.stats()), 200
+
+# ======================
+# ROLLUPS
+# ======================
+# The analytics endpoints below read pre-aggregated counts (rollups.py)
+# instead of scanning the raw tables; the compactor keeps them current.
+# When it is too far behind for the query to add the missing rows
+# (rollups.TAIL_LIMIT), the counts are short by up to X-Rollup-Lag rows.
+CORRELATION_SOURCES = ["correlation", "security"]   # every security_logs row
+ROLLUP_LAG_HEADER = "X-Rollup-Lag"
+
+def lag_headers(*counts):
+    lag = sum(c.lag for c in counts)
+    return {ROLLUP_LAG_HEADER: str(lag)} if lag else {}
+
+# The rollup compactor and the partition maintainer (monthly partitions:
+# creates the coming months, drops the ones past retention) write to the
+# database, so they start with the server, not on import: when run
+# directly, or on the first request under a WSGI server, the way the live
+# stream starts its feed. Both start() calls are no-ops once running.
+@app.before_request
+def start_background():
+    compactor.start()
+    maintainer.start()
+
+def critical_counts():
+    return window_counts([], sources=CORRELATION_SOURCES, severity="critical")
 
 # ======================
 # SEVERITY DISTRIBUTION DASHBOARD
 # ======================
 @app.route("/api/severity-distribution", methods=["GET"])
+@cached(ttl=30, stale=30, tables=ROLLUP_CACHE_TABLES)
 def severity_distribution():
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("""
-        SELECT
-            severity,
-            COUNT(*) AS count
-        FROM security_logs
-        WHERE correlated = 1
-          AND timestamp >= NOW() - INTERVAL 24 HOUR
-        GROUP BY severity
-        ORDER BY count DESC
-    """)
-
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-
-    total = sum(r["count"] for r in rows) or 1
+    counts = window_counts(["severity"], since=datetime.utcnow() - timedelta(hours=24), sources=["correlation"])
+    rows = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+
+    total = sum(count for _, count in rows) or 1
 
     return jsonify([
         {
-            "label": r["severity"].capitalize(),
-            "count": r["count"],
-            "percentage": round((r["count"] / total) * 100, 1)
+            "label": severity.capitalize(),
+            "count": count,
+            "percentage": round((count / total) * 100, 1)
         }
-        for r in rows
-    ])
+        for (severity,), count in rows
+    ]), 200, lag_headers(counts)
 
 # ======================
 # ACTIVITY OVERVIEW DASHBOARD (24-HOUR TIMELINE)
 # ======================
 @app.route("/api/activity-overview", methods=["GET"])
+@cached(ttl=30, stale=30, tables=ROLLUP_CACHE_TABLES)
 def activity_overview():
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # 24 hourly buckets for Snort
-    cur.execute("""
-        SELECT HOUR(timestamp) as hour, COUNT(*) as count
-        FROM snort_logs
-        WHERE timestamp >= NOW() - INTERVAL 24 HOUR
-        GROUP BY hour
-        ORDER BY hour
-    """)
-    snort = cur.fetchall()
-
-    # 24 hourly buckets for Wazuh
-    cur.execute("""
-        SELECT HOUR(timestamp) as hour, COUNT(*) as count
-        FROM wazuh_logs
-        WHERE timestamp >= NOW() - INTERVAL 24 HOUR
-        GROUP BY hour
-        ORDER BY hour
-    """)
-    wazuh = cur.fetchall()
-
-    # 24 hourly buckets for Correlated events
-    cur.execute("""
-        SELECT HOUR(timestamp) as hour, COUNT(*) as count
-        FROM security_logs
-        WHERE correlated = 1
-          AND timestamp >= NOW() - INTERVAL 24 HOUR
-        GROUP BY hour
-        ORDER BY hour
-    """)
-    correlated = cur.fetchall()
-
-    cur.close()
-    conn.close()
+    # 24 hourly buckets per source, from the rollups
+    counts = window_counts(["source", "hour"], since=datetime.utcnow() - timedelta(hours=24),
+                           sources=["snort", "wazuh", "correlation"])
+
+    def hourly(source):
+        return [
+            {"hour": hour, "count": count}
+            for (src, hour), count in sorted(counts.items(), key=lambda item: item[0][1])
+            if src == source
+        ]
 
     return jsonify({
-        "snort": snort,
-        "wazuh": wazuh,
-        "correlated": correlated
-    }), 200
+        "snort": hourly("snort"),
+        "wazuh": hourly("wazuh"),
+        "correlated": hourly("correlation")
+    }), 200, lag_headers(counts)
 
 # ======================
 # CRITICAL ALERT COUNT
 # ======================
 @app.route("/api/dashboard/critical-count", methods=["GET"])
+@cached(ttl=15, stale=15, tables=ROLLUP_CACHE_TABLES)
 def critical_alert_count():
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("""
-        SELECT COUNT(*) AS total
-        FROM security_logs
-        WHERE severity = 'critical'
-    """)
-
-    result = cur.fetchone()
-    cur.close()
-    conn.close()
-
+    counts = critical_counts()
     return jsonify({
-        "critical": result["total"]
-    }), 200
+        "critical": counts[()]
+    }), 200, lag_headers(counts)
 
 # ======================
 # CORRELATED STATS
 # ======================
 @app.route("/api/dashboard/correlated-stats", methods=["GET"])
+@cached(ttl=60, stale=60, tables=ROLLUP_CACHE_TABLES)
 def correlated_stats():
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Today (last 24 hours)
-    cur.execute("""
-        SELECT COUNT(*) AS total
-        FROM security_logs
-        WHERE timestamp >= NOW() - INTERVAL 1 DAY
-    """)
-    today = cur.fetchone()["total"]
-
-    # Yesterday (24–48 hours ago)
-    cur.execute("""
-        SELECT COUNT(*) AS total
-        FROM security_logs
-        WHERE timestamp >= NOW() - INTERVAL 2 DAY
-          AND timestamp < NOW() - INTERVAL 1 DAY
-    """)
-    yesterday = cur.fetchone()["total"]
-
-    cur.close()
-    conn.close()
+    now = datetime.utcnow()
+    # Today (last 24 hours), yesterday (24–48 hours ago)
+    today_counts = window_counts([], since=now - timedelta(days=1), sources=CORRELATION_SOURCES)
+    yesterday_counts = window_counts([], since=now - timedelta(days=2), until=now - timedelta(days=1),
+                                     sources=CORRELATION_SOURCES)
+    today, yesterday = today_counts[()], yesterday_counts[()]
 
     # Percentage change calculation
     if yesterday == 0:
@@ -361,63 +652,139 @@ def correlated_stats():
         "today": today,
         "yesterday": yesterday,
         "percentage_change": percentage
-    }), 200
+    }), 200, lag_headers(today_counts, yesterday_counts)
 
 # ======================
 # ACTIVE CORRELATED AGENTS
 # ======================
 @app.route("/api/dashboard/active-correlated-agents", methods=["GET"])
+@cached(ttl=60, stale=60, tables=("security_logs",))
 def active_correlated_agents():
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("""
-        SELECT DISTINCT
-            COALESCE(
-                JSON_UNQUOTE(JSON_EXTRACT(raw_json, '$.raw.agent_id')),
-                agent_id
-            ) AS agent_id
-        FROM security_logs
-        WHERE correlated = 1
-          AND timestamp >= NOW() - INTERVAL 24 HOUR
-          AND (
-                JSON_EXTRACT(raw_json, '$.raw.agent_id') IS NOT NULL
-                OR agent_id IS NOT NULL
-          )
-    """)
-
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-
-    agents = [r["agent_id"] for r in rows if r["agent_id"]]
+    agents = fetch_active_correlated_agents()
 
     return jsonify({
         "active_agents": agents,
         "total": len(agents)
     }), 200
 
+def correlated_row(r):
+    return {
+        "id": r["id"],
+        "timestamp": r["timestamp"],
+        "source": r["source"],
+        "agent_id": r["agent_id"],
+        "message": r["message"],
+        "severity": r["severity"],
+        "correlated": True
+    }
+
+CORRELATED_LIMIT = 50
+
 @app.route("/api/correlated-logs", methods=["GET"])
 def get_correlated_logs():
-    rows = fetch_correlated_logs()
+    try:
+        since_id = parse_since_id(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    logs = []
-    for r in rows:
-        logs.append({
-            "id": r["id"],
-            "timestamp": r["timestamp"],
-            "source": r["source"],
-            "agent_id": r["agent_id"],
-            "message": r["message"],
-            "severity": r["severity"],
-            "correlated": True
-        })
+    headers, not_modified, marks = change_check(["security_logs"], None if since_id is None else [since_id])
+    if not_modified:
+        return "", 304, headers
+
+    if since_id is None:
+        rows = fetch_correlated_logs(limit=CORRELATED_LIMIT)
+    else:
+        rows, next_id, more = delta_rows(fetch_correlated_logs(limit=CORRELATED_LIMIT + 1, since_id=since_id),
+                                         CORRELATED_LIMIT, since_id, marks["security_logs"])
+        headers[SINCE_ID_HEADER] = str(next_id)
+        if more:
+            headers[DELTA_MORE_HEADER] = "1"
+    logs = [correlated_row(r) for r in rows]
+
+    return jsonify(logs), 200, headers
+
+
+# ======================
+# LIVE STREAM (SSE)
+# ======================
+# GET /api/stream pushes new rows as they are inserted, one event per page
+# of up to PAGE_SIZE new rows of a table (the payload is a JSON array shaped
+# like the matching REST endpoint, newest first), then a "counters" event:
+#
+#   event: snort        rows of /api/snort-logs
+#   event: wazuh        rows of /api/wazuh-logs
+#   event: correlation  rows of /api/correlated-logs
+#   event: counters     {"critical": n, "newest": {table: MAX(id)}}
+#   event: reset        missed events are gone (or a burst too large to
+#                       stream); reload over REST
+#
+# Every event has an id, so a reconnecting EventSource resumes with
+# Last-Event-ID. Each connection holds one server thread.
+STREAM_HEARTBEAT = 15      # seconds between keep-alive comments
+STREAM_RETRY_MS = 3000     # EventSource reconnect delay
+
+_critical = {"count": None}
+
+def stream_counters(marks, changed):
+    # COUNT(*) only when security_logs grew
+    if _critical["count"] is None or "security_logs" in changed:
+        _critical["count"] = critical_counts()[()]
+    return {"critical": _critical["count"], "newest": marks}
+
+feed.attach(
+    max_ids=fetch_max_ids,
+    sources={
+        "snort_logs": ("snort", lambda since_id: [
+            snort_row(r) for r in fetch_snort_logs({"since_id": since_id})
+        ]),
+        "wazuh_logs": ("wazuh", lambda since_id: [
+            wazuh_row(r) for r in fetch_wazuh_logs({"since_id": since_id})
+        ]),
+        "security_logs": ("correlation", lambda since_id: [
+            correlated_row(r) for r in fetch_correlated_logs(limit=PAGE_SIZE, since_id=since_id)
+        ]),
+    },
+    counters=stream_counters,
+    dumps=app.json.dumps,
+)
 
-    return jsonify(logs), 200
+def sse(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+@app.route("/api/stream", methods=["GET"])
+def live_stream():
+    feed.start()
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    sub, reset_id = broker.subscribe(last_event_id)
+
+    def events():
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            if reset_id:
+                yield sse(reset_id, "reset", "{}")
+            while not sub.closed:
+                items = sub.wait(STREAM_HEARTBEAT)
+                if not items:
+                    if not sub.closed:
+                        yield ": ping\n\n"
+                    continue
+                yield "".join(sse(event_id, event, data) for _, event_id, event, data in items)
+        finally:
+            broker.unsubscribe(sub)
+
+    return Response(events(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",   # no proxy buffering (nginx)
+    })
+
+@app.route("/api/stream/stats", methods=["GET"])
+def stream_stats():
+    return jsonify(broker.stats()), 200
 
 
 # ======================
 # RUN SERVER
 # ======================
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000)
+    start_background()
+    app.run(host="0.0.0.0", port=5000, threaded=True)
@@ -0,0 +1,159 @@
+"""
+Cold tier: log rows past retention, kept as compressed files on disk.
+
+Before partitions.py drops an expired month of snort_logs, wazuh_logs or
+security_logs, export_partition() writes its rows to
+ARCHIVE_DIR/<source>/<YYYY-MM-DD>.ndjson.gz, one file per day and source
+and one JSON object per row with every column (timestamps as text,
+raw_json / raw_data as stored). The files are written under a temporary
+name, synced and renamed once the whole partition is out; an export that
+fails leaves the partition in place and is redone on the next pass.
+
+The log endpoints read them back (archived_rows) when a query's `since`
+reaches into archived days: only the day files within [since, until] are
+opened, newest first, and only as far as the page needs. Rows still in
+the database (at or after its oldest timestamp) are skipped, so a month
+exported but not dropped yet is not returned twice.
+
+ARCHIVE_DIR defaults to archive/ next to this file; set it empty to drop
+expired months without exporting them.
+"""
+
+import gzip
+import json
+import os
+from datetime import datetime
+
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "archive"))
+ARCHIVE_EXPORT_CHUNK = int(os.environ.get("ARCHIVE_EXPORT_CHUNK", 5000))   # rows per SELECT
+
+ARCHIVE_SOURCES = {
+    "snort_logs": "snort",
+    "wazuh_logs": "wazuh",
+    "security_logs": "correlation",
+}
+
+SUFFIX = ".ndjson.gz"
+
+def archive_enabled():
+    return bool(ARCHIVE_DIR)
+
+def day_path(table, day):
+    return os.path.join(ARCHIVE_DIR, ARCHIVE_SOURCES[table], day + SUFFIX)
+
+def parse_ts(value):
+    return datetime.fromisoformat(str(value)) if value else None
+
+# ======================
+# EXPORT
+# ======================
+class DayFile:
+    """gzip NDJSON file written under <path>.tmp until commit()."""
+
+    def __init__(self, path):
+        self.path = path
+        self._raw = open(path + ".tmp", "wb")
+        self._gz = gzip.GzipFile(fileobj=self._raw, mode="wb")
+
+    def write(self, row):
+        line = json.dumps(row, default=str, separators=(",", ":")) + "\n"
+        self._gz.write(line.encode("utf-8"))
+
+    def commit(self):
+        self._gz.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())   # on disk before the partition is dropped
+        self._raw.close()
+        os.replace(self.path + ".tmp", self.path)
+
+    def discard(self):
+        self._gz.close()
+        self._raw.close()
+        try:
+            os.remove(self.path + ".tmp")
+        except FileNotFoundError:
+            pass
+
+def export_partition(cur, table, partition, chunk=ARCHIVE_EXPORT_CHUNK):
+    """Write every row of one partition to its day files; returns the rows written."""
+    os.makedirs(os.path.join(ARCHIVE_DIR, ARCHIVE_SOURCES[table]), exist_ok=True)
+    files = {}
+    total, last_id = 0, 0
+    try:
+        while True:
+            cur.execute(f"SELECT * FROM {table} PARTITION ({partition}) WHERE id > %s ORDER BY id LIMIT %s",
+                        (last_id, chunk))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            for row in rows:
+                day = str(row["timestamp"])[:10]
+                if day not in files:
+                    files[day] = DayFile(day_path(table, day))
+                files[day].write(row)
+            total += len(rows)
+            last_id = rows[-1]["id"]
+    except Exception:
+        for f in files.values():
+            f.discard()
+        raise
+    for f in files.values():
+        f.commit()
+    return total
+
+# ======================
+# QUERIES
+# ======================
+def archived_days(table, since, until=None):
+    """Archived days of `table` within [since, until], newest first."""
+    if not archive_enabled():
+        return []
+    try:
+        names = os.listdir(os.path.join(ARCHIVE_DIR, ARCHIVE_SOURCES[table]))
+    except FileNotFoundError:
+        return []
+    first = str(since)[:10]
+    last = str(until)[:10] if until else None
+    days = [name[:-len(SUFFIX)] for name in names if name.endswith(SUFFIX)]
+    return sorted((d for d in days if d >= first and (last is None or d <= last)), reverse=True)
+
+def read_day(table, day):
+    with gzip.open(day_path(table, day), "rt", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    for row in rows:
+        row["timestamp"] = parse_ts(row["timestamp"])
+    rows.sort(key=lambda r: (r["timestamp"], r["id"]), reverse=True)
+    return rows
+
+def row_matches(row, filters, columns):
+    """Archived-row version of db.filter_clauses: same filters, same columns."""
+    if filters.get("since_id") and row["id"] <= filters["since_id"]:
+        return False
+    if filters.get("since") and row["timestamp"] < parse_ts(filters["since"]):
+        return False
+    if filters.get("until") and row["timestamp"] >= parse_ts(filters["until"]):
+        return False
+    if filters.get("severity") and (row.get("severity") or "").lower() not in filters["severity"]:
+        return False
+    for name in ("agent", "src_ip", "signature"):
+        if not filters.get(name):
+            continue
+        column = columns.get(name)
+        value = str(row.get(column) or "").casefold() if column else None
+        wanted = filters[name].casefold()
+        if value is None or (wanted not in value if name == "signature" else value != wanted):
+            return False
+    return True
+
+def archived_rows(table, filters, columns, hot_oldest=None):
+    """
+    Archived rows of `table` matching `filters`, newest first by
+    (timestamp, id). Rows at or after `hot_oldest` (still in the
+    database) are left out.
+    """
+    for day in archived_days(table, filters["since"], filters.get("until")):
+        for row in read_day(table, day):
+            if hot_oldest is not None and row["timestamp"] >= hot_oldest:
+                continue
+            if row_matches(row, filters, columns):
+                yield row
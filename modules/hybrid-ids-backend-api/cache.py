@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until", "tables")
+
+    def __init__(self, value, fresh_until, stale_until, tables):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.tables = tables
+
+
+class _Flight:
+    """A load in progress; callers missing the same key wait on it."""
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ReadCache:
+    """
+    Thread-safe in-process TTL cache for read endpoints.
+
+    - A value is fresh for `ttl` seconds, then servable as stale for
+      `stale` more seconds while one background refresh replaces it
+      (stale-while-revalidate). With stale=0 an expired value is reloaded
+      by the request that finds it.
+    - Concurrent misses on a key share one load (single flight): the first
+      caller runs it, the others wait for its result or its exception.
+    - invalidate(table) ends the freshness of every value that depends on
+      the table. A load that started before the invalidation is stored as
+      already expired, so it cannot pass for fresh.
+    - Oldest entries are dropped beyond max_entries.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._flights = {}
+        self._versions = {}        # table -> invalidation count
+        self._lock = threading.Lock()
+
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "loads": 0,
+            "load_errors": 0,
+            "refreshes": 0,
+            "invalidations": 0,
+        }
+
+    def get(self, key, load, ttl, stale=0, tables=()):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.fresh_until:
+                self._stats["hits"] += 1
+                return entry.value
+            if entry is not None and now < entry.stale_until:
+                self._stats["stale_hits"] += 1
+                if key not in self._flights:
+                    flight = self._flights[key] = _Flight()
+                    self._stats["refreshes"] += 1
+                    threading.Thread(target=self._refresh, args=(key, flight, load, ttl, stale, tables),
+                                     name="cache-refresh", daemon=True).start()
+                return entry.value
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        return self._load(key, flight, load, ttl, stale, tables)
+
+    def invalidate(self, *tables):
+        now = time.monotonic()
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+            for entry in self._entries.values():
+                if entry.fresh_until > now and not entry.tables.isdisjoint(tables):
+                    entry.fresh_until = now
+            self._stats["invalidations"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["in_flight"] = len(self._flights)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 3) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        return stats
+
+    # ======================
+    # INTERNALS
+    # ======================
+    def _load(self, key, flight, load, ttl, stale, tables):
+        tables = frozenset(tables)
+        with self._lock:
+            versions = [self._versions.get(t, 0) for t in tables]
+            self._stats["loads"] += 1
+        try:
+            flight.value = load()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._stats["load_errors"] += 1
+            raise
+        else:
+            self._store(key, flight.value, ttl, stale, tables, versions)
+            return flight.value
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _refresh(self, key, flight, load, ttl, stale, tables):
+        try:
+            self._load(key, flight, load, ttl, stale, tables)
+        except Exception as e:
+            print("⚠️ CACHE REFRESH FAILED:", key, e)
+
+    def _store(self, key, value, ttl, stale, tables, versions):
+        now = time.monotonic()
+        with self._lock:
+            current = [self._versions.get(t, 0) for t in tables]
+            # Invalidated while loading: keep it only as a stale fallback
+            fresh_until = now + ttl if current == versions else now
+            self._entries.pop(key, None)
+            self._entries[key] = _Entry(value, fresh_until, fresh_until + stale, tables)
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+
+
+# ======================
+# SHARED INSTANCE
+# ======================
+READ_CACHE_MAX_ENTRIES = int(os.environ.get("READ_CACHE_MAX_ENTRIES", 256))
+
+read_cache = ReadCache(max_entries=READ_CACHE_MAX_ENTRIES)
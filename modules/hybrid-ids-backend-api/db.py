@@ -1,6 +1,16 @@
+import heapq
 import json
+import os
 import pymysql
-from datetime import datetime
+from datetime import datetime, timedelta
+from itertools import islice
+
+import archive
+
+from pool import ConnectionPool
+from cache import read_cache
+from stream import feed
+from timestamps import mysql_datetime, mysql_datetime6
 
 # ======================
 # Database Configuration
@@ -20,6 +30,34 @@ def get_conn():
         autocommit=True
     )
 
+# ======================
+# Connection Pool
+# ======================
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", 2))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 10))
+DB_POOL_IDLE_TIMEOUT = int(os.environ.get("DB_POOL_IDLE_TIMEOUT", 300))   # seconds
+DB_POOL_CHECKOUT_TIMEOUT = int(os.environ.get("DB_POOL_CHECKOUT_TIMEOUT", 10))
+
+pool = ConnectionPool(
+    get_conn,
+    min_size=DB_POOL_MIN,
+    max_size=DB_POOL_MAX,
+    idle_timeout=DB_POOL_IDLE_TIMEOUT,
+    checkout_timeout=DB_POOL_CHECKOUT_TIMEOUT
+)
+
+def db_conn():
+    """Borrow a pooled connection: `with db_conn() as conn:`"""
+    return pool.connection()
+
+def pool_stats():
+    return pool.stats()
+
+def after_insert(*tables):
+    """After a commit: wake the live stream and expire cached reads of `tables`."""
+    feed.notify()
+    read_cache.invalidate(*tables)
+
 # ======================
 # HELPER FUNCTIONS
 # ======================
@@ -63,54 +101,34 @@ def map_wazuh_severity(level):
         return "medium"
 
 def parse_wazuh_timestamp(ts):
-    if not ts:
-        return None
-
-    # Case 1: Already MySQL format (YYYY-MM-DD HH:MM:SS)
-    try:
-        return datetime.strptime(
-            ts,
-            "%Y-%m-%d %H:%M:%S"
-        ).strftime("%Y-%m-%d %H:%M:%S")
-    except:
-        pass
-
-    # Case 2: Wazuh ISO-8601 format
-    try:
-        return datetime.strptime(
-            ts,
-            "%Y-%m-%dT%H:%M:%S.%f%z"
-        ).strftime("%Y-%m-%d %H:%M:%S")
-    except Exception as e:
-        print("⚠️ TIMESTAMP PARSE FAILED:", ts, e)
-        return None
+    # MySQL 'YYYY-MM-DD HH:MM:SS' or Wazuh ISO-8601; sliced and cached per second
+    return mysql_datetime(ts)
 
 # ======================
 # SNORT LOG INSERT
 # ======================
-def insert_snort_log(event):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    sql = """
-        INSERT INTO snort_logs
-        (
-            timestamp,
-            agent_id,
-            source_ip,
-            dest_ip,
-            source_port,
-            dest_port,
-            protocol,
-            signature,
-            severity,
-            event_type,
-            raw_data
-        )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
+SNORT_INSERT_SQL = """
+    INSERT INTO snort_logs
+    (
+        timestamp,
+        agent_id,
+        source_ip,
+        dest_ip,
+        source_port,
+        dest_port,
+        protocol,
+        signature,
+        severity,
+        event_type,
+        raw_data,
+        event_uid
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE id = id
+"""
 
-    cur.execute(sql, (
+def snort_row(event):
+    return (
         event.get("timestamp") or datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
         event.get("agent_id"),
         event.get("src_ip"),
@@ -121,171 +139,495 @@ def insert_snort_log(event):
         event.get("message"),
         map_severity(event.get("severity")),
         event.get("event_type", "snort_alert"),
-        json.dumps(event)
-    ))
+        json.dumps(event),
+        event.get("event_uid")        # replayed events are skipped
+    )
+
+def insert_snort_log(event):
+    with db_conn() as conn:
+        cur = conn.cursor()
 
-    conn.commit()
-    cur.close()
-    conn.close()
+        cur.execute(SNORT_INSERT_SQL, snort_row(event))
+
+        conn.commit()
+        cur.close()
+    after_insert("snort_logs")
 
 # ======================
 # WAZUH LOG INSERT
 # ======================
-def insert_wazuh_log(event):
-    print("🔥🔥🔥 insert_wazuh_log CALLED 🔥🔥🔥")
-    print("🔥 EVENT:", event)
+WAZUH_INSERT_SQL = """
+    INSERT INTO wazuh_logs
+    (
+        alert_id,
+        timestamp,
+        agent_name,
+        agent_ip,
+        rule_level,
+        rule_description,
+        source_ip,
+        dest_ip,
+        event_type,
+        severity,
+        raw_data
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
 
-    conn = get_conn()
-    cur = conn.cursor()
+def wazuh_row(event):
+    # --- FIX TIMESTAMP ---
+    ts = parse_wazuh_timestamp(event.get("timestamp"))
+    if not ts or ts.startswith("0000"):
+        ts = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
 
-    try:
-        # --- FIX TIMESTAMP ---
-        ts = parse_wazuh_timestamp(event.get("timestamp"))
-        if not ts or ts.startswith("0000"):
-            ts = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-
-        # --- FIX AGENT NAME ---
-        agent_name = (
-            event.get("agent_name")
-            or event.get("agent", {}).get("name")
-            or "unknown"
-        )
+    # --- FIX AGENT NAME ---
+    agent_name = (
+        event.get("agent_name")
+        or event.get("agent", {}).get("name")
+        or "unknown"
+    )
 
-        sql = """
-            INSERT INTO wazuh_logs
-            (
-                alert_id,
-                timestamp,
-                agent_name,
-                agent_ip,
-                rule_level,
-                rule_description,
-                source_ip,
-                dest_ip,
-                event_type,
-                severity,
-                raw_data
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
+    return (
+        event.get("alert_id"),
+        ts,
+        agent_name,
+        event.get("agent_ip"),
+        event.get("rule_level") or 0,
+        event.get("rule_description") or "No description",
+        event.get("source_ip"),
+        event.get("dest_ip"),
+        event.get("event_type", "wazuh_alert"),
+        map_wazuh_severity(event.get("rule_level")),
+        json.dumps(event)
+    )
 
-        cur.execute(sql, (
-            event.get("alert_id"),
-            ts,
-            agent_name,
-            event.get("agent_ip"),
-            event.get("rule_level") or 0,
-            event.get("rule_description") or "No description",
-            event.get("source_ip"),
-            event.get("dest_ip"),
-            event.get("event_type", "wazuh_alert"),
-            map_wazuh_severity(event.get("rule_level")),
-            json.dumps(event)
-        ))
+def insert_wazuh_log(event):
+    print("🔥🔥🔥 insert_wazuh_log CALLED 🔥🔥🔥")
+    print("🔥 EVENT:", event)
 
-        conn.commit()
+    with db_conn() as conn:
+        cur = conn.cursor()
 
-    except Exception as e:
-        print("❌ WAZUH DB INSERT FAILED:", e)
-        print("❌ EVENT:", event)
+        try:
+            cur.execute(WAZUH_INSERT_SQL, wazuh_row(event))
+            conn.commit()
+            after_insert("wazuh_logs")
 
-    finally:
-        cur.close()
-        conn.close()
+        except Exception as e:
+            print("❌ WAZUH DB INSERT FAILED:", e)
+            print("❌ EVENT:", event)
+
+        finally:
+            cur.close()
 
 # ======================
 # CORRELATION LOG INSERT
 # ======================
-def insert_correlation_log(event):
-    conn = get_conn()
-    cur = conn.cursor()
-    sql = """
-        INSERT INTO security_logs
-        (timestamp, source, agent_id, severity, correlated, raw_json)
-        VALUES (%s, %s, %s, %s, %s, %s)
-    """
-    cur.execute(sql, (
-        event.get("timestamp"),
+CORRELATION_INSERT_SQL = """
+    INSERT INTO security_logs
+    (timestamp, source, agent_id, severity, correlated, raw_json, event_uid)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE id = id
+"""
+
+def correlation_row(event):
+    # security_logs.timestamp is DATETIME(6); the text as sent stays in raw_json
+    ts = mysql_datetime6(event.get("timestamp")) or datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S.%f")
+    return (
+        ts,
         "correlation",
         event.get("agent_id"),   # 👈 THIS IS THE KEY LINE
         event.get("severity"),
         1,
-        json.dumps(event)
-    ))
-    conn.commit()
-    cur.close()
-    conn.close()
+        json.dumps(event),
+        event.get("event_uid")
+    )
+
+def insert_correlation_log(event):
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(CORRELATION_INSERT_SQL, correlation_row(event))
+        conn.commit()
+        cur.close()
+    after_insert("security_logs")
 
 # ======================
-# FETCH UNIFIED LOG VIEW
+# BATCH INSERT
 # ======================
-def fetch_logs(limit=100):
-    conn = get_conn()
-    cur = conn.cursor()
+# table group -> (INSERT statement, row builder). Re-sent events hit the
+# UNIQUE event_uid / alert_id and are skipped instead of failing the batch.
+BATCH_INSERTS = {
+    "snort": (SNORT_INSERT_SQL, snort_row),
+    "wazuh": (WAZUH_INSERT_SQL + " ON DUPLICATE KEY UPDATE alert_id = alert_id", wazuh_row),
+    "correlation": (CORRELATION_INSERT_SQL, correlation_row),
+}
 
-    sql = """
-        (
-            SELECT
-                id,
-                timestamp,
-                agent_id,
-                'snort' AS source,
-                signature AS message,
-                severity,
-                0 AS correlated
-            FROM snort_logs
-        )
-        UNION ALL
-        (
-            SELECT
-                id,
-                timestamp,
-                agent_id,
-                'correlation' AS source,
-                JSON_UNQUOTE(JSON_EXTRACT(raw_json, '$.correlation_type')) AS message,
-                severity,
-                1 AS correlated
-            FROM security_logs
-        )
-        ORDER BY timestamp DESC
-        LIMIT %s
+BATCH_TABLES = {"snort": "snort_logs", "wazuh": "wazuh_logs", "correlation": "security_logs"}
+
+def insert_batch(groups):
+    """
+    groups: {"snort": [event, ...], "wazuh": [...], "correlation": [...]}
+    Each group is written with one multi-row executemany; all groups share
+    one transaction. Returns {group: rows inserted}.
     """
+    with db_conn() as conn:
+        cur = conn.cursor()
+        try:
+            conn.begin()
+            inserted = {}
+            for group, events in groups.items():
+                if not events:
+                    continue
+                sql, row = BATCH_INSERTS[group]
+                inserted[group] = cur.executemany(sql, [row(e) for e in events]) or 0
+            conn.commit()
+            after_insert(*(BATCH_TABLES[group] for group, events in groups.items() if events))
+            return inserted
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
 
-    cur.execute(sql, (limit,))
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    return rows
+# ======================
+# KEYSET PAGINATION
+# ======================
+# Pages are ordered newest first by (timestamp, id) and continue from the
+# last row of the previous page ("after"), so page N costs the same as page
+# 1: the timestamp condition is a range on idx_timestamp, which InnoDB
+# stores with the primary key, instead of an OFFSET scan.
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# A delta poll (since_id, no cursor) reads the `limit` lowest ids above
+# since_id, oldest first, so a burst larger than one page is delivered over
+# several polls instead of skipped: the caller continues from the highest
+# id it got.
+def delta_mode(filters, after):
+    return filters.get("since_id") is not None and not after
+
+# filter name -> column, per table
+SNORT_FILTERS = {"agent": "agent_id", "src_ip": "source_ip", "signature": "signature"}
+WAZUH_FILTERS = {"agent": "agent_name", "src_ip": "source_ip", "signature": "rule_description"}
+
+def like_contains(text):
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def filter_clauses(filters, columns, ts_column="timestamp"):
+    """
+    filters: {"since_id", "since", "until", "severity": [...], "agent", "src_ip",
+    "signature"} (all optional). Returns (["sql", ...], [params]); None if a filter has
+    no column in this table, so nothing can match.
+    """
+    where, params = [], []
+    if filters.get("since_id"):
+        where.append("id > %s")   # primary-key range: only rows newer than the client has
+        params.append(filters["since_id"])
+    if filters.get("since"):
+        where.append(f"{ts_column} >= %s")
+        params.append(filters["since"])
+    if filters.get("until"):
+        where.append(f"{ts_column} < %s")
+        params.append(filters["until"])
+    if filters.get("severity"):
+        where.append(f"severity IN ({', '.join(['%s'] * len(filters['severity']))})")
+        params.extend(filters["severity"])
+    for name in ("agent", "src_ip", "signature"):
+        if not filters.get(name):
+            continue
+        column = columns.get(name)
+        if column is None:
+            return None
+        if name == "signature":
+            where.append(f"{column} LIKE %s")
+            params.append(like_contains(filters[name]))
+        else:
+            where.append(f"{column} = %s")
+            params.append(filters[name])
+    return where, params
+
+def keyset_clause(after, ts_column="timestamp", id_column="id"):
+    """Rows strictly older than the (timestamp, id) cursor, in ORDER BY timestamp DESC, id DESC."""
+    ts, row_id = after
+    return f"({ts_column} < %s OR ({ts_column} = %s AND {id_column} < %s))", [ts, ts, row_id]
+
+# ======================
+# ARCHIVED ROWS (cold tier)
+# ======================
+# Months dropped by the partition maintainer live on in archive.py's day
+# files. A page whose `since` reaches them merges the archived rows in,
+# newest first like the rest, without touching the database for them.
+def archived_fields(fields, **constants):
+    """Projection of a full archived row onto a page row: {alias: column} plus constants."""
+    return lambda row: dict({alias: row.get(column) for alias, column in fields.items()}, **constants)
+
+def hot_oldest(table):
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT MIN(timestamp) AS oldest FROM {table}")
+        row = cur.fetchone()
+        cur.close()
+    return row["oldest"]
+
+def archived_page_rows(table, columns, filters, project):
+    """Projected archived rows for a page, newest first; empty unless `since` reaches the archive."""
+    if not filters.get("since") or not archive.archived_days(table, filters["since"], filters.get("until")):
+        return iter(())
+    rows = archive.archived_rows(table, filters, columns, hot_oldest(table))
+    return (project(row) for row in rows)
+
+def cursor_key(after):
+    """Keyset cursor with its timestamp as a datetime, comparable to row keys."""
+    return (archive.parse_ts(after[0]),) + tuple(after[1:])
+
+def merge_newest(rows, archived, key, after, limit):
+    """Database rows and archived rows (both newest first) as one page."""
+    if after:
+        try:
+            bound = cursor_key(after)
+        except ValueError:
+            return rows   # cursor from before security_logs.timestamp was a DATETIME
+        archived = (row for row in archived if key(row) < bound)
+    return list(islice(heapq.merge(rows, archived, key=key, reverse=True), limit))
 
+def page_key(row):
+    return (row["timestamp"], row["id"])
 
+def fetch_page(select_sql, columns, filters, after, limit, table=None, project=None):
+    """Newest first; in delta mode the lowest ids above since_id, ascending."""
+    found = filter_clauses(filters or {}, columns)
+    if found is None:
+        return []
+    where, params = found
+    if after:
+        clause, extra = keyset_clause(after)
+        where.append(clause)
+        params.extend(extra)
 
-def fetch_correlated_logs(limit=50):
-    conn = get_conn()
-    cur = conn.cursor()
+    delta = delta_mode(filters or {}, after)
+    sql = select_sql
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id LIMIT %s" if delta else " ORDER BY timestamp DESC, id DESC LIMIT %s"
+    params.append(limit)
 
-    sql = """
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        cur.close()
+
+    if table and not delta:   # archived rows are never above a since_id
+        rows = merge_newest(rows, archived_page_rows(table, columns, filters or {}, project), page_key, after, limit)
+    return rows
+
+SNORT_ARCHIVED = archived_fields({
+    "id": "id", "timestamp": "timestamp", "agent_id": "agent_id", "source_ip": "source_ip",
+    "dest_ip": "dest_ip", "source_port": "source_port", "dest_port": "dest_port",
+    "protocol": "protocol", "message": "signature", "severity": "severity",
+})
+WAZUH_ARCHIVED = archived_fields({
+    "id": "id", "timestamp": "timestamp", "agent_name": "agent_name", "agent_ip": "agent_ip",
+    "rule_level": "rule_level", "rule_description": "rule_description",
+    "source_ip": "source_ip", "dest_ip": "dest_ip", "severity": "severity",
+})
+
+def fetch_snort_logs(filters=None, after=None, limit=PAGE_SIZE):
+    return fetch_page("""
         SELECT
             id,
             timestamp,
             agent_id,
-            'correlation' AS source,
-            COALESCE(
-                JSON_UNQUOTE(JSON_EXTRACT(raw_json, '$.raw.correlation_type')),
-                JSON_UNQUOTE(JSON_EXTRACT(raw_json, '$.correlation_type')),
-                JSON_UNQUOTE(JSON_EXTRACT(raw_json, '$.message'))
-            ) AS message,
-            severity,
-            correlated
-        FROM security_logs
-        WHERE correlated = 1
-          AND timestamp IS NOT NULL
-          AND timestamp != 'MANUAL_TEST'
-        ORDER BY timestamp DESC
-        LIMIT %s
+            source_ip,
+            dest_ip,
+            source_port,
+            dest_port,
+            protocol,
+            signature AS message,
+            severity
+        FROM snort_logs
+    """, SNORT_FILTERS, filters, after, limit, "snort_logs", SNORT_ARCHIVED)
+
+def fetch_wazuh_logs(filters=None, after=None, limit=PAGE_SIZE):
+    return fetch_page("""
+        SELECT
+            id,
+            timestamp,
+            agent_name,
+            agent_ip,
+            rule_level,
+            rule_description,
+            source_ip,
+            dest_ip,
+            severity
+        FROM wazuh_logs
+    """, WAZUH_FILTERS, filters, after, limit, "wazuh_logs", WAZUH_ARCHIVED)
+
+# ======================
+# FETCH UNIFIED LOG VIEW
+# ======================
+# Snort rows and correlation rows, newest first by (timestamp, source, id);
+# ids are per table, so the source breaks ties. Each branch reads its
+# table's idx_timestamp.
+def union_keyset_clause(after, source):
+    """Keyset condition for one branch of the union, given the (timestamp, source, id) cursor."""
+    ts, after_source, row_id = after
+    if not ts[:4].isdigit():
+        return None, []   # cursor from before security_logs.timestamp was a DATETIME
+    if source < after_source:
+        return "timestamp <= %s", [ts]
+    if source > after_source:
+        return "timestamp < %s", [ts]
+    return keyset_clause((ts, row_id))
+
+CORRELATION_FILTERS = {"agent": "effective_agent_id", "signature": "correlation_type"}
+
+UNION_SNORT_ARCHIVED = archived_fields({
+    "id": "id", "timestamp": "timestamp", "agent_id": "agent_id",
+    "message": "signature", "severity": "severity",
+}, source="snort", correlated=0)
+UNION_CORRELATION_ARCHIVED = archived_fields({
+    "id": "id", "timestamp": "timestamp", "agent_id": "effective_agent_id",
+    "message": "correlation_type", "severity": "severity",
+}, source="correlation", correlated=1)
+
+def union_key(row):
+    return (row["timestamp"], row["source"], row["id"])
+
+def fetch_logs(filters=None, after=None, limit=PAGE_SIZE):
     """
+    filters may carry "since_ids": {"snort": id, "correlation": id} (ids are
+    per table). In delta mode each branch returns up to `limit` of its lowest
+    ids above its since_id, not cut to `limit` overall.
+    """
+    filters = filters or {}
+    branches = [
+        ("snort", "snort_logs", """
+                SELECT
+                    id,
+                    timestamp,
+                    agent_id,
+                    'snort' AS source,
+                    signature AS message,
+                    severity,
+                    0 AS correlated
+                FROM snort_logs
+        """, SNORT_FILTERS, UNION_SNORT_ARCHIVED),
+        ("correlation", "security_logs", """
+                SELECT
+                    id,
+                    timestamp,
+                    effective_agent_id AS agent_id,
+                    'correlation' AS source,
+                    correlation_type AS message,
+                    severity,
+                    1 AS correlated
+                FROM security_logs
+        """, CORRELATION_FILTERS, UNION_CORRELATION_ARCHIVED),
+    ]
+
+    since_ids = filters.get("since_ids") or {}
+    delta = bool(since_ids) and not after
+    parts, params, archived = [], [], []
+    for source, table, select_sql, columns, project in branches:
+        branch_filters = dict(filters, since_id=since_ids.get(source))
+        found = filter_clauses(branch_filters, columns)
+        if found is None:
+            continue
+        archived.append(archived_page_rows(table, columns, branch_filters, project))
+        where, branch_params = found
+        if after:
+            clause, extra = union_keyset_clause(after, source)
+            if clause:
+                where.append(clause)
+                branch_params.extend(extra)
+        sql = select_sql
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        # Each branch stops at `limit` rows on its own index
+        sql += " ORDER BY id LIMIT %s" if delta else " ORDER BY timestamp DESC, id DESC LIMIT %s"
+        parts.append(f"({sql})")
+        params.extend(branch_params + [limit])
+
+    if not parts:
+        return []
+
+    sql = " UNION ALL ".join(parts)
+    if not delta:
+        sql += " ORDER BY timestamp DESC, source DESC, id DESC LIMIT %s"
+        params.append(limit)
+
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        cur.close()
+
+    if delta:
+        return rows
+    archived = heapq.merge(*archived, key=union_key, reverse=True)
+    return merge_newest(rows, archived, union_key, after, limit)
+
+
+
+def fetch_correlated_logs(limit=50, since_id=None):
+    with db_conn() as conn:
+        cur = conn.cursor()
+
+        sql = """
+            SELECT
+                id,
+                timestamp,
+                effective_agent_id AS agent_id,
+                'correlation' AS source,
+                COALESCE(
+                    correlation_type,
+                    JSON_UNQUOTE(JSON_EXTRACT(raw_json, '$.message'))
+                ) AS message,
+                severity,
+                correlated
+            FROM security_logs
+            WHERE correlated = 1
+              AND no_event_time = 0   -- no timestamp / 'MANUAL_TEST' as sent
+              AND id > %s
+        """
+        # since_id: the lowest new ids, ascending (see delta_mode)
+        sql += " ORDER BY id" if since_id is not None else " ORDER BY timestamp DESC, id DESC"
+        sql += " LIMIT %s"
 
-    cur.execute(sql, (limit,))
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+        cur.execute(sql, (since_id or 0, limit))
+        rows = cur.fetchall()
+        cur.close()
     return rows
+
+def fetch_active_correlated_agents(hours=24):
+    # A literal bound lets MySQL prune security_logs to the current partition(s)
+    since = datetime.utcnow() - timedelta(hours=hours)
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT DISTINCT effective_agent_id AS agent_id
+            FROM security_logs
+            WHERE correlated = 1
+              AND timestamp >= %s
+              AND effective_agent_id IS NOT NULL
+        """, (since,))
+        rows = cur.fetchall()
+        cur.close()
+    return [r["agent_id"] for r in rows if r["agent_id"]]
+
+# ======================
+# CHANGE WATERMARKS
+# ======================
+def fetch_max_ids(tables):
+    """
+    {table: MAX(id)}: one primary-key lookup per table. Rows are only ever
+    appended, so an unchanged MAX(id) means nothing new to send.
+    """
+    sql = "SELECT " + ", ".join(f"(SELECT MAX(id) FROM {t}) AS {t}" for t in tables)
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(sql)
+        row = cur.fetchone()
+        cur.close()
+    return {t: row[t] or 0 for t in tables}
@@ -0,0 +1,114 @@
+"""
+EXPLAIN check for the log queries.
+
+Runs the security_logs reads of db.py through EXPLAIN and fails (exit 1)
+when one of them scans the whole table (type ALL) or stops using the
+indexes added for it (003_security_logs_columns.sql). Run it against a
+database restored from the dump, after the migrations: on near-empty
+tables the optimizer may prefer a scan anyway. The partitions column
+shows which monthly partitions (004_partition_logs.sql) a query opens.
+
+Usage: python3 explain_check.py
+"""
+
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+
+import db
+
+# table -> keys a query on it is expected to use
+EXPECTED_KEYS = {
+    "security_logs": {"PRIMARY", "idx_timestamp", "idx_correlated_ts", "idx_agent_ts"},
+}
+
+QUERIES = [
+    ("correlated logs", lambda: db.fetch_correlated_logs()),
+    ("correlated logs since id", lambda: db.fetch_correlated_logs(since_id=1)),
+    ("active correlated agents", lambda: db.fetch_active_correlated_agents()),
+    ("logs", lambda: db.fetch_logs()),
+    ("logs next page", lambda: db.fetch_logs(after=("2025-12-18 17:58:08.114552", "correlation", 1))),
+    ("logs by agent", lambda: db.fetch_logs({"agent": "agent2"})),
+    ("logs since", lambda: db.fetch_logs({"since": "2026-01-01"})),
+]
+
+# ======================
+# PLAN CAPTURE
+# ======================
+class ExplainCursor:
+    """Cursor that runs EXPLAIN for each SELECT instead of the SELECT."""
+
+    def __init__(self, cur, plans):
+        self._cur = cur
+        self._plans = plans
+
+    def execute(self, sql, params=None):
+        self._cur.execute("EXPLAIN " + sql, params)
+        self._plans.append((sql, self._cur.fetchall()))
+
+    def fetchall(self):
+        return []
+
+    def fetchone(self):
+        # Shaped like a DictCursor row with every column NULL (e.g.
+        # db.hot_oldest's MIN(timestamp) when archive day files exist)
+        return defaultdict(lambda: None)
+
+    def close(self):
+        self._cur.close()
+
+
+class ExplainConnection:
+    def __init__(self, conn, plans):
+        self._conn = conn
+        self._plans = plans
+
+    def cursor(self):
+        return ExplainCursor(self._conn.cursor(), self._plans)
+
+
+def explain(query):
+    """EXPLAIN rows of every statement `query` runs."""
+    plans = []
+
+    @contextmanager
+    def explain_conn():
+        with db.pool.connection() as conn:
+            yield ExplainConnection(conn, plans)
+
+    real_conn, db.db_conn = db.db_conn, explain_conn
+    try:
+        query()
+    finally:
+        db.db_conn = real_conn
+    return plans
+
+def plan_problems(rows):
+    problems = []
+    for row in rows:
+        expected = EXPECTED_KEYS.get(row["table"])
+        if expected is None:
+            continue   # snort_logs branch, derived tables of the union
+        if row["type"] == "ALL":
+            problems.append(f"full scan of {row['table']}")
+        elif row["key"] not in expected:
+            problems.append(f"{row['table']} uses key {row['key']}")
+    return problems
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, query in QUERIES:
+        problems = []
+        print(f"[INFO] {name}")
+        for sql, rows in explain(query):
+            for row in rows:
+                print(f"    {row['table']}: type={row['type']} key={row['key']} partitions={row.get('partitions')} "
+                      f"rows={row['rows']} {row['Extra'] or ''}")
+            problems.extend(plan_problems(rows))
+        if problems:
+            failed += 1
+            print(f"[ERROR] {name}: " + "; ".join(problems))
+        else:
+            print(f"[OK] {name}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,216 @@
+"""
+Partition maintenance for the log tables.
+
+snort_logs, wazuh_logs and security_logs are RANGE partitioned by month on
+timestamp (004_partition_logs.sql): pYYYYMM holds that month's rows and
+pfuture, VALUES LESS THAN MAXVALUE, anything later. A maintainer thread
+keeps them in shape:
+
+- Months up to PARTITION_AHEAD_MONTHS ahead are split out of pfuture
+  before any row lands in them (REORGANIZE of an empty partition is
+  metadata only), so pfuture stays empty. If it does hold rows (the
+  maintainer was stopped for months), the missing months, past ones
+  included, are still split out, with a warning: that REORGANIZE copies
+  the rows once.
+- Months whose rows are all older than the retention period are removed
+  with DROP PARTITION, which takes about as long for a month of rows as
+  for one: no row-by-row DELETE, no long table lock, no purge backlog.
+  A partition holding rows the rollup compactor has not counted yet is
+  kept until it has, so the analytics keep their history.
+- Before a month is dropped its rows are exported to the cold tier
+  (archive.py), where the log endpoints can still read them.
+
+Retention is LOG_RETENTION_DAYS (default 365; 0 keeps everything), or
+<TABLE>_RETENTION_DAYS for one table (e.g. SECURITY_LOGS_RETENTION_DAYS).
+A MySQL named lock keeps concurrent maintainers (other processes) from
+running the same DDL.
+
+Usage: python3 partitions.py [--dry-run]
+"""
+
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from archive import archive_enabled, export_partition
+from cache import read_cache
+from db import db_conn
+from rollups import ROLLUP_CACHE_TABLES
+
+PARTITION_INTERVAL = float(os.environ.get("PARTITION_INTERVAL", 3600))   # seconds between passes
+PARTITION_AHEAD_MONTHS = int(os.environ.get("PARTITION_AHEAD_MONTHS", 3))
+LOG_RETENTION_DAYS = int(os.environ.get("LOG_RETENTION_DAYS", 365))
+
+PARTITIONED_TABLES = ["snort_logs", "wazuh_logs", "security_logs"]
+
+RETENTION_DAYS = {
+    table: int(os.environ.get(f"{table.upper()}_RETENTION_DAYS", LOG_RETENTION_DAYS))
+    for table in PARTITIONED_TABLES
+}
+
+FUTURE_PARTITION = "pfuture"
+LOCK_NAME = "hybrid_ids_partition_maintenance"
+
+# ======================
+# PLANNING
+# ======================
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+def add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month):
+    return f"p{month:%Y%m}"
+
+def parse_bound(description):
+    """Upper bound of a RANGE COLUMNS partition ("'2026-01-01'"); None for MAXVALUE."""
+    if description is None or description.upper() == "MAXVALUE":
+        return None
+    return date.fromisoformat(description.strip("'")[:10])
+
+def plan(partitions, today, ahead, retention_days):
+    """
+    partitions: [(name, upper bound date or None for MAXVALUE)] in order.
+    Returns ([months to split out of pfuture], [partition names to drop]).
+    """
+    bounds = [bound for _, bound in partitions if bound is not None]
+    if not bounds:
+        return [], []
+
+    months = []
+    month = max(bounds)   # first month not covered yet
+    last = add_months(month_start(today), ahead)
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+
+    drops = []
+    if retention_days > 0:
+        cutoff = today - timedelta(days=retention_days)
+        drops = [name for name, bound in partitions if bound is not None and bound <= cutoff]
+    return months, drops
+
+def reorganize_sql(table, months):
+    parts = [f"PARTITION {partition_name(m)} VALUES LESS THAN ('{add_months(m, 1)}')" for m in months]
+    parts.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+    return f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO ({', '.join(parts)})"
+
+def drop_sql(table, names):
+    return f"ALTER TABLE {table} DROP PARTITION {', '.join(names)}"
+
+# ======================
+# MAINTAINER
+# ======================
+class PartitionMaintainer:
+    def __init__(self, interval=PARTITION_INTERVAL, ahead=PARTITION_AHEAD_MONTHS, retention=None):
+        self.interval = interval
+        self.ahead = ahead
+        self.retention = retention or RETENTION_DAYS
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="partition-maintainer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print("⚠️ PARTITION MAINTENANCE ERROR:", e)
+            time.sleep(self.interval)
+
+    def run_once(self, dry_run=False):
+        """One pass over every table; returns the DDL statements run (or planned)."""
+        today = datetime.utcnow().date()
+        statements = []
+        with db_conn() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT GET_LOCK(%s, 0) AS locked", (LOCK_NAME,))
+                if not cur.fetchone()["locked"]:
+                    return statements   # another process is at it
+                try:
+                    for table in PARTITIONED_TABLES:
+                        statements.extend(self.maintain(cur, table, today, dry_run))
+                finally:
+                    cur.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            finally:
+                cur.close()
+        return statements
+
+    def maintain(self, cur, table, today, dry_run=False):
+        partitions = self.partitions(cur, table)
+        if not any(name == FUTURE_PARTITION for name, _ in partitions):
+            return []   # not partitioned (004_partition_logs.sql not applied)
+
+        months, drops = plan(partitions, today, self.ahead, self.retention[table])
+        drops = [name for name in drops if self.rolled_up(cur, table, name)]
+
+        statements = []
+        if months:
+            pending = self.future_rows(cur, table)
+            if pending:
+                print(f"⚠️ {table}.{FUTURE_PARTITION} holds {pending} rows: splitting out "
+                      f"{partition_name(months[0])}..{partition_name(months[-1])} copies them")
+            statements.append(reorganize_sql(table, months))
+        if drops:
+            statements.append(drop_sql(table, drops))
+        if drops and archive_enabled() and not dry_run:
+            # Cold tier first: the months are only dropped once they are on disk
+            for name in drops:
+                rows = export_partition(cur, table, name)
+                print(f"[INFO] {table}.{name}: {rows} rows archived")
+        for sql in statements:
+            print(f"[INFO] {sql}")
+            if not dry_run:
+                cur.execute(sql)
+        if drops and not dry_run:
+            read_cache.invalidate(table, *ROLLUP_CACHE_TABLES)
+        return statements
+
+    def partitions(self, cur, table):
+        cur.execute("""
+            SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS description
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE()
+              AND TABLE_NAME = %s
+              AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+        """, (table,))
+        return [(row["name"], parse_bound(row["description"])) for row in cur.fetchall()]
+
+    def future_rows(self, cur, table):
+        cur.execute(f"SELECT COUNT(*) AS n FROM {table} PARTITION ({FUTURE_PARTITION})")
+        return cur.fetchone()["n"]
+
+    def rolled_up(self, cur, table, name):
+        """True when every row of the partition is already counted in the rollups."""
+        cur.execute(f"""
+            SELECT
+                (SELECT MAX(id) FROM {table} PARTITION ({name})) AS max_id,
+                (SELECT last_id FROM rollup_state WHERE table_name = %s) AS last_id
+        """, (table,))
+        row = cur.fetchone()
+        if row["max_id"] is None or row["max_id"] <= (row["last_id"] or 0):
+            return True
+        print(f"⚠️ KEEPING {table}.{name}: rows above the rollup watermark")
+        return False
+
+maintainer = PartitionMaintainer()
+
+
+if __name__ == "__main__":
+    dry_run = "--dry-run" in sys.argv[1:]
+    statements = maintainer.run_once(dry_run=dry_run)
+    print(f"[OK] {len(statements)} statement(s) {'planned' if dry_run else 'run'}")
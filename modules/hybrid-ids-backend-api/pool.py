@@ -0,0 +1,213 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pymysql
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of PyMySQL connections.
+
+    - Connections are opened on demand up to max_size; callers wait (up to
+      checkout_timeout) when all are in use.
+    - On checkout, a connection idle for longer than ping_after is pinged
+      (ping(reconnect=True)), so a connection the server dropped is
+      reconnected instead of failing the request.
+    - A connection that raised a connection-level error is discarded, not
+      returned to the pool.
+    - A reaper thread closes connections idle for longer than idle_timeout
+      (keeping min_size open) and tops the pool back up to min_size.
+    """
+
+    def __init__(self, connect, min_size=2, max_size=10, idle_timeout=300,
+                 checkout_timeout=10, ping_after=30, reap_interval=30):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.ping_after = ping_after
+        self.reap_interval = reap_interval
+
+        self._idle = deque()       # (conn, last_used); most recently used on the right
+        self._size = 0             # open connections, idle + in use
+        self._cond = threading.Condition()
+        self._reaper = None
+
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "timeouts": 0,
+            "reconnects": 0,
+            "discarded": 0,
+        }
+
+    # ======================
+    # CHECKOUT / RETURN
+    # ======================
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            self.release(conn, discard=True)
+            raise
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                self.release(conn, discard=True)
+                raise
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def acquire(self):
+        self._start_reaper()
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        waited = False
+        conn, last_used = None, None
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1      # reserve a slot, connect outside the lock
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"no database connection free after {self.checkout_timeout}s")
+                waited = True
+                self._cond.wait(remaining)
+
+            wait_ms = (time.monotonic() - start) * 1000
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["waits"] += 1
+            self._stats["wait_ms_total"] += wait_ms
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], wait_ms)
+
+        if conn is None:
+            return self._open_reserved()
+
+        if time.monotonic() - last_used > self.ping_after:
+            try:
+                thread_id = conn.thread_id()
+                conn.ping(reconnect=True)
+                if conn.thread_id() != thread_id:
+                    self._count("reconnects")
+            except Exception as e:
+                print("⚠️ DB POOL HEALTH CHECK FAILED:", e)
+                self._close(conn)
+                with self._cond:
+                    self._size += 1
+                return self._open_reserved()
+        return conn
+
+    def release(self, conn, discard=False):
+        if discard or not conn.open:
+            self._count("discarded")
+            self._close(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    # ======================
+    # METRICS
+    # ======================
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._size - len(self._idle)
+        stats["min_size"] = self.min_size
+        stats["max_size"] = self.max_size
+        stats["wait_ms_avg"] = round(stats["wait_ms_total"] / stats["checkouts"], 3) if stats["checkouts"] else 0.0
+        stats["wait_ms_total"] = round(stats["wait_ms_total"], 3)
+        stats["wait_ms_max"] = round(stats["wait_ms_max"], 3)
+        return stats
+
+    # ======================
+    # INTERNALS
+    # ======================
+    def _open_reserved(self):
+        """Open a connection for a slot already counted in _size."""
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        self._count("created")
+        return conn
+
+    def _close(self, conn):
+        """Close a checked-out connection and free its slot."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats["closed"] += 1
+            self._cond.notify()
+
+    def _count(self, key):
+        with self._cond:
+            self._stats[key] += 1
+
+    def _start_reaper(self):
+        if self._reaper is not None:
+            return
+        with self._cond:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name="db-pool-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(self.reap_interval)
+            try:
+                self._reap()
+            except Exception as e:
+                print("⚠️ DB POOL REAPER ERROR:", e)
+
+    def _reap(self):
+        # Close connections idle too long (oldest are on the left)
+        expired = []
+        now = time.monotonic()
+        with self._cond:
+            while (self._idle and self._size - len(expired) > self.min_size
+                   and now - self._idle[0][1] > self.idle_timeout):
+                expired.append(self._idle.popleft()[0])
+        for conn in expired:
+            self._close(conn)
+
+        # Keep min_size connections warm
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            conn = self._open_reserved()
+            self.release(conn)
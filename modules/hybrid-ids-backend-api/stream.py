@@ -0,0 +1,245 @@
+import os
+import threading
+import time
+from collections import deque
+
+
+class Subscriber:
+    """One /api/stream client: a bounded buffer of events not yet written to it."""
+
+    def __init__(self, max_pending):
+        self.max_pending = max_pending
+        self.closed = False
+        self._pending = deque()
+        self._cond = threading.Condition()
+
+    def offer(self, item):
+        """Queue an event; False if the buffer is full (the client is not keeping up)."""
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                return False
+            self._pending.append(item)
+            self._cond.notify()
+            return True
+
+    def wait(self, timeout):
+        """Every queued event, waiting up to timeout for one; [] on timeout or once closed."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or self.closed, timeout)
+            if self.closed:
+                return []
+            items = list(self._pending)
+            self._pending.clear()
+            return items
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._pending.clear()
+            self._cond.notify()
+
+
+class EventBroker:
+    """
+    In-process pub/sub for the SSE stream.
+
+    - publish() numbers each event "<epoch>-<seq>" and hands it to every
+      subscriber's bounded buffer. A subscriber whose buffer is full is
+      evicted (its stream ends) instead of letting it hold memory or slow
+      the publisher down; its EventSource reconnects on its own.
+    - The last replay_size events are kept, so a client reconnecting with
+      Last-Event-ID gets what it missed. If that id is older than the
+      replay window, or from before a restart (other epoch), the client is
+      told to reset, i.e. reload over the REST endpoints.
+    """
+
+    def __init__(self, replay_size=500, client_buffer=256):
+        self.client_buffer = client_buffer
+        self._epoch = str(int(time.time()))
+        self._seq = 0
+        self._replay = deque(maxlen=replay_size)   # (seq, event_id, event, data)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+        self._stats = {
+            "published": 0,
+            "subscribed": 0,
+            "evicted": 0,
+            "replayed": 0,
+            "resets": 0,
+        }
+
+    def publish(self, event, data):
+        """data: the already serialized payload (one line of JSON)."""
+        with self._lock:
+            self._seq += 1
+            item = (self._seq, f"{self._epoch}-{self._seq}", event, data)
+            self._replay.append(item)
+            self._stats["published"] += 1
+            evicted = [sub for sub in self._subscribers if not sub.offer(item)]
+            for sub in evicted:
+                self._subscribers.discard(sub)
+            self._stats["evicted"] += len(evicted)
+        for sub in evicted:
+            sub.close()
+
+    def subscribe(self, last_event_id=None):
+        """
+        (subscriber, reset_id). Events after last_event_id are queued for
+        replay; reset_id is set (the current event id) when they are no
+        longer available.
+        """
+        sub = Subscriber(self.client_buffer)
+        reset_id = None
+        with self._lock:
+            if last_event_id:
+                seq = self._replay_from(last_event_id)
+                if seq is None:
+                    reset_id = f"{self._epoch}-{self._seq}"
+                    self._stats["resets"] += 1
+                else:
+                    missed = [item for item in self._replay if item[0] > seq]
+                    # Replay may exceed the live buffer bound; it is sent right away
+                    sub._pending.extend(missed)
+                    self._stats["replayed"] += len(missed)
+            self._subscribers.add(sub)
+            self._stats["subscribed"] += 1
+        return sub, reset_id
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+        sub.close()
+
+    def has_subscribers(self):
+        with self._lock:
+            return bool(self._subscribers)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["clients"] = len(self._subscribers)
+            stats["replay_buffered"] = len(self._replay)
+        stats["replay_size"] = self._replay.maxlen
+        stats["client_buffer"] = self.client_buffer
+        return stats
+
+    def _replay_from(self, last_event_id):
+        """Sequence number to replay after, or None if last_event_id cannot be resumed."""
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self._epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq > self._seq:
+            return None
+        oldest = self._replay[0][0] if self._replay else self._seq + 1
+        if seq < oldest - 1:
+            return None
+        return seq
+
+
+class ChangeFeed:
+    """
+    Publishes newly inserted rows to a broker.
+
+    The insert functions call notify() after each commit; a single feed
+    thread then looks at MAX(id) of every table and, for each table that
+    grew, pages through the new rows in id order up to that MAX(id),
+    publishing each page as one event (newest first, like the REST
+    endpoints), followed by a "counters" event. Bursts of inserts collapse
+    into one round of queries, however many clients are connected. A burst
+    of more than max_pages pages is not streamed: a "reset" event tells the
+    clients to reload over REST instead. With no notification the thread still checks every
+    idle_interval seconds, which picks up rows written by other processes.
+    Nothing is queried while no client is connected.
+    """
+
+    def __init__(self, broker, idle_interval=5.0, max_pages=20):
+        self.broker = broker
+        self.idle_interval = idle_interval
+        self.max_pages = max_pages
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._marks = None        # {table: MAX(id) already published}
+        self._max_ids = None
+        self._sources = {}
+        self._counters = None
+        self._dumps = None
+
+    def attach(self, max_ids, sources, counters, dumps):
+        """
+        max_ids(tables) -> {table: MAX(id)}
+        sources: {table: (event name, fetch(since_id) -> a page of the rows
+                  above since_id, lowest ids first)}
+        counters(marks, changed_tables) -> dict published as "counters"
+        dumps: serializer for the event payloads
+        """
+        self._max_ids = max_ids
+        self._sources = sources
+        self._counters = counters
+        self._dumps = dumps
+
+    def notify(self):
+        self._wake.set()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="stream-feed", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.idle_interval)
+            self._wake.clear()
+            if not self.broker.has_subscribers():
+                self._marks = None    # start again from "now" when a client connects
+                continue
+            try:
+                self._poll()
+            except Exception as e:
+                print("⚠️ STREAM FEED ERROR:", e)
+
+    def _poll(self):
+        marks = self._max_ids(list(self._sources))
+        if self._marks is None:
+            self._marks = marks
+            return
+
+        changed = [t for t in self._sources if marks[t] > self._marks[t]]
+        for table in changed:
+            self._publish_rows(table, self._marks[table], marks[table])
+        self._marks = marks
+
+        if changed:
+            self.broker.publish("counters", self._dumps(self._counters(marks, changed)))
+
+    def _publish_rows(self, table, since_id, mark):
+        """Publish the rows of `table` with since_id < id <= mark, one event per page."""
+        event, fetch = self._sources[table]
+        for _ in range(self.max_pages):
+            # Rows committed after the MAX(id) lookup are left for the next round
+            rows = [r for r in fetch(since_id) if r["id"] <= mark]
+            if not rows:
+                return
+            since_id = max(r["id"] for r in rows)
+            self.broker.publish(event, self._dumps(sorted(rows, key=lambda r: r["id"], reverse=True)))
+            if since_id >= mark:
+                return
+        self.broker.publish("reset", self._dumps({"table": table}))
+
+
+# ======================
+# SHARED INSTANCES
+# ======================
+STREAM_REPLAY_SIZE = int(os.environ.get("STREAM_REPLAY_SIZE", 500))
+STREAM_CLIENT_BUFFER = int(os.environ.get("STREAM_CLIENT_BUFFER", 256))
+STREAM_IDLE_POLL = float(os.environ.get("STREAM_IDLE_POLL", 5))   # seconds
+STREAM_MAX_PAGES = int(os.environ.get("STREAM_MAX_PAGES", 20))     # pages per table and round before a reset
+
+broker = EventBroker(replay_size=STREAM_REPLAY_SIZE, client_buffer=STREAM_CLIENT_BUFFER)
+feed = ChangeFeed(broker, idle_interval=STREAM_IDLE_POLL, max_pages=STREAM_MAX_PAGES)
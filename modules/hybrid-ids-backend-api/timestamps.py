@@ -0,0 +1,126 @@
+"""
+Timestamp normalization for ingested events, without strptime on the hot path.
+
+Incoming timestamps are almost always one of two fixed-width layouts:
+
+    2025-12-04 20:18:01              (MySQL DATETIME, agents)
+    2025-12-04T20:18:01.093+0000     (Wazuh alerts.json)
+
+They are sliced at known offsets. Each distinct second (plus UTC offset) is
+validated once and its result cached, so the events of a batch, which share
+a handful of seconds, cost a dict lookup each. Other layouts take the slow
+path (fromisoformat / strptime).
+"""
+
+from datetime import datetime, timedelta, timezone
+
+MYSQL_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Distinct seconds to remember before starting over
+CACHE_SIZE = 4096
+
+_wall_cache = {}
+_utc_cache = {}
+
+
+def _layout_ok(ts):
+    return len(ts) >= 19 and ts[4] == "-" and ts[7] == "-" and ts[10] in " T" and ts[13] == ":" and ts[16] == ":"
+
+
+def _offset(ts):
+    """'+0000' / '-0530' / '+05:30' / 'Z' at the end of ts, or None if there is none."""
+    if ts.endswith("Z"):
+        return "+0000"
+    tail = ts[19:]
+    if len(tail) >= 5 and tail[-5] in "+-" and tail[-4:].isdigit():
+        return tail[-5:]
+    if len(tail) >= 6 and tail[-6] in "+-" and tail[-3] == ":":
+        return tail[-6] + tail[-5:-3] + tail[-2:]
+    return None
+
+
+def _remember(cache, key, value):
+    if len(cache) >= CACHE_SIZE:
+        cache.clear()
+    cache[key] = value
+    return value
+
+
+def mysql_datetime(ts):
+    """
+    Wall-clock 'YYYY-MM-DD HH:MM:SS' of a MySQL or Wazuh ISO-8601 timestamp
+    (the UTC offset is dropped, as before), or None if it cannot be parsed.
+    """
+    if not ts:
+        return None
+    ts = str(ts)
+    if not _layout_ok(ts):
+        return _mysql_datetime_slow(ts)
+
+    key = ts[:10] + " " + ts[11:19]
+    cached = _wall_cache.get(key)
+    if cached is not None:
+        return cached
+    try:
+        datetime.strptime(key, MYSQL_FORMAT)    # once per distinct second
+    except ValueError as e:
+        print("⚠️ TIMESTAMP PARSE FAILED:", ts, e)
+        return None
+    return _remember(_wall_cache, key, key)
+
+
+def mysql_datetime6(ts):
+    """mysql_datetime() keeping the fraction of a second, for DATETIME(6) columns."""
+    wall = mysql_datetime(ts)
+    if wall is None:
+        return None
+    s = str(ts)
+    digits = ""
+    if len(s) > 20 and s[19] == ".":
+        for ch in s[20:26]:
+            if not ch.isdigit():
+                break
+            digits += ch
+    return wall + "." + digits.ljust(6, "0")
+
+
+def _mysql_datetime_slow(ts):
+    try:
+        return datetime.strptime(ts, "%Y-%m-%dT%H:%M:%S.%f%z").strftime(MYSQL_FORMAT)
+    except Exception as e:
+        print("⚠️ TIMESTAMP PARSE FAILED:", ts, e)
+        return None
+
+
+def normalize_ts(ts):
+    """Any ISO-8601 / MySQL timestamp -> UTC 'YYYY-MM-DD HH:MM:SS' (now if unparseable)."""
+    s = str(ts)
+    offset = _offset(s) if _layout_ok(s) else None
+    if offset is None:
+        return _normalize_ts_slow(s)
+
+    key = s[:19] + offset
+    cached = _utc_cache.get(key)
+    if cached is not None:
+        return cached
+    try:
+        wall = datetime(int(s[0:4]), int(s[5:7]), int(s[8:10]),
+                        int(s[11:13]), int(s[14:16]), int(s[17:19]))
+        minutes = int(offset[1:3]) * 60 + int(offset[3:5])
+    except ValueError:
+        return _normalize_ts_slow(s)
+    utc = wall - timedelta(minutes=-minutes if offset[0] == "-" else minutes)
+    return _remember(_utc_cache, key, utc.strftime(MYSQL_FORMAT))
+
+
+def _normalize_ts_slow(s):
+    try:
+        s = s.replace("Z", "+00:00")
+        if s.endswith(" UTC"):
+            s = s.replace(" UTC", "+00:00")
+        if len(s) >= 5 and s[-5] in ["+", "-"] and s[-2:].isdigit():
+            s = s[:-5] + s[-5:-2] + ":" + s[-2:]
+        dt = datetime.fromisoformat(s)
+        return dt.astimezone(timezone.utc).strftime(MYSQL_FORMAT)
+    except Exception:
+        return datetime.utcnow().strftime(MYSQL_FORMAT)
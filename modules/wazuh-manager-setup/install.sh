@@ -56,6 +56,7 @@ systemctl restart wazuh-manager || true
 echo "[INFO] Installing push script to /opt/wazuh-push ..."
 mkdir -p /opt/wazuh-push
 install -m 0755 "$REPO_DIR/scripts/wazuh_push.py" /opt/wazuh-push/wazuh_push.py
+install -m 0644 "$REPO_DIR/scripts/spool.py" /opt/wazuh-push/spool.py
 install -m 0644 "$REPO_DIR/scripts/requirements.txt" /opt/wazuh-push/requirements.txt
 
 # Create .env only if missing (do NOT overwrite user's config)
@@ -4,6 +4,8 @@ import json
 import time
 import requests
 
+from spool import Spool, SpoolSender
+
 # Optional: load KEY=VALUE from a local .env file (no extra libraries needed)
 def load_dotenv(path: str) -> None:
     if not os.path.exists(path):
@@ -28,34 +30,61 @@ ALERTS_FILE = os.environ.get("ALERTS_FILE", "/var/ossec/logs/alerts/alerts.json"
 POLL_SLEEP = float(os.environ.get("POLL_SLEEP", "0.2"))
 REQ_TIMEOUT = float(os.environ.get("REQ_TIMEOUT", "3"))
 
+# Alerts are spooled on disk first, so a dashboard outage delays them instead of dropping them
+SPOOL_DIR = os.environ.get("SPOOL_DIR", os.path.join(SCRIPT_DIR, "spool"))
+SPOOL_MAX_MB = int(os.environ.get("SPOOL_MAX_MB", "512"))
+
 HEADERS = {
     "X-API-Key": API_KEY,
     "Content-Type": "application/json"
 }
 
 def follow(file):
+    """Yield the complete lines appended since the last call, as a list."""
     file.seek(0, 2)
+    pending = ""
     while True:
-        line = file.readline()
-        if not line:
+        lines = file.readlines()
+        if not lines:
             time.sleep(POLL_SLEEP)
             continue
-        yield line
+        lines[0] = pending + lines[0]
+        pending = "" if lines[-1].endswith("\n") else lines.pop()
+        if lines:
+            yield lines
 
-def main():
-    with open(ALERTS_FILE, "r", encoding="utf-8") as f:
-        for line in follow(f):
+def make_sender(session):
+    def send(alerts):
+        """POST each alert; False (retry the batch later) if the dashboard is unreachable."""
+        for alert in alerts:
             try:
-                alert = json.loads(line.strip())
-                r = requests.post(
-                    DASHBOARD_URL,
-                    headers=HEADERS,
-                    json=alert,
-                    timeout=REQ_TIMEOUT
-                )
-                print("Sent alert:", r.status_code)
+                r = session.post(DASHBOARD_URL, json=alert, timeout=REQ_TIMEOUT)
             except Exception as e:
                 print("Push failed:", e)
+                return False
+            if r.status_code >= 500:
+                print("Push failed:", r.status_code)
+                return False
+            print("Sent alert:", r.status_code)
+        # Re-sent alerts are skipped by the backend (UNIQUE alert_id)
+        return True
+    return send
+
+def main():
+    spool = Spool(SPOOL_DIR, max_bytes=SPOOL_MAX_MB * 1024 * 1024)
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    SpoolSender(spool, make_sender(session), batch_size=100, name="wazuh-sender").start()
+
+    with open(ALERTS_FILE, "r", encoding="utf-8") as f:
+        for lines in follow(f):
+            alerts = []
+            for line in lines:
+                try:
+                    alerts.append(json.loads(line.strip()))
+                except json.JSONDecodeError as e:
+                    print("Skipping malformed alert:", e)
+            spool.append(alerts)
 
 if __name__ == "__main__":
     main()